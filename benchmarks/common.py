@@ -0,0 +1,118 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import tempfile
+import threading
+import time
+from typing import Any, Callable
+
+import numpy as np
+from handlers.LoggingHandler import Logger
+from streams.Stream import Stream
+from utils.time_utils import get_time
+
+
+##############################################################################################
+# Shared helpers of the benchmarks, run from the repository root as `python -m benchmarks.<name>`.
+##############################################################################################
+# Stream with arbitrary synthetic streams, to drive the Logger without any devices.
+# @param stream_specs are keyword arguments of `Stream.add_stream`, one dict per stream.
+class SyntheticStream(Stream):
+  def __init__(self, stream_specs: list[dict[str, Any]], **_) -> None:
+    super().__init__()
+    for stream_spec in stream_specs:
+      self.add_stream(**stream_spec)
+
+
+  # Factory of the Stream in a Logger process, from the same stream specs.
+  @classmethod
+  def create_stream(cls, stream_info: dict) -> 'SyntheticStream':
+    return cls(**stream_info)
+
+
+  def get_fps(self) -> dict[str, float | None]:
+    return {}
+
+
+  def build_visulizer(self) -> None:
+    return None
+
+
+# Random sample of a stream, of its data type and sample size.
+def get_random_sample(rng: np.random.Generator, data_type: str, sample_size: tuple[int, ...]) -> Any:
+  dtype = np.dtype(data_type)
+  if dtype.kind == 'f':
+    return rng.standard_normal(sample_size).astype(dtype)
+  elif dtype.kind == 'b':
+    return rng.random(sample_size) > 0.5
+  elif dtype.kind in 'iu':
+    return rng.integers(0, 100, size=sample_size).astype(dtype)
+  else:
+    return 'sample'
+
+
+# Append `num_samples` random samples to every stream of every device, like a Node receiving messages would.
+def fill_stream(stream: Stream, num_samples: int, seed: int = 0) -> None:
+  rng = np.random.default_rng(seed)
+  stream_info_all = stream.get_stream_info_all()
+  for i in range(num_samples):
+    stream.append_data(process_time_s=get_time(),
+                       data={device_name: {stream_name: get_random_sample(rng, stream_info['data_type'], tuple(stream_info['sample_size']))
+                                           for (stream_name, stream_info) in device_info.items() if stream_name != 'process_time_s'}
+                             for (device_name, device_info) in stream_info_all.items()})
+
+
+# Run a Logger over already filled Streams until all the data is written and the files are closed.
+# Returns the wall time from the Logger start until it exited.
+def run_logger(streams: OrderedDict[str, Stream], log_dir: str, **logging_spec) -> float:
+  logger = Logger(log_tag='bench', log_dir=log_dir, log_time_s=get_time(), experiment={}, **logging_spec)
+  start_time_s = time.perf_counter()
+  logger_thread = threading.Thread(target=logger, args=(streams,))
+  logger_thread.start()
+  logger.cleanup()
+  logger_thread.join()
+  return time.perf_counter() - start_time_s
+
+
+# Best wall time out of `num_repeats` runs of `fn`, each on a fresh temporary directory.
+def time_best(fn: Callable[[str], Any], num_repeats: int = 3) -> float:
+  durations_s = []
+  for _ in range(num_repeats):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      start_time_s = time.perf_counter()
+      fn(tmp_dir)
+      durations_s.append(time.perf_counter() - start_time_s)
+  return min(durations_s)
+
+
+# Print the results as an aligned table.
+def print_table(headers: list[str], rows: list[list[Any]]) -> None:
+  cells = [headers] + [[('%.4g' % x) if isinstance(x, float) else str(x) for x in row] for row in rows]
+  widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+  for row in cells:
+    print('  '.join(cell.rjust(width) for (cell, width) in zip(row, widths)), flush=True)
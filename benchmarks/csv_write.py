@@ -0,0 +1,77 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+from collections import OrderedDict
+import contextlib
+import io
+import tempfile
+
+import numpy as np
+from benchmarks.common import SyntheticStream, print_table, run_logger
+
+
+##############################################################################################
+# Vectorized vs per-row CSV writes of the Logger, both through `Logger._sync_write_csv` on the same samples.
+#   per-row: the stream declared with an object data type, so the Logger takes its row-by-row text path:
+#     each sample unwrapped into a list and joined with `str` of every value.
+#   vectorized: the stream declared with its numeric data type, so the Logger stacks the backlog into one 2-D block
+#     and formats it with a single printf-style call.
+# Each run also writes the process time column of the device, the same way in both modes.
+# Usage: python -m benchmarks.csv_write [--num_samples N]
+##############################################################################################
+def time_logger(samples: np.ndarray, data_type: str, num_repeats: int) -> float:
+  durations_s = []
+  for _ in range(num_repeats):
+    stream = SyntheticStream([{'device_name': 'sensor', 'stream_name': 'data', 'data_type': data_type,
+                               'sample_size': samples.shape[1:], 'sampling_rate_hz': 100}])
+    for (i, sample) in enumerate(samples):
+      stream.append_data(process_time_s=float(i), data={'sensor': {'data': sample}})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      # Keep the Logger's I/O summary out of the benchmark report.
+      with contextlib.redirect_stdout(io.StringIO()):
+        durations_s.append(run_logger(OrderedDict([('bench', stream)]), tmp_dir, stream_csv=True))
+  return min(durations_s)
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Vectorized vs per-row CSV writes of the Logger.')
+  parser.add_argument('--num_samples', type=int, default=100000)
+  parser.add_argument('--num_repeats', type=int, default=3)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(0)
+  rows = []
+  for (name, sample_size, data_type) in [('time', (1,), 'float64'),
+                                         ('imu', (5, 3), 'float32'),
+                                         ('counter', (1,), 'int64'),
+                                         ('flags', (8,), 'bool')]:
+    arr = rng.standard_normal((args.num_samples, *sample_size))
+    samples = arr > 0 if data_type == 'bool' else (1000*arr).astype(data_type)
+    per_row_s = time_logger(samples, 'object', args.num_repeats)
+    vectorized_s = time_logger(samples, data_type, args.num_repeats)
+    rows.append([name, str(sample_size), data_type, per_row_s, vectorized_s, per_row_s/vectorized_s])
+  print_table(['stream', 'sample_size', 'dtype', 'per_row_s', 'vectorized_s', 'speedup'], rows)
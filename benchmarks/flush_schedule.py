@@ -0,0 +1,108 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import argparse
+from collections import OrderedDict
+import contextlib
+import io
+import tempfile
+import threading
+import time
+
+import numpy as np
+from benchmarks.common import SyntheticStream, print_table
+from handlers.LoggingHandler import Logger
+from utils.time_utils import get_time
+
+
+##############################################################################################
+# Backlog and write latency of the fixed-period vs the adaptive flush schedule, over a live session
+#   with a large fast stream (camera-like), a medium one (IMU-like) and a slow one (1 Hz).
+#   max_backlog: most samples waiting in a Stream FIFO at a write, i.e. memory held by the Logger.
+#   max_wait_s: backlog over the sampling rate, how old the oldest sample got before it was written.
+#   max_write_ms: longest single write call, i.e. the worst stall of the writer.
+# Usage: python -m benchmarks.flush_schedule [--duration_s N]
+##############################################################################################
+STREAM_SPECS = [
+  {'device_name': 'camera', 'stream_name': 'data', 'data_type': 'uint8', 'sample_size': (64*1024,), 'sampling_rate_hz': 30},
+  {'device_name': 'imu', 'stream_name': 'data', 'data_type': 'float32', 'sample_size': (16,), 'sampling_rate_hz': 100},
+  {'device_name': 'slow', 'stream_name': 'data', 'data_type': 'float32', 'sample_size': (1,), 'sampling_rate_hz': 1},
+]
+
+
+# Append samples of each stream at its own rate until `stop_event` is set.
+def produce(stream: SyntheticStream, stop_event: threading.Event) -> None:
+  start_time_s = get_time()
+  num_appended = {spec['device_name']: 0 for spec in STREAM_SPECS}
+  samples = {spec['device_name']: np.zeros(spec['sample_size'], dtype=spec['data_type']) for spec in STREAM_SPECS}
+  while not stop_event.is_set():
+    elapsed_s = get_time() - start_time_s
+    for spec in STREAM_SPECS:
+      while num_appended[spec['device_name']] < elapsed_s * spec['sampling_rate_hz']:
+        stream.append_data(process_time_s=get_time(), data={spec['device_name']: {'data': samples[spec['device_name']]}})
+        num_appended[spec['device_name']] += 1
+    time.sleep(0.005)
+
+
+def run_session(duration_s: float, **logging_spec) -> list[dict]:
+  streams = OrderedDict([('bench', SyntheticStream(STREAM_SPECS))])
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    logger = Logger(log_tag='bench', log_dir=tmp_dir, log_time_s=0.0, experiment={}, stream_hdf5=True, **logging_spec)
+    stop_event = threading.Event()
+    producer_thread = threading.Thread(target=produce, args=(streams['bench'], stop_event))
+    logger_thread = threading.Thread(target=logger, args=(streams,))
+    # Keep the Logger's I/O summary out of the benchmark report.
+    with contextlib.redirect_stdout(io.StringIO()):
+      logger_thread.start()
+      producer_thread.start()
+      time.sleep(duration_s)
+      stop_event.set()
+      producer_thread.join()
+      logger.cleanup()
+      logger_thread.join()
+  return logger.get_writer_stats()
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Fixed-period vs adaptive flush schedule.')
+  parser.add_argument('--duration_s', type=float, default=20.0)
+  parser.add_argument('--stream_period_s', type=float, default=5.0)
+  args = parser.parse_args()
+
+  rows = []
+  for (schedule, logging_spec) in [('fixed', {'stream_period_s': args.stream_period_s}),
+                                   ('adaptive', {'stream_period_s': args.stream_period_s,
+                                                 'is_adaptive_flush': True,
+                                                 'stream_period_min_s': 0.25,
+                                                 'stream_period_max_s': args.stream_period_s,
+                                                 'stream_flush_bytes': 1024**2})]:
+    writer_stats = {stats['name']: stats for stats in run_session(args.duration_s, **logging_spec)}
+    for spec in STREAM_SPECS:
+      stats = writer_stats['hdf5:bench/%s/data' % spec['device_name']]
+      rows.append([schedule, spec['device_name'], stats['writes'], stats['queue_depth_max'],
+                   stats['queue_depth_max'] / spec['sampling_rate_hz'], 1e3*stats['write_duration_max_s']])
+  print_table(['schedule', 'stream', 'writes', 'max_backlog', 'max_wait_s', 'max_write_ms'], rows)
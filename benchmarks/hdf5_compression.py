@@ -0,0 +1,109 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+from collections import OrderedDict
+import contextlib
+import io
+import os
+import tempfile
+
+import numpy as np
+from benchmarks.common import SyntheticStream, print_table, run_logger
+from utils.time_utils import get_time
+
+
+##############################################################################################
+# Write throughput and file size of the Logger's HDF5 output per compression filter and chunking policy.
+#   Signals are random walks quantized to a sensor resolution, so the filters see data that compresses like real recordings,
+#   chunks are either sized automatically by `get_hdf5_storage_policy` or fixed for all streams with a storage override.
+# Usage: python -m benchmarks.hdf5_compression [--duration_s N] [--num_repeats N]
+##############################################################################################
+STREAM_SPECS = [
+  {'device_name': 'imu', 'stream_name': 'acceleration', 'data_type': 'float32', 'sample_size': (5, 3), 'sampling_rate_hz': 100},
+  {'device_name': 'imu', 'stream_name': 'counter', 'data_type': 'uint32', 'sample_size': (5,), 'sampling_rate_hz': 100},
+  {'device_name': 'emg', 'stream_name': 'emg', 'data_type': 'float32', 'sample_size': (16,), 'sampling_rate_hz': 2000},
+  {'device_name': 'emg', 'stream_name': 'toa_s', 'data_type': 'float64', 'sample_size': (1,), 'sampling_rate_hz': 2000},
+]
+
+# Compression and chunking policies, as Logger options.
+POLICIES = [
+  ('none', 'auto', {}),
+  ('gzip-1', 'auto', {'hdf5_compression': 'gzip', 'hdf5_compression_level': 1}),
+  ('gzip-4', 'auto', {'hdf5_compression': 'gzip', 'hdf5_compression_level': 4}),
+  ('gzip-1 no shuffle', 'auto', {'hdf5_compression': 'gzip', 'hdf5_compression_level': 1, 'hdf5_shuffle': False}),
+  ('lzf', 'auto', {'hdf5_compression': 'lzf'}),
+  ('blosc', 'auto', {'hdf5_compression': 'blosc'}),
+  ('lz4', 'auto', {'hdf5_compression': 'lz4'}),
+  ('gzip-1', '64', {'hdf5_compression': 'gzip', 'hdf5_storage_overrides': {'bench': {'chunk_length': 64}}}),
+  ('gzip-1', '65536', {'hdf5_compression': 'gzip', 'hdf5_storage_overrides': {'bench': {'chunk_length': 65536}}}),
+]
+
+
+# Streams filled with `duration_s` worth of samples of each stream at its rate.
+def create_streams(duration_s: float, seed: int = 0) -> OrderedDict[str, SyntheticStream]:
+  rng = np.random.default_rng(seed)
+  stream = SyntheticStream(STREAM_SPECS)
+  for spec in STREAM_SPECS:
+    num_samples = int(duration_s * spec['sampling_rate_hz'])
+    if np.dtype(spec['data_type']).kind == 'f' and spec['stream_name'] != 'toa_s':
+      data = np.round(np.cumsum(0.01*rng.standard_normal((num_samples, *spec['sample_size'])), axis=0), 3)
+    else:
+      data = np.arange(num_samples)[:, None] + np.zeros(spec['sample_size'])
+      if spec['stream_name'] == 'toa_s':
+        data = get_time() + data / spec['sampling_rate_hz']
+    for sample in data.astype(spec['data_type']):
+      stream.append_data(process_time_s=get_time(), data={spec['device_name']: {spec['stream_name']: sample}})
+  return OrderedDict([('bench', stream)])
+
+
+# Raw size of all the samples waiting in a Stream, including the process time of each device.
+def get_num_bytes(stream: SyntheticStream) -> int:
+  return sum(stream.get_num_available(device_name=device_name, stream_name=stream_name)
+             * int(np.prod(stream_info['sample_size'])) * np.dtype(stream_info['data_type']).itemsize
+             for (device_name, device_info) in stream.get_stream_info_all().items()
+             for (stream_name, stream_info) in device_info.items())
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='HDF5 write throughput and file size per compression and chunking policy.')
+  parser.add_argument('--duration_s', type=float, default=60.0)
+  parser.add_argument('--num_repeats', type=int, default=3)
+  args = parser.parse_args()
+
+  rows = []
+  for (name, chunk_length, logging_spec) in POLICIES:
+    durations_s = []
+    for _ in range(args.num_repeats):
+      streams = create_streams(args.duration_s)
+      num_bytes = get_num_bytes(streams['bench'])
+      with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the Logger's I/O summary out of the benchmark report.
+        with contextlib.redirect_stdout(io.StringIO()):
+          durations_s.append(run_logger(streams, tmp_dir, stream_hdf5=True, **logging_spec))
+        size_bytes = os.path.getsize(os.path.join(tmp_dir, 'bench.hdf5'))
+    rows.append([name, chunk_length, min(durations_s), num_bytes/1024**2/min(durations_s), size_bytes/1024**2, num_bytes/size_bytes])
+  print_table(['compression', 'chunk_length', 'write_s', 'write_mb/s', 'size_mb', 'ratio'], rows)
@@ -0,0 +1,91 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+from collections import OrderedDict
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+from benchmarks.common import SyntheticStream, fill_stream, print_table
+from handlers.LoggingHandler import Logger
+
+
+##############################################################################################
+# Overhead of SWMR mode on the Logger's HDF5 flushes: chunk-sized dataset growth and publishing the valid lengths after the file flush,
+#   against the regular geometric growth and a single file flush per period.
+# Both Loggers write the same samples and their flushes alternate, so that they see the same load of the machine.
+# Usage: python -m benchmarks.hdf5_swmr [--num_streams N] [--samples_per_flush N] [--num_flushes N]
+##############################################################################################
+def time_flushes(num_streams: int, samples_per_flush: int, num_flushes: int) -> dict[bool, list[float]]:
+  stream_specs = [{'device_name': 'device-%d' % i,
+                   'stream_name': 'data',
+                   'data_type': 'float32',
+                   'sample_size': (16,),
+                   'sampling_rate_hz': 100} for i in range(num_streams)]
+  durations_s: dict[bool, list[float]] = {False: [], True: []}
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    loggers: dict[bool, tuple[Logger, OrderedDict]] = {}
+    for is_swmr in (False, True):
+      streams = OrderedDict([('bench', SyntheticStream(stream_specs))])
+      logger = Logger(log_tag='bench_swmr' if is_swmr else 'bench', log_dir=tmp_dir, log_time_s=0.0, experiment={}, stream_hdf5=True, hdf5_swmr=is_swmr)
+      logger._initialize(streams)
+      logger._start_stream_logging()
+      loggers[is_swmr] = (logger, streams)
+    for i in range(num_flushes):
+      for is_swmr in ((False, True) if i % 2 else (True, False)):
+        (logger, streams) = loggers[is_swmr]
+        fill_stream(streams['bench'], samples_per_flush, seed=i)
+        start_time_s = time.perf_counter()
+        logger._schedule_flush()
+        logger._write_hdf5()
+        durations_s[is_swmr].append(time.perf_counter() - start_time_s)
+    for (logger, _) in loggers.values():
+      logger._stop_stream_logging()
+      # Keep the Logger's I/O summary out of the benchmark report.
+      with contextlib.redirect_stdout(io.StringIO()):
+        logger._close_files()
+      logger._release_thread_pool()
+  return durations_s
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Overhead of SWMR mode on HDF5 flushes.')
+  parser.add_argument('--num_streams', type=int, default=20)
+  parser.add_argument('--samples_per_flush', type=int, default=1000)
+  parser.add_argument('--num_flushes', type=int, default=200)
+  args = parser.parse_args()
+
+  rows = []
+  for (is_swmr, durations_s) in time_flushes(args.num_streams, args.samples_per_flush, args.num_flushes).items():
+    durations_s = np.array(durations_s)
+    rows.append(['swmr' if is_swmr else 'regular', args.num_streams, args.samples_per_flush,
+                 1e3*np.median(durations_s), 1e3*np.percentile(durations_s, 95), 1e3*durations_s.max()])
+  rows.append(['overhead', '', '', rows[1][3]-rows[0][3], rows[1][4]-rows[0][4], rows[1][5]-rows[0][5]])
+  rows.append(['overhead_%', '', '', 100*(rows[1][3]/rows[0][3]-1), 100*(rows[1][4]/rows[0][4]-1), 100*(rows[1][5]/rows[0][5]-1)])
+  print_table(['mode', 'devices', 'samples/flush', 'median_ms', 'p95_ms', 'max_ms'], rows)
@@ -0,0 +1,131 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+from collections import OrderedDict
+import contextlib
+import io
+import os
+import tempfile
+import time
+from typing import Callable
+
+import h5py
+import numpy as np
+from benchmarks.common import SyntheticStream, fill_stream, print_table, run_logger
+from handlers.LoggingHandler import Logger
+from streams.AwindaStream import AwindaStream
+from streams.CometaStream import CometaStream
+from streams.MvnAnalyzeStream import MvnAnalyzeStream
+from streams.Stream import Stream
+
+
+##############################################################################################
+# Bulk vs per-row HDF5 writes of the Logger, on the streams of the wearables at their default rates and sizes.
+#   bulk: the Logger flushing a session's backlog, each stream stacked into one block
+#     and written with a single selection by `Logger._sync_write_hdf5`.
+#   per-row: a plain h5py loop over the same Streams, writing each sample with `dataset[i] = row`
+#     into datasets of the same dtype, shape and chunking as the Logger's, without any Logger scheduling.
+# Usage: python -m benchmarks.hdf5_write [--duration_s N] [--num_repeats N]
+##############################################################################################
+# Movella DOTs in the default 'RateQuantitieswMag' payload mode, see `DotsStream`,
+#   described without the SDK that `DotsStream` imports.
+def create_dots_stream(num_joints: int = 5, sampling_rate_hz: float = 60) -> Stream:
+  return SyntheticStream([*[{'device_name': 'dots-imu', 'stream_name': stream_name, 'data_type': 'float32',
+                             'sample_size': (num_joints, 3), 'sampling_rate_hz': sampling_rate_hz}
+                            for stream_name in ('acceleration', 'gyroscope', 'magnetometer')],
+                          {'device_name': 'dots-imu', 'stream_name': 'timestamp', 'data_type': 'uint32',
+                           'sample_size': (num_joints,), 'sampling_rate_hz': sampling_rate_hz},
+                          {'device_name': 'dots-imu', 'stream_name': 'toa_s', 'data_type': 'float64',
+                           'sample_size': (num_joints,), 'sampling_rate_hz': sampling_rate_hz},
+                          {'device_name': 'dots-imu', 'stream_name': 'counter', 'data_type': 'uint32',
+                           'sample_size': (num_joints,), 'sampling_rate_hz': sampling_rate_hz}])
+
+
+# Streamers of a session, with the sampling rate that sets how many samples each gets per second.
+STREAMERS: list[tuple[str, Callable[[], Stream], float]] = [
+  ('dots', create_dots_stream, 60),
+  ('awinda', lambda: AwindaStream(device_mapping={'joint-%d' % i: str(i) for i in range(7)}), 100),
+  ('emg', lambda: CometaStream(device_mapping={'muscle-%d' % i: str(i) for i in range(16)}), 2000),
+  ('mvn', lambda: MvnAnalyzeStream(mvn_setup='full_body', is_euler=True, is_quaternion=True, is_joint_angles=True, is_com=True), 60),
+]
+
+
+# Best wall time of the Logger writing `duration_s` worth of samples of a streamer to HDF5.
+def time_logger(create_stream: Callable[[], Stream], num_samples: int, num_repeats: int, **logging_spec) -> float:
+  durations_s = []
+  for _ in range(num_repeats):
+    streams = OrderedDict([('bench', create_stream())])
+    fill_stream(streams['bench'], num_samples)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      # Keep the Logger's progress and I/O summary out of the benchmark report.
+      with contextlib.redirect_stdout(io.StringIO()):
+        durations_s.append(run_logger(streams, tmp_dir, **logging_spec))
+  return min(durations_s)
+
+
+# Best wall time of a plain per-sample h5py loop writing `duration_s` worth of samples of a streamer,
+#   from opening until closing the file, like `time_logger`.
+def time_per_row(create_stream: Callable[[], Stream], num_samples: int, num_repeats: int) -> float:
+  durations_s = []
+  for _ in range(num_repeats):
+    stream = create_stream()
+    fill_stream(stream, num_samples)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      # Borrow the Logger's dataset layout, so both sides write the same chunked datasets.
+      #   Datasets are preallocated to the whole stream, the per-row loop is not charged for resizes.
+      logger = Logger(log_tag='bench', log_dir=tmp_dir, log_time_s=0.0, experiment={})
+      logger._hdf5_log_length_increment = num_samples
+      start_time_s = time.perf_counter()
+      with h5py.File(os.path.join(tmp_dir, 'bench.hdf5'), 'w') as hdf5_file:
+        for (device_name, device_info) in stream.get_stream_info_all().items():
+          for (stream_name, stream_info) in device_info.items():
+            if stream_info['is_video'] or stream_info['is_audio']:
+              continue
+            dataset_kwargs = logger._get_hdf5_dataset_kwargs('bench', device_name, stream_name, stream_info)
+            dataset = hdf5_file.create_dataset('/'.join(['bench', device_name, stream_name]), **dataset_kwargs)
+            is_bytes = dataset.dtype.char == 'S'
+            for (i, row) in enumerate(stream.pop_data(device_name=device_name, stream_name=stream_name, is_flush=True)):
+              dataset[i] = row.encode('ascii', 'ignore') if is_bytes and isinstance(row, str) else row
+      durations_s.append(time.perf_counter() - start_time_s)
+  return min(durations_s)
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Bulk vs per-row HDF5 writes of the Logger.')
+  parser.add_argument('--duration_s', type=float, default=5.0)
+  parser.add_argument('--num_repeats', type=int, default=1)
+  args = parser.parse_args()
+
+  rows = []
+  for (name, create_stream, sampling_rate_hz) in STREAMERS:
+    num_samples = int(args.duration_s * sampling_rate_hz)
+    num_streams = sum(len(device_info) for device_info in create_stream().get_stream_info_all().values())
+    bulk_s = time_logger(create_stream, num_samples, args.num_repeats, stream_hdf5=True)
+    per_row_s = time_per_row(create_stream, num_samples, args.num_repeats)
+    rows.append([name, num_streams, num_samples, per_row_s, bulk_s,
+                 num_samples/per_row_s, num_samples/bulk_s, per_row_s/bulk_s])
+  print_table(['streamer', 'streams', 'samples', 'per_row_s', 'bulk_s', 'per_row_samples/s', 'bulk_samples/s', 'speedup'], rows)
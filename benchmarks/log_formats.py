@@ -0,0 +1,90 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import argparse
+from collections import OrderedDict
+import contextlib
+import glob
+import io
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from benchmarks.common import SyntheticStream, fill_stream, print_table, run_logger
+
+
+##############################################################################################
+# Parquet vs HDF5 vs CSV output of the Logger: time to write a session's worth of data,
+#   size on disk, and time to read one stream back with the usual library of each format.
+# Usage: python -m benchmarks.log_formats [--num_samples N] [--num_devices N]
+##############################################################################################
+def create_streams(num_devices: int) -> OrderedDict:
+  return OrderedDict([('bench', SyntheticStream([{'device_name': 'device-%d' % i,
+                                                  'stream_name': 'data',
+                                                  'data_type': 'float32',
+                                                  'sample_size': (16,),
+                                                  'sampling_rate_hz': 100} for i in range(num_devices)]))])
+
+
+def read_stream(log_dir: str, log_format: str) -> np.ndarray:
+  if log_format == 'hdf5':
+    with h5py.File(os.path.join(log_dir, 'bench.hdf5'), 'r') as hdf5_file:
+      return hdf5_file['bench/device-0/data'][:]
+  elif log_format == 'parquet':
+    return np.stack(pq.read_table(os.path.join(log_dir, 'bench_device-0_data.parquet')).column('data').to_numpy(zero_copy_only=False))
+  else:
+    return pd.read_csv(os.path.join(log_dir, 'bench_device-0_data.csv'), index_col=0).to_numpy()
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Parquet vs HDF5 vs CSV Logger outputs.')
+  parser.add_argument('--num_samples', type=int, default=50000)
+  parser.add_argument('--num_devices', type=int, default=4)
+  parser.add_argument('--num_repeats', type=int, default=3)
+  args = parser.parse_args()
+
+  rows = []
+  for log_format in ('hdf5', 'parquet', 'csv'):
+    write_durations_s, read_durations_s = [], []
+    for _ in range(args.num_repeats):
+      streams = create_streams(args.num_devices)
+      fill_stream(streams['bench'], args.num_samples)
+      with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the Logger's I/O summary out of the benchmark report.
+        with contextlib.redirect_stdout(io.StringIO()):
+          write_durations_s.append(run_logger(streams, tmp_dir, **{'stream_%s' % log_format: True}))
+        size_bytes = sum(os.path.getsize(filepath) for filepath in glob.glob(os.path.join(tmp_dir, '*.%s' % log_format)))
+        start_time_s = time.perf_counter()
+        arr = read_stream(tmp_dir, log_format)
+        read_durations_s.append(time.perf_counter() - start_time_s)
+        assert arr.shape == (args.num_samples, 16)
+    rows.append([log_format, args.num_devices*args.num_samples, min(write_durations_s), size_bytes/1024**2, 1e3*min(read_durations_s)])
+  print_table(['format', 'samples', 'write_s', 'size_mb', 'read_stream_ms'], rows)
@@ -0,0 +1,97 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import argparse
+from collections import OrderedDict
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+import zmq
+from benchmarks.common import SyntheticStream, print_table
+from handlers.LoggingHandler import ProcessLoggerHandle, ThreadLoggerHandle
+from utils.msgpack_utils import serialize
+
+
+##############################################################################################
+# Node-side cost of logging in a thread of the Node vs in a dedicated Logger process:
+#   how fast the Node can hand over messages while the Logger writes HDF5 periodically,
+#   and how long until all the data is on disk after the Node stopped.
+# Usage: python -m benchmarks.logger_process [--num_messages N] [--num_devices N]
+##############################################################################################
+def run_handle(mode: str, num_messages: int, num_devices: int, stream_period_s: float) -> tuple[float, float, float]:
+  stream_info = {'stream_specs': [{'device_name': 'device-%d' % i,
+                                   'stream_name': 'data',
+                                   'data_type': 'float32',
+                                   'sample_size': (64,),
+                                   'sampling_rate_hz': 1000} for i in range(num_devices)]}
+  rng = np.random.default_rng(0)
+  payloads = [serialize(process_time_s=float(i), data={'device-%d' % j: {'data': rng.standard_normal(64).astype('float32').tolist()}
+                                                       for j in range(num_devices)})
+              for i in range(min(num_messages, 1000))]
+  ctx = zmq.Context()
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    logging_spec = {'log_dir': tmp_dir, 'log_time_s': 0.0, 'experiment': {}, 'stream_hdf5': True, 'stream_period_s': stream_period_s}
+    # Keep the Logger's I/O summary out of the benchmark report.
+    with contextlib.redirect_stdout(io.StringIO()):
+      if mode == 'thread':
+        logger_handle = ThreadLoggerHandle(log_tag='bench',
+                                           streams=OrderedDict([('bench', SyntheticStream.create_stream(stream_info))]),
+                                           logging_spec=logging_spec)
+      else:
+        logger_handle = ProcessLoggerHandle(log_tag='bench',
+                                            stream_factories=[('bench', SyntheticStream, stream_info)],
+                                            logging_spec=logging_spec,
+                                            ctx=ctx)
+      log_durations_s = np.empty(num_messages)
+      start_time_s = time.perf_counter()
+      for i in range(num_messages):
+        log_start_time_s = time.perf_counter()
+        logger_handle.log('bench', payloads[i % len(payloads)])
+        log_durations_s[i] = time.perf_counter() - log_start_time_s
+      produce_s = time.perf_counter() - start_time_s
+      logger_handle.cleanup()
+      logger_handle.join()
+      total_s = time.perf_counter() - start_time_s
+  ctx.term()
+  return produce_s, 1e6*float(np.percentile(log_durations_s, 99)), total_s
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Thread vs process Logger, seen from the Node.')
+  parser.add_argument('--num_messages', type=int, default=100000)
+  parser.add_argument('--num_devices', type=int, default=8)
+  parser.add_argument('--stream_period_s', type=float, default=0.5)
+  args = parser.parse_args()
+
+  rows = []
+  for mode in ('thread', 'process'):
+    produce_s, log_p99_us, total_s = run_handle(mode, args.num_messages, args.num_devices, args.stream_period_s)
+    rows.append([mode, args.num_messages, produce_s, args.num_messages/produce_s, log_p99_us, total_s])
+  print_table(['mode', 'messages', 'produce_s', 'messages/s', 'log_p99_us', 'until_closed_s'], rows)
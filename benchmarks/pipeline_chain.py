@@ -0,0 +1,188 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+import tempfile
+import threading
+import time
+
+import numpy as np
+import zmq
+from benchmarks.common import print_table
+from nodes.pipelines.FeaturePipeline import FeaturePipeline
+from nodes.pipelines.PipelineChain import PipelineChain
+from utils.msgpack_utils import deserialize, serialize
+from utils.zmq_utils import IP_LOOPBACK
+
+
+##############################################################################################
+# Stages chained in one PipelineChain process vs the same stages as separate Pipelines talking through the Broker,
+#   per input message of 2 kHz EMG blocks, with 1 to `max_num_stages` cascaded FeaturePipeline stages:
+#   the first on the EMG, every next one on the RMS of the previous stage's features.
+#   chained: a PipelineChain built from the stage configs, one hop from the Producer through the Broker,
+#     then the chain's stages pass outputs in memory.
+#   separate: every stage's outputs serialized, PUB, forwarded by an XSUB/XPUB proxy like the Broker's, SUB, deserialized,
+#     before the next stage runs, each stage built from the same config as in the chain.
+# Both run the stages' own `_run_worker` on the same messages, in the same process, so the difference is the transport.
+# Logging is left out: the chain logs once, separate Pipelines each log their inputs and outputs on top of this.
+# Usage: python -m benchmarks.pipeline_chain [--num_messages N] [--max_num_stages N]
+##############################################################################################
+class BrokerProxy:
+  def __init__(self, ctx: zmq.Context) -> None:
+    self._xsub: zmq.SyncSocket = ctx.socket(zmq.XSUB)
+    self._xpub: zmq.SyncSocket = ctx.socket(zmq.XPUB)
+    self.port_backend = self._xsub.bind_to_random_port("tcp://%s" % IP_LOOPBACK)
+    self.port_frontend = self._xpub.bind_to_random_port("tcp://%s" % IP_LOOPBACK)
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+
+  def _run(self) -> None:
+    try:
+      zmq.proxy(self._xsub, self._xpub)
+    except zmq.ContextTerminated:
+      self._xsub.close()
+      self._xpub.close()
+
+
+# One hop through the Broker: a PUB socket of the sender and a SUB socket of the receiver,
+#   subscribed to the topics of this hop only, as the hops share the Broker.
+class BrokerHop:
+  def __init__(self, ctx: zmq.Context, broker: BrokerProxy, hop_id: int) -> None:
+    self._prefix = 'hop-%d/' % hop_id
+    self._pub: zmq.SyncSocket = ctx.socket(zmq.PUB)
+    self._pub.connect("tcp://%s:%d" % (IP_LOOPBACK, broker.port_backend))
+    self._sub: zmq.SyncSocket = ctx.socket(zmq.SUB)
+    self._sub.connect("tcp://%s:%d" % (IP_LOOPBACK, broker.port_frontend))
+    self._sub.subscribe(self._prefix)
+    # Wait until the subscription went through the proxy, so no message is lost.
+    ping = [(self._prefix + 'ping').encode('utf-8'), b'']
+    self._pub.send_multipart(ping)
+    while not self._sub.poll(timeout=100):
+      self._pub.send_multipart(ping)
+    while self._sub.poll(timeout=100):
+      self._sub.recv_multipart()
+
+
+  def __call__(self, topic: str, msg: dict) -> tuple[str, dict]:
+    self._pub.send_multipart([(self._prefix + topic).encode('utf-8'), serialize(**msg)])
+    topic_bytes, payload = self._sub.recv_multipart()
+    return topic_bytes.decode('utf-8')[len(self._prefix):], deserialize(payload)
+
+
+  def close(self) -> None:
+    self._pub.close(linger=0)
+    self._sub.close(linger=0)
+
+
+# Configs of the cascaded stages, as in a PipelineChain config: features of the EMG, then features of the RMS of the previous stage.
+def get_stage_configs(num_stages: int, num_channels: int, sampling_rate_hz: float) -> list[dict]:
+  stages = []
+  input_spec = {'name': 'emg', 'device': 'emg', 'stream': 'emg', 'sampling_rate_hz': sampling_rate_hz, 'num_channels': num_channels, 'is_block': True}
+  window_s, hop_s = 0.2, 0.05
+  for i in range(num_stages):
+    stages.append({'class': 'FeaturePipeline',
+                   'name': 'features-%d' % i,
+                   'input_specs': [input_spec],
+                   'window_s': window_s,
+                   'hop_s': hop_s,
+                   'bands_hz': ((20.0, 150.0),)})
+    # The next stage windows the RMS of this one over 4 hops.
+    input_spec = {'name': 'emg', 'device': 'emg', 'stream': 'rms', 'sampling_rate_hz': 1.0/hop_s, 'num_channels': num_channels, 'is_block': False}
+    window_s, hop_s = 4*hop_s, hop_s
+  return stages
+
+
+# Processes the messages with the chain's own worker, as `PipelineChain._process_data` does, without publishing and logging.
+def time_chained(stages: list[dict], msgs: list[dict], hop: BrokerHop) -> tuple[np.ndarray, int]:
+  with tempfile.TemporaryDirectory() as log_dir:
+    chain = PipelineChain(host_ip=IP_LOOPBACK,
+                          stages=stages,
+                          logging_spec={'log_dir': log_dir, 'log_time_s': 0.0, 'experiment': {}},
+                          stream_specs=[])
+    latencies_s = np.empty(len(msgs))
+    num_outputs = 0
+    for (i, msg) in enumerate(msgs):
+      start_time_s = time.perf_counter()
+      topic, msg = hop('emg', msg)
+      # Minus the chain's own stage timing output.
+      num_outputs += len(chain._run_worker(chain._worker, topic, msg)) - 1
+      latencies_s[i] = time.perf_counter() - start_time_s
+    chain._logger.cleanup()
+    chain._logger.join()
+  return latencies_s, num_outputs
+
+
+def time_separate(stages: list[dict], msgs: list[dict], hops: list[BrokerHop]) -> tuple[np.ndarray, int]:
+  workers = [FeaturePipeline._create_worker(FeaturePipeline._get_stage_specs(**stage)[0]) for stage in stages]
+  latencies_s = np.empty(len(msgs))
+  num_outputs = 0
+  for (i, msg) in enumerate(msgs):
+    start_time_s = time.perf_counter()
+    stage_msgs = [hops[0]('emg', msg)]
+    for (stage, worker, hop) in zip(stages, workers, hops[1:] + [None]):
+      stage_outputs = [output for (topic, stage_msg) in stage_msgs for output in FeaturePipeline._run_worker(worker, topic, stage_msg)]
+      if hop is None:
+        num_outputs += len(stage_outputs)
+      else:
+        # Each separate Pipeline publishes under its own name.
+        stage_msgs = [hop(stage['name'], kwargs) for (_, kwargs) in stage_outputs]
+    latencies_s[i] = time.perf_counter() - start_time_s
+  return latencies_s, num_outputs
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Chained in-process vs separate Pipelines through the Broker.')
+  parser.add_argument('--num_messages', type=int, default=2000)
+  parser.add_argument('--num_channels', type=int, default=8)
+  parser.add_argument('--block_len', type=int, default=100, help='EMG samples per message, one hop of the first stage by default')
+  parser.add_argument('--max_num_stages', type=int, default=3)
+  args = parser.parse_args()
+
+  sampling_rate_hz = 2000
+  rng = np.random.default_rng(0)
+  msgs = [{'process_time_s': float(i), 'data': {'emg': {'emg': rng.standard_normal((args.block_len, args.num_channels))}}}
+          for i in range(args.num_messages)]
+
+  ctx = zmq.Context()
+  broker = BrokerProxy(ctx)
+  hops = [BrokerHop(ctx, broker, hop_id) for hop_id in range(args.max_num_stages)]
+  # Warm up the sockets and the proxy, the first configuration timed would pay for it otherwise.
+  for hop in hops:
+    for msg in msgs[:500]:
+      hop('emg', msg)
+  rows = []
+  for num_stages in range(1, args.max_num_stages+1):
+    stages = get_stage_configs(num_stages, args.num_channels, sampling_rate_hz)
+    for (mode, (latencies_s, num_outputs)) in [('chained', time_chained(stages, msgs, hops[0])),
+                                               ('separate', time_separate(stages, msgs, hops[:num_stages]))]:
+      latencies_us = 1e6*latencies_s
+      rows.append([num_stages, mode, num_outputs, float(np.mean(latencies_us)), float(np.median(latencies_us)),
+                   float(np.percentile(latencies_us, 99)), args.num_messages/latencies_s.sum()])
+  for hop in hops:
+    hop.close()
+  ctx.term()
+  print_table(['num_stages', 'mode', 'num_outputs', 'mean_us', 'median_us', 'p99_us', 'msgs/s'], rows)
@@ -0,0 +1,107 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+import os
+import time
+
+import numpy as np
+import zmq
+from benchmarks.common import print_table
+from handlers.PipelinePoolHandler import PipelineWorkerPool
+from nodes.pipelines.FeaturePipeline import FeaturePipeline
+
+
+##############################################################################################
+# Throughput of a Pipeline's processing vs the number of worker processes it runs in,
+#   on the windowed features of FeaturePipeline over blocks of multi-device 2 kHz EMG, one device per message.
+#   in-process: `_run_worker` called in the Pipeline's own process, what `num_workers: 1` does.
+#   N workers: the same messages through the `PipelineWorkerPool`, routed by device, outputs merged back in input order.
+# Each configuration runs on the same messages, after the pool started (the workers' startup is not timed).
+# Usage: python -m benchmarks.pipeline_pool [--num_messages N] [--block_len N] [--num_devices N]
+##############################################################################################
+def create_messages(num_messages: int, num_devices: int, block_len: int, num_channels: int) -> list[dict]:
+  rng = np.random.default_rng(0)
+  blocks = [rng.standard_normal((block_len, num_channels)).tolist() for _ in range(16)]
+  return [{'process_time_s': float(i), 'data': {'emg-%d' % (i % num_devices): {'emg': blocks[i % len(blocks)]}}}
+          for i in range(num_messages)]
+
+
+def time_in_process(worker_spec: dict, msgs: list[dict]) -> tuple[float, int]:
+  worker = FeaturePipeline._create_worker(worker_spec)
+  num_outputs = 0
+  start_time_s = time.perf_counter()
+  for msg in msgs:
+    num_outputs += len(FeaturePipeline._run_worker(worker, 'emg', msg))
+  return time.perf_counter() - start_time_s, num_outputs
+
+
+def time_pool(worker_spec: dict, msgs: list[dict], num_workers: int) -> tuple[float, int]:
+  ctx = zmq.Context()
+  pool = PipelineWorkerPool(FeaturePipeline, worker_spec, num_workers=num_workers, ctx=ctx, routing='device')
+  num_outputs = 0
+  start_time_s = time.perf_counter()
+  for msg in msgs:
+    num_outputs += len(pool.submit('emg', msg)) + len(pool.collect())
+  num_outputs += len(pool.drain())
+  duration_s = time.perf_counter() - start_time_s
+  pool.close()
+  ctx.term()
+  return duration_s, num_outputs
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Pipeline throughput vs number of worker processes.')
+  parser.add_argument('--num_messages', type=int, default=4000)
+  parser.add_argument('--num_devices', type=int, default=8)
+  parser.add_argument('--num_channels', type=int, default=16)
+  parser.add_argument('--block_len', type=int, default=200, help='EMG samples per message')
+  parser.add_argument('--max_num_workers', type=int, default=8)
+  args = parser.parse_args()
+
+  sampling_rate_hz = 2000
+  worker_spec, _ = FeaturePipeline._get_stage_specs(input_specs=[{'name': 'emg-%d' % i,
+                                                                  'device': 'emg-%d' % i,
+                                                                  'stream': 'emg',
+                                                                  'sampling_rate_hz': sampling_rate_hz,
+                                                                  'num_channels': args.num_channels,
+                                                                  'is_block': True} for i in range(args.num_devices)],
+                                                    window_s=0.2,
+                                                    hop_s=0.05,
+                                                    bands_hz=((20.0, 150.0), (150.0, 450.0)))
+  msgs = create_messages(args.num_messages, args.num_devices, args.block_len, args.num_channels)
+
+  rows = []
+  in_process_s, num_outputs = time_in_process(worker_spec, msgs)
+  rows.append(['in-process', num_outputs, args.num_messages/in_process_s, 1.0])
+  num_workers = 2
+  while num_workers <= args.max_num_workers:
+    duration_s, num_outputs = time_pool(worker_spec, msgs, num_workers)
+    rows.append(['%d workers' % num_workers, num_outputs, args.num_messages/duration_s, in_process_s/duration_s])
+    num_workers *= 2
+  # Workers only pay off with cores to spare for them.
+  print('%d CPU cores.' % os.cpu_count(), flush=True)
+  print_table(['mode', 'num_outputs', 'msgs/s', 'speedup'], rows)
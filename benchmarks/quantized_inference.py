@@ -0,0 +1,82 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+
+import numpy as np
+import torch
+from benchmarks.common import print_table
+from pytorch_tcn import TCN
+from utils.ai_utils import load_session_inputs
+from utils.inference_utils import DEFAULT_TCN_KWARGS, compare_streaming_models
+from utils.tcn_utils import StreamingTCN, quantize_streaming_tcn
+
+
+##############################################################################################
+# Int8 quantized vs. float streaming inference of the FOG-detection TCN, replayed over a recorded session.
+# The DOTs IMU data of the HDF5 recording goes through the same preprocessing as live data in the PytorchWorker.
+#   dynamic: int8 weights, activations quantized on the fly, no calibration.
+#   static: int8 weights and activations, calibrated on the first `num_calibration_steps` of the session.
+# Both are evaluated on the rest of the session, so static quantization is not scored on its own calibration data:
+#   per-step latency, serialized weight size, agreement of the predicted classes and deviation of the logits.
+# Usage: python -m benchmarks.quantized_inference --model_path MODEL.pt --hdf5_path SESSION.hdf5
+##############################################################################################
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Int8 quantized vs. float streaming TCN inference over a recorded session.')
+  parser.add_argument('--model_path', type=str, required=True, help='state dict of the TCN, with the architecture of `DEFAULT_TCN_KWARGS`')
+  parser.add_argument('--hdf5_path', type=str, required=True, help='recorded session with the DOTs IMU data')
+  parser.add_argument('--sampling_rate_hz', type=float, default=60)
+  parser.add_argument('--num_channels', type=int, default=6, help='channels per IMU: acceleration and gyroscope')
+  parser.add_argument('--num_calibration_steps', type=int, default=6000)
+  parser.add_argument('--num_threads', type=int, default=1)
+  args = parser.parse_args()
+
+  torch.set_num_threads(args.num_threads)
+  torch.set_grad_enabled(False)
+  num_inputs = DEFAULT_TCN_KWARGS['num_inputs']
+  inputs = torch.from_numpy(load_session_inputs(args.hdf5_path,
+                                                input_size=(num_inputs//args.num_channels, args.num_channels),
+                                                sampling_rate_hz=args.sampling_rate_hz))
+  if len(inputs) <= args.num_calibration_steps:
+    raise ValueError('The session has %d steps, not enough to calibrate on %d and evaluate on the rest.' % (len(inputs), args.num_calibration_steps))
+  calibration_inputs, evaluation_inputs = inputs[:args.num_calibration_steps], inputs[args.num_calibration_steps:]
+
+  model = TCN(**DEFAULT_TCN_KWARGS)
+  model.load_state_dict(torch.load(args.model_path, map_location='cpu', weights_only=True))
+  model.eval()
+  engine = StreamingTCN(model)
+
+  rows = []
+  for mode in ['dynamic', 'static']:
+    quantized = quantize_streaming_tcn(engine, mode, calibration_inputs)
+    report = compare_streaming_models(engine, quantized, evaluation_inputs)
+    rows.append([mode, len(evaluation_inputs),
+                 1000*report['reference_latency_mean_s'], 1000*report['candidate_latency_mean_s'],
+                 1000*report['reference_latency_p95_s'], 1000*report['candidate_latency_p95_s'],
+                 report['reference_size_bytes']/1024, report['candidate_size_bytes']/1024,
+                 100*report['agreement'], report['logits_max_abs_error'], report['logits_mean_abs_error']])
+  print_table(['mode', 'num_steps', 'float_mean_ms', 'int8_mean_ms', 'float_p95_ms', 'int8_p95_ms',
+               'float_kib', 'int8_kib', 'agreement_%', 'logits_max_err', 'logits_mean_err'], rows)
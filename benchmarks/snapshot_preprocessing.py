@@ -0,0 +1,86 @@
+############
+#
+# Copyright (c) 2025 Vayalet Stefanova and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2025 for AidWear, AidFOG, and RevalExo projects of KU Leuven.
+#
+# ############
+
+import argparse
+import time
+
+import numpy as np
+from benchmarks.common import print_table
+from utils.ai_utils import SnapshotNormalizer, init_iir_filter, normalize
+
+
+##############################################################################################
+# Per-snapshot latency of the PytorchWorker preprocessing on the same IMU snapshots.
+#   per-sensor: the previous path, `normalize` called for every present sensor of the snapshot in turn,
+#     high-pass filtering its accelerometer one channel and one sample at a time with `lfilter`.
+#   snapshot: `SnapshotNormalizer`, filtering and normalizing all the sensors of the snapshot at once.
+# Sensors are missing (NaN) from a fraction of the snapshots, like the DOTs occasionally are.
+# Usage: python -m benchmarks.snapshot_preprocessing [--num_snapshots N] [--missing_fraction F]
+##############################################################################################
+def time_per_sensor(snapshots: np.ndarray, fs: float) -> np.ndarray:
+  b, a, zi = init_iir_filter(fs=fs, cutoff_hz=0.3, order=4, num_channels=snapshots.shape[2])
+  mean = np.zeros(snapshots.shape[2], dtype=np.float32)
+  var = np.ones(snapshots.shape[2], dtype=np.float32)
+  count = 0
+  buffer = np.zeros(snapshots.shape[1:], dtype=np.float32)
+  latencies_s = np.empty(len(snapshots))
+  for (t, snapshot) in enumerate(snapshots):
+    start_time_s = time.perf_counter()
+    for i, sensor_sample in enumerate(snapshot):
+      if all(map(lambda el: not np.isnan(el), sensor_sample)):
+        buffer[i], zi, count, mean, var = normalize(sensor_sample, b, a, zi, count, mean, var)
+    latencies_s[t] = time.perf_counter() - start_time_s
+  return latencies_s
+
+
+def time_snapshot(snapshots: np.ndarray, fs: float) -> np.ndarray:
+  normalizer = SnapshotNormalizer(num_sensors=snapshots.shape[1], fs=fs, cutoff_hz=0.3, order=4, num_channels=snapshots.shape[2])
+  buffer = np.zeros(snapshots.shape[1:], dtype=np.float32)
+  latencies_s = np.empty(len(snapshots))
+  for (t, snapshot) in enumerate(snapshots):
+    start_time_s = time.perf_counter()
+    norm_snapshot, is_valid = normalizer(snapshot)
+    buffer[is_valid] = norm_snapshot[is_valid]
+    latencies_s[t] = time.perf_counter() - start_time_s
+  return latencies_s
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Per-sensor vs whole-snapshot preprocessing latency of the PytorchWorker.')
+  parser.add_argument('--num_snapshots', type=int, default=6000)
+  parser.add_argument('--sampling_rate_hz', type=float, default=60)
+  parser.add_argument('--missing_fraction', type=float, default=0.05)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(0)
+  rows = []
+  for num_sensors in [1, 5, 10, 20]:
+    snapshots = rng.standard_normal((args.num_snapshots, num_sensors, 6)).astype(np.float32)
+    snapshots[rng.random((args.num_snapshots, num_sensors)) < args.missing_fraction] = np.nan
+    for (mode, time_fn) in [('per-sensor', time_per_sensor), ('snapshot', time_snapshot)]:
+      latencies_us = 1e6*time_fn(snapshots, args.sampling_rate_hz)
+      rows.append([num_sensors, mode, float(np.mean(latencies_us)), float(np.median(latencies_us)), float(np.percentile(latencies_us, 99))])
+  print_table(['num_sensors', 'mode', 'mean_us', 'median_us', 'p99_us'], rows)
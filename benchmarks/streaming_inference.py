@@ -0,0 +1,85 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+import time
+
+import numpy as np
+import torch
+from benchmarks.common import print_table
+from pytorch_tcn import TCN
+from utils.inference_utils import DEFAULT_TCN_KWARGS
+from utils.tcn_utils import StreamingTCN
+
+
+##############################################################################################
+# Per-step latency of causal TCN inference as the receptive field grows, one input column at a time,
+#   with the architecture of the FOG-detection TCN and its dilations scaled up, so only the receptive field changes.
+#   streaming: `StreamingTCN`, the convolution states cached in ring buffers, what PytorchWorker runs.
+#   inference-mode: the library's own `TCN(..., inference=True)` buffered inference, the previous path.
+#   full-window: the whole receptive field re-run at every step, like the exported TorchScript/ONNX backends.
+# The `inference_latency_s` the PytorchWorker publishes is the streaming step: it should stay flat down the table.
+# Usage: python -m benchmarks.streaming_inference [--num_steps N]
+##############################################################################################
+def time_steps(step_fn, inputs: torch.Tensor) -> np.ndarray:
+  latencies_s = np.empty(len(inputs))
+  with torch.no_grad():
+    for (t, x) in enumerate(inputs):
+      start_time_s = time.perf_counter()
+      step_fn(x)
+      latencies_s[t] = time.perf_counter() - start_time_s
+  # Drop the first steps, while allocations and lazy initialization settle.
+  return latencies_s[len(inputs)//10:]
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Per-step latency of causal TCN inference vs. receptive field.')
+  parser.add_argument('--num_steps', type=int, default=1000)
+  args = parser.parse_args()
+
+  torch.set_num_threads(1)
+  torch.manual_seed(0)
+  rows = []
+  num_inputs = DEFAULT_TCN_KWARGS['num_inputs']
+  for dilation_scale in [1, 4, 16, 64]:
+    dilations = [dilation_scale * 2**i for i in range(len(DEFAULT_TCN_KWARGS['num_channels']))]
+    model = TCN(**DEFAULT_TCN_KWARGS, dilations=dilations).eval()
+    engine = StreamingTCN(model)
+    inputs = torch.randn(args.num_steps, num_inputs)
+    window = torch.zeros(1, num_inputs, engine.receptive_field)
+
+    def step_full_window(x: torch.Tensor) -> torch.Tensor:
+      window[0] = torch.roll(window[0], -1, dims=1)
+      window[0, :, -1] = x
+      return model(window)[0, :, -1]
+
+    model.reset_buffers()
+    for (mode, step_fn) in [('streaming', engine.step),
+                            ('inference-mode', lambda x: model(x[None, :, None], inference=True)),
+                            ('full-window', step_full_window)]:
+      latencies_us = 1e6*time_steps(step_fn, inputs)
+      rows.append([engine.receptive_field, mode, float(np.mean(latencies_us)), float(np.median(latencies_us)), float(np.percentile(latencies_us, 99))])
+  print_table(['receptive_field', 'mode', 'mean_us', 'median_us', 'p99_us'], rows)
@@ -0,0 +1,125 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import argparse
+from collections import OrderedDict
+import contextlib
+import glob
+import io
+import os
+import resource
+import tempfile
+
+import cv2
+import numpy as np
+import yaml
+from benchmarks.common import print_table, run_logger
+from streams.EyeStream import EyeStream
+from utils.codec_utils import FALLBACK_VIDEO_CODECS
+from utils.types import VideoCodecDict
+
+
+##############################################################################################
+# CPU cost of recording the Pupil Core world camera in JPEG, muxed as-is vs decoded and re-encoded by FFmpeg.
+#   passthrough: the Logger's `PassthroughVideoFeeder`, the JPEG packets go into the MKV without decoding.
+#   re-encode: the Logger's FFmpeg pipe with the configured video codec, as with `video_passthrough` off.
+# Packets are synthetic JPEG frames of a moving gradient with some noise, at the world camera's resolution and rate.
+# CPU time includes the Logger's own threads and the FFmpeg subprocess.
+# Usage: python -m benchmarks.video_passthrough [--num_frames N] [--codec_config_filepath PATH]
+##############################################################################################
+def create_world_stream(width: int, height: int, fps: float) -> EyeStream:
+  return EyeStream(is_binocular=False,
+                   is_stream_video_world=True,
+                   is_stream_video_eye=False,
+                   is_stream_fixation=False,
+                   is_stream_blinks=False,
+                   gaze_estimate_stale_s=0.2,
+                   shape_video_world=(height, width, 3),
+                   shape_video_eye0=(192, 192, 3),
+                   shape_video_eye1=(192, 192, 3),
+                   fps_video_world=fps,
+                   fps_video_eye0=120.0,
+                   fps_video_eye1=120.0,
+                   pixel_format='jpeg')
+
+
+# A short loop of distinct JPEG frames, cycled through to make up the recording.
+def create_jpeg_packets(width: int, height: int, num_distinct: int = 30) -> list[bytes]:
+  rng = np.random.default_rng(0)
+  base = (np.arange(width)[None, :, None] + np.arange(height)[:, None, None] + np.zeros(3)[None, None, :])
+  packets = []
+  for i in range(num_distinct):
+    frame = ((base + 8*i) % 256 + rng.integers(0, 8, (height, width, 3))).astype(np.uint8)
+    packets.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+  return packets
+
+
+# CPU seconds of this process and its waited-for children so far.
+def get_cpu_time_s() -> float:
+  usage_self = resource.getrusage(resource.RUSAGE_SELF)
+  usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+  return usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime
+
+
+# Wall time, CPU time and file size of the Logger recording `num_frames` packets of the world camera.
+def record(packets: list[bytes], num_frames: int, width: int, height: int, fps: float, **logging_spec) -> tuple[float, float, int]:
+  stream = create_world_stream(width, height, fps)
+  for i in range(num_frames):
+    stream.append_data(process_time_s=i/fps, data={'eye-video-world': {'frame': (packets[i % len(packets)], True, i)}})
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    start_cpu_time_s = get_cpu_time_s()
+    # Keep the Logger's and FFmpeg's reports out of the benchmark report.
+    with contextlib.redirect_stdout(io.StringIO()):
+      duration_s = run_logger(OrderedDict([('eye', stream)]), tmp_dir, stream_video=True, **logging_spec)
+    cpu_time_s = get_cpu_time_s() - start_cpu_time_s
+    size_bytes = sum(os.path.getsize(filepath) for filepath in glob.glob(os.path.join(tmp_dir, '*.mkv')))
+  return duration_s, cpu_time_s, size_bytes
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='CPU cost of JPEG passthrough vs re-encoding of the world camera.')
+  parser.add_argument('--num_frames', type=int, default=900)
+  parser.add_argument('--width', type=int, default=1280)
+  parser.add_argument('--height', type=int, default=720)
+  parser.add_argument('--fps', type=float, default=30.0)
+  parser.add_argument('--codec_config_filepath', type=str, default=None,
+                      help='codec spec of the re-encode path, one of resources/codecs, defaults to libx264')
+  args = parser.parse_args()
+
+  video_codec: VideoCodecDict = FALLBACK_VIDEO_CODECS[0]
+  if args.codec_config_filepath is not None:
+    with open(args.codec_config_filepath, 'r') as f:
+      video_codec = yaml.safe_load(f)
+  packets = create_jpeg_packets(args.width, args.height)
+
+  rows = []
+  for (mode, logging_spec) in [('passthrough', {'video_passthrough': True}),
+                               ('re-encode %s' % video_codec['codec_name'], {'video_passthrough': False, 'video_codec': video_codec})]:
+    duration_s, cpu_time_s, size_bytes = record(packets, args.num_frames, args.width, args.height, args.fps, **logging_spec)
+    rows.append([mode, args.num_frames, duration_s, cpu_time_s, 1e3*cpu_time_s/args.num_frames,
+                 args.fps*cpu_time_s/args.num_frames, size_bytes/1024**2])
+  rows.append(['saved', '', rows[1][2]-rows[0][2], rows[1][3]-rows[0][3], rows[1][4]-rows[0][4], rows[1][5]-rows[0][5], ''])
+  print_table(['mode', 'frames', 'wall_s', 'cpu_s', 'cpu_ms/frame', 'cpu_cores@fps', 'size_mb'], rows)
@@ -0,0 +1,193 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from fractions import Fraction
+from typing import Any
+import queue
+import threading
+
+import numpy as np
+from handlers.VideoFeederHandler import VIDEO_BACKLOG_POLICIES
+from utils.types import VideoCodecDict
+
+try:
+  import av
+except ImportError as e:
+  print(e, "\nPyAV not installed, will crash if you configure edge encoding of video.", flush=True)
+
+
+# Software encoders to fall back to on hosts without the configured (hardware) encoder, i.e. a GPU-less Linux box.
+SOFTWARE_CODECS: dict[str, VideoCodecDict] = {
+  'h264': {'codec_name': 'libx264',
+           'pix_format': 'yuv420p',
+           'input_options': {},
+           'output_options': {'preset': 'ultrafast', 'tune': 'zerolatency'}},
+  'jpeg': {'codec_name': 'mjpeg',
+           'pix_format': 'yuvj420p',
+           'input_options': {},
+           'output_options': {'qscale': '3'}},
+}
+
+
+# Encodes raw frames of a single camera on the edge, in a background thread.
+# Frames are encoded with the codec of one of the `resources/codecs` specs through libav (PyAV),
+#   or with the software fallback of the chosen encoding if that codec is not available on the host.
+# B-frames are disabled, so every packet comes out in input order, right after its frame, 
+#   and carries the frame index of the source frame as its PTS.
+# Encoded packets are put into the shared output queue as (device name, packet bytes, is keyframe, frame index).
+# Raw frames wait for the encoder in a bounded queue, with the same backlog policies as the Logger's `VideoFeeder`:
+#   'block' back-pressures the capture loop, 'drop' discards and counts the new frame.
+#   If encoding fails, the error is recorded and all later frames are dropped, so the capture loop never blocks on a dead encoder.
+class EdgeVideoEncoder:
+  def __init__(self,
+               device_name: str,
+               width: int,
+               height: int,
+               fps: float,
+               input_pix_fmt: str,
+               encoding: str,
+               output_queue: queue.Queue,
+               video_codec: VideoCodecDict | None = None,
+               gop_size: int = 30,
+               max_queue_len: int = 60,
+               backlog_policy: str = 'block'):
+    if encoding not in SOFTWARE_CODECS:
+      raise ValueError("Unsupported edge encoding '%s', must be one of %s." % (encoding, tuple(SOFTWARE_CODECS.keys())))
+    if backlog_policy not in VIDEO_BACKLOG_POLICIES:
+      raise ValueError("Unsupported edge backlog policy '%s', must be one of %s." % (backlog_policy, VIDEO_BACKLOG_POLICIES))
+    self._device_name = device_name
+    self._width = width
+    self._height = height
+    self._input_pix_fmt = input_pix_fmt
+    self._output_queue = output_queue
+    self._input_queue: queue.Queue[tuple[bytes, int] | None] = queue.Queue(maxsize=max_queue_len)
+    self._is_drop = backlog_policy == 'drop'
+    self._num_frames_dropped: int = 0
+    self._num_frames_lost: int = 0 # queued frames discarded by the encoder thread after encoding failed
+    self._error: Exception | None = None
+
+    try:
+      if video_codec is None:
+        raise ValueError('No codec spec provided.')
+      self._codec_ctx = self._open_codec(video_codec, width, height, fps, gop_size)
+    except (ValueError, av.FFmpegError) as e:
+      print("%s edge encoder falls back to %s: %s" % (device_name, SOFTWARE_CODECS[encoding]['codec_name'], e), flush=True)
+      self._codec_ctx = self._open_codec(SOFTWARE_CODECS[encoding], width, height, fps, gop_size)
+
+    self._encoder_thread = threading.Thread(target=self._encode)
+    self._encoder_thread.start()
+
+
+  # Translates a codec spec of `resources/codecs` into an opened libav encoder context.
+  #   FFmpeg CLI-only options (filters, stream specifiers) do not apply to a bare encoder and are skipped.
+  def _open_codec(self,
+                  video_codec: VideoCodecDict,
+                  width: int,
+                  height: int,
+                  fps: float,
+                  gop_size: int) -> Any:
+    codec_ctx = av.CodecContext.create(video_codec['codec_name'], 'w')
+    codec_ctx.width = width
+    codec_ctx.height = height
+    codec_ctx.pix_fmt = video_codec['pix_format']
+    codec_ctx.framerate = Fraction(fps).limit_denominator(1001)
+    codec_ctx.time_base = 1 / codec_ctx.framerate
+    codec_ctx.gop_size = gop_size
+    codec_ctx.max_b_frames = 0
+    options: dict[str, str] = {}
+    for (key, value) in video_codec['output_options'].items():
+      if key == 'video_bitrate':
+        value = str(value)
+        unit = {'K': 1e3, 'M': 1e6, 'G': 1e9}.get(value[-1].upper())
+        codec_ctx.bit_rate = int(float(value[:-1]) * unit) if unit is not None else int(float(value))
+      elif key != 'filter_complex':
+        options[key.split(':')[0]] = str(value)
+    codec_ctx.options = options
+    codec_ctx.open()
+    return codec_ctx
+
+
+  # Hand a raw frame off to the encoder thread, according to the backlog policy.
+  # Returns whether the frame was accepted, a dropped frame never comes out as a packet.
+  def put(self, frame_buffer: bytes, frame_index: int) -> bool:
+    if self._error is not None:
+      self._num_frames_dropped += 1
+      return False
+    if self._is_drop:
+      try:
+        self._input_queue.put_nowait((frame_buffer, frame_index))
+      except queue.Full:
+        self._num_frames_dropped += 1
+        return False
+    else:
+      self._input_queue.put((frame_buffer, frame_index))
+    return True
+
+
+  # Encode queued frames until the None sentinel.
+  # After a failure, keeps draining the queue without encoding, so a `put` waiting for room is released.
+  def _encode(self) -> None:
+    while (item := self._input_queue.get()) is not None:
+      if self._error is not None:
+        self._num_frames_lost += 1
+        continue
+      frame_buffer, frame_index = item
+      try:
+        img = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(self._height, self._width, -1).squeeze()
+        frame = av.VideoFrame.from_ndarray(img, format=self._input_pix_fmt).reformat(format=self._codec_ctx.pix_fmt)
+        frame.pts = int(frame_index)
+        self._put_packets(self._codec_ctx.encode(frame))
+      except Exception as e:
+        self._error = e
+        self._num_frames_lost += 1
+        print("%s edge encoder failed, dropping all further frames: %r" % (self._device_name, e), flush=True)
+    # Drain the packets still buffered in the encoder.
+    if self._error is None:
+      self._put_packets(self._codec_ctx.encode(None))
+
+
+  def _put_packets(self, packets: list) -> None:
+    for packet in packets:
+      self._output_queue.put((self._device_name, bytes(packet), bool(packet.is_keyframe), int(packet.pts)))
+
+
+  # Encode all the remaining frames and flush the encoder.
+  def close(self) -> None:
+    self._input_queue.put(None)
+    self._encoder_thread.join()
+    if self._num_frames_dropped or self._num_frames_lost:
+      print("%s edge encoder dropped %d frames" % (self._device_name, self._num_frames_dropped + self._num_frames_lost), flush=True)
+
+
+  # Number of frames that were not encoded, because the queue was full or the encoder failed.
+  def get_num_frames_dropped(self) -> int:
+    return self._num_frames_dropped + self._num_frames_lost
+
+
+  # The error that stopped the encoder, if any.
+  def get_error(self) -> Exception | None:
+    return self._error
@@ -0,0 +1,152 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from multiprocessing import Process, Queue
+from queue import Empty, Full
+from typing import Any
+import traceback
+
+import h5py
+import numpy as np
+
+
+# Raised on the Logger side of a shard once its process died, with the error that the shard process reported.
+class HDF5ShardError(RuntimeError):
+  pass
+
+
+# Writes the datasets of one streamer into its own HDF5 file, from a dedicated process.
+# HDF5 (and h5py) serialize all library calls behind a global lock, so threads can't write several files in parallel,
+#   but separate processes each with their own library instance can.
+# The Logger stacks the new samples of each dataset and sends them over a bounded queue,
+#   the shard process appends them to its datasets (growing them geometrically), and trims them on close.
+# Waiting for room in the queue is done in steps of `poll_period_s`, checking in between that the shard process is alive,
+#   so a crashed shard raises `HDF5ShardError` instead of blocking the Logger forever.
+class HDF5Shard:
+  def __init__(self,
+               filepath: str,
+               dataset_specs: list[tuple[str, dict[str, Any]]],
+               max_queue_len: int = 64,
+               poll_period_s: float = 1.0):
+    self.filepath = filepath
+    self._poll_period_s = poll_period_s
+    self._queue: Queue = Queue(maxsize=max_queue_len)
+    self._error_queue: Queue = Queue(maxsize=1)
+    self._error: str | None = None
+    self._process = Process(target=run_hdf5_shard, args=(filepath, dataset_specs, self._queue, self._error_queue))
+    self._process.start()
+
+
+  # Append samples, shaped (num_samples, *sample_size), to a dataset of the shard.
+  def write(self, dataset_path: str, arr: np.ndarray) -> None:
+    self._put(('write', dataset_path, arr))
+
+
+  def flush(self) -> None:
+    self._put(('flush', None, None))
+
+
+  # Add attributes to objects of the shard, by path ('/' for the file itself), skipping paths that don't exist in it.
+  def update_metadata(self, metadata: dict[str, dict[str, str]]) -> None:
+    self._put(('metadata', None, metadata))
+
+
+  # Let the shard process write out the queued data, trim the datasets and close the file.
+  def close(self) -> None:
+    self._put(None)
+    self._process.join()
+    if self._process.exitcode != 0:
+      self._raise_error()
+
+
+  # Hand a command to the shard process, waiting for room in the queue only while the process is alive.
+  def _put(self, command: tuple[str, str | None, Any] | None) -> None:
+    while True:
+      if not self._process.is_alive():
+        self._raise_error()
+      try:
+        self._queue.put(command, timeout=self._poll_period_s)
+        return
+      except Full:
+        continue
+
+
+  def _raise_error(self) -> None:
+    if self._error is None:
+      try:
+        self._error = self._error_queue.get(timeout=self._poll_period_s)
+      except Empty:
+        self._error = 'exited with code %s' % self._process.exitcode
+      # Nobody reads the queued commands anymore, don't wait for them to be flushed into the pipe on exit.
+      self._queue.cancel_join_thread()
+    raise HDF5ShardError("HDF5 shard %s failed: %s" % (self.filepath, self._error))
+
+
+# Entry-point of the shard process.
+# Reports the error that stops the shard to the Logger, before exiting with it.
+# @param dataset_specs are (dataset path, keyword arguments of `h5py.Group.create_dataset`) tuples.
+def run_hdf5_shard(filepath: str,
+                   dataset_specs: list[tuple[str, dict[str, Any]]],
+                   queue: Queue,
+                   error_queue: Queue) -> None:
+  try:
+    write_hdf5_shard(filepath, dataset_specs, queue)
+  except Exception:
+    error_queue.put(traceback.format_exc())
+    raise
+
+
+# Creates the datasets of the shard and executes the commands from the Logger until the None sentinel.
+def write_hdf5_shard(filepath: str,
+                     dataset_specs: list[tuple[str, dict[str, Any]]],
+                     queue: Queue) -> None:
+  with h5py.File(filepath, 'w', libver='earliest') as hdf5_file:
+    lengths: dict[str, int] = dict()
+    for (dataset_path, dataset_kwargs) in dataset_specs:
+      hdf5_file.create_dataset(dataset_path, **dataset_kwargs)
+      lengths[dataset_path] = 0
+    while (command := queue.get()) is not None:
+      command_name, dataset_path, args = command
+      if command_name == 'write':
+        dataset: h5py.Dataset = hdf5_file[dataset_path] # type: ignore
+        start_index = lengths[dataset_path]
+        end_index = start_index + len(args)
+        # Expand the dataset if needed, at least doubling its size.
+        if end_index > len(dataset):
+          dataset.resize((max(end_index, 2*len(dataset)), *dataset.shape[1:]))
+        dataset[start_index:end_index] = args
+        lengths[dataset_path] = end_index
+      elif command_name == 'flush':
+        hdf5_file.flush()
+      elif command_name == 'metadata':
+        for (object_path, attrs) in args.items():
+          if object_path in hdf5_file: # no objects are created for video/audio streams
+            hdf5_file[object_path].attrs.update(attrs)
+    # Resize datasets to remove extra empty rows.
+    for (dataset_path, length) in lengths.items():
+      dataset = hdf5_file[dataset_path]
+      dataset.resize((length, *dataset.shape[1:])) # type: ignore
@@ -0,0 +1,213 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from typing import Iterator
+import bisect
+import csv
+import os
+import pickle
+import struct
+import threading
+
+from utils.time_utils import get_time
+
+
+# Each journal record is a fixed header, followed by the topic and the serialized message:
+#   <receive time [s]: float64><topic length: uint16><payload length: uint32><topic><payload>
+JOURNAL_RECORD_HEADER = struct.Struct('<dHI')
+JOURNAL_INDEX_HEADER = 'Time [s],File,Offset'
+
+
+def get_journal_filepath(log_dir: str, log_tag: str, file_index: int) -> str:
+  return os.path.join(log_dir, '%s_journal_%03d.bin' % (log_tag, file_index))
+
+
+def get_journal_index_filepath(log_dir: str, log_tag: str) -> str:
+  return os.path.join(log_dir, '%s_journal_index.csv' % log_tag)
+
+
+def get_journal_spec_filepath(log_dir: str, log_tag: str) -> str:
+  return os.path.join(log_dir, '%s_journal.pkl' % log_tag)
+
+
+# Appends already serialized messages of a Node to journal files, as the cheapest possible recording path.
+# Callers only copy the record into an in-memory buffer, a background thread
+#   writes the buffer out in large sequential O_APPEND writes every `flush_period_s`,
+#   and fsyncs the file every `fsync_period_s`, so at most that much data is at risk on power loss.
+# Journal files are rolled over once they reach `max_file_size_bytes`.
+# Every write adds a row to the index CSV with the receive time of its first record, the file and the byte offset,
+#   so readers can seek close to any point in time without scanning the whole journal.
+# The spec needed to convert the journal into the regular Logger outputs is pickled next to it.
+class JournalWriter:
+  def __init__(self,
+               log_dir: str,
+               log_tag: str,
+               journal_spec: dict,
+               flush_period_s: float = 0.5,
+               fsync_period_s: float = 5.0,
+               max_file_size_bytes: int = 1024**3):
+    self._log_dir = log_dir
+    self._log_tag = log_tag
+    self._flush_period_s = flush_period_s
+    self._fsync_period_s = fsync_period_s
+    self._max_file_size_bytes = max_file_size_bytes
+
+    os.makedirs(log_dir, exist_ok=True)
+    with open(get_journal_spec_filepath(log_dir, log_tag), 'wb') as f:
+      pickle.dump(journal_spec, f)
+    self._index_writer = open(get_journal_index_filepath(log_dir, log_tag), 'w')
+    self._index_writer.write(JOURNAL_INDEX_HEADER)
+
+    self._file_index: int = -1
+    self._fd: int
+    self._file_offset: int = 0
+    self._last_fsync_time_s: float = get_time()
+    self._open_next_file()
+
+    self._lock = threading.Lock()
+    self._buffer = bytearray()
+    self._buffer_start_time_s: float | None = None
+    self._is_closed = threading.Event()
+    self._writer_thread = threading.Thread(target=self._write_loop)
+    self._writer_thread.start()
+
+
+  # Add a message to the journal.
+  def append(self, topic: str, payload: bytes, toa_s: float | None = None) -> None:
+    toa_s = get_time() if toa_s is None else toa_s
+    topic_bytes = topic.encode('utf-8')
+    with self._lock:
+      if self._buffer_start_time_s is None:
+        self._buffer_start_time_s = toa_s
+      self._buffer += JOURNAL_RECORD_HEADER.pack(toa_s, len(topic_bytes), len(payload))
+      self._buffer += topic_bytes
+      self._buffer += payload
+
+
+  def _open_next_file(self) -> None:
+    self._file_index += 1
+    self._fd = os.open(get_journal_filepath(self._log_dir, self._log_tag, self._file_index),
+                       os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+    self._file_offset = 0
+
+
+  # Swap out the buffer and append it to the current journal file.
+  def _write_buffer(self) -> None:
+    with self._lock:
+      buffer, self._buffer = self._buffer, bytearray()
+      start_time_s, self._buffer_start_time_s = self._buffer_start_time_s, None
+    if not buffer:
+      return
+    if self._file_offset and self._file_offset + len(buffer) > self._max_file_size_bytes:
+      os.fsync(self._fd)
+      os.close(self._fd)
+      self._open_next_file()
+    self._index_writer.write('\n%.6f,%d,%d' % (start_time_s, self._file_index, self._file_offset))
+    view = memoryview(buffer)
+    while view:
+      view = view[os.write(self._fd, view):]
+    self._file_offset += len(buffer)
+    if (now_s := get_time()) - self._last_fsync_time_s >= self._fsync_period_s:
+      self._index_writer.flush()
+      os.fsync(self._fd)
+      self._last_fsync_time_s = now_s
+
+
+  def _write_loop(self) -> None:
+    while not self._is_closed.wait(self._flush_period_s):
+      self._write_buffer()
+    self._write_buffer()
+
+
+  # Write out the rest of the buffer, sync and close the files.
+  def close(self) -> None:
+    self._is_closed.set()
+    self._writer_thread.join()
+    os.fsync(self._fd)
+    os.close(self._fd)
+    self._index_writer.close()
+
+
+# Loads the spec the journal was recorded with.
+def load_journal_spec(log_dir: str, log_tag: str) -> dict:
+  with open(get_journal_spec_filepath(log_dir, log_tag), 'rb') as f:
+    return pickle.load(f)
+
+
+# Loads the index of a journal as a list of (receive time [s], file index, byte offset), in order of writing.
+def load_journal_index(log_dir: str, log_tag: str) -> list[tuple[float, int, int]]:
+  with open(get_journal_index_filepath(log_dir, log_tag), 'r', newline='') as f:
+    reader = csv.reader(f)
+    next(reader)
+    return [(float(time_s), int(file_index), int(offset)) for (time_s, file_index, offset) in reader]
+
+
+# Iterates over the (topic, receive time [s], payload) records of a journal.
+# @param start_time_s seeks to the first record received at or after this time, using the index.
+# @param topics only yields records of these topics, skipping over the payloads of the others.
+def read_journal(log_dir: str,
+                 log_tag: str,
+                 start_time_s: float | None = None,
+                 topics: set[str] | None = None) -> Iterator[tuple[str, float, bytes]]:
+  file_index, offset = 0, 0
+  if start_time_s is not None:
+    index = load_journal_index(log_dir, log_tag)
+    position = bisect.bisect_right([time_s for (time_s, *_) in index], start_time_s) - 1
+    if position >= 0:
+      _, file_index, offset = index[position]
+  while os.path.exists(filepath := get_journal_filepath(log_dir, log_tag, file_index)):
+    with open(filepath, 'rb') as f:
+      f.seek(offset)
+      while len(header := f.read(JOURNAL_RECORD_HEADER.size)) == JOURNAL_RECORD_HEADER.size:
+        toa_s, topic_len, payload_len = JOURNAL_RECORD_HEADER.unpack(header)
+        topic_bytes = f.read(topic_len)
+        if len(topic_bytes) < topic_len: # record truncated by a crash
+          break
+        topic = topic_bytes.decode('utf-8')
+        if (topics is not None and topic not in topics) or (start_time_s is not None and toa_s < start_time_s):
+          f.seek(payload_len, os.SEEK_CUR)
+          continue
+        payload = f.read(payload_len)
+        if len(payload) < payload_len: # record truncated by a crash
+          break
+        yield topic, toa_s, payload
+    file_index += 1
+    offset = 0
+
+
+# Offline conversion of a recorded journal, i.e.:
+#   python -m handlers.JournalHandler <log_dir> <log_tag> [--num_workers N]
+if __name__ == '__main__':
+  import argparse
+  from handlers.LoggingHandler import convert_journal
+
+  parser = argparse.ArgumentParser(description='Convert a HERMES message journal into the regular Logger outputs.')
+  parser.add_argument('log_dir', type=str, help='Directory of the recording with the journal files.')
+  parser.add_argument('log_tag', type=str, help='Log tag of the Node that recorded the journal.')
+  parser.add_argument('--num_workers', type=int, default=None, help='Number of converter processes, one per Stream by default.')
+  args = parser.parse_args()
+  convert_journal(args.log_dir, args.log_tag, args.num_workers)
@@ -30,6 +30,7 @@ from collections import OrderedDict
 from io import TextIOWrapper
 from subprocess import Popen
 import os
+import threading
 import time
 from utils.time_utils import get_time, get_time_str
 from typing import Any, Iterator
@@ -40,12 +41,28 @@ try:
 except ImportError as e:
   print(e, "\nFFmpeg not installed, will crash if you configure streaming of video/audio.", flush=True)
 
+try:
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+except ImportError as e:
+  print(e, "\nPyArrow not installed, will crash if you configure logging to Parquet.", flush=True)
+
 import asyncio
 import concurrent.futures
+import multiprocessing
 import h5py
 import numpy as np
+import zmq
+from handlers.HDF5ShardHandler import HDF5Shard, HDF5ShardError
+from handlers.JournalHandler import JournalWriter, load_journal_spec, read_journal
+from handlers.VideoFeederHandler import PassthroughVideoFeeder, VideoFeeder
 from streams.Stream import Stream
 from utils.dict_utils import convert_dict_values_to_str
+from utils.msgpack_utils import deserialize, serialize
+from utils.zmq_utils import CMD_END, DNS_LOCALHOST, IP_LOOPBACK, PORT_BACKEND, TOPIC_LOGGER_STATS
+from utils.hdf5_utils import HDF5_VALID_LENGTH_INDEX_KEY, HDF5_VALID_LENGTHS_PATH, create_hdf5_link_master, create_hdf5_vds_master, get_hdf5_storage_overrides, get_hdf5_storage_policy
+from utils.codec_utils import select_video_codec
+from utils.io_stats_utils import WriterStats, format_writer_stats_table
 from utils.types import VideoCodecDict
 
 
@@ -59,12 +76,34 @@ from utils.types import VideoCodecDict
 #     unless all data is expected to be written at the end.
 #   Will treat video/audio data separately, so can choose to stream/clear 
 #     non-AV data but dump AV data or vice versa.
-# Logging currently supports CSV, HDF5, MP4, and WAV files.
+# Logging currently supports CSV, HDF5, Parquet, MP4, and WAV files.
 #   If using HDF5, a single file will be created for all the Producers and Pipelines.
+#     Optionally, each streamer is written into its own shard file by its own process in parallel,
+#     and the single file becomes a master file that links each streamer group to its shard.
 #   If using CSV, a separate file will be created for each Producer and Pipeline.
 #     N-D data will be unwrapped so that each entry is its own column.
+#   If using Parquet, a separate file will be created for each stream of each device,
+#     with a row group per logging period and N-D data as a fixed-size list column.
 #   Videos can be saved as MP4 files.
 #   Audio can be saved as WAV files.
+# If using the periodic option, HDF5 and video outputs can be split into segments,
+#   rotated every N minutes or every N GB, so that a crash only affects the last segment
+#   and finished segments can already be processed while the recording goes on.
+#   Video segments start on keyframes of the encoded stream.
+#   An index CSV maps each segment file to its time range,
+#     and an optional HDF5 master file presents the HDF5 segments as continuous virtual datasets.
+# If using the periodic option with adaptive flushing, each stream is written on its own schedule,
+#   driven by its backlog: once it holds `stream_flush_bytes` (or `stream_flush_samples`), but not sooner than
+#   `stream_period_min_s` after its last write, and at the latest `stream_period_max_s` after it.
+#   Large streams (i.e. video) are then written in steady small batches instead of bursts,
+#   and slow streams are batched over several periods into fewer, larger writes.
+# If using the dump option, data is kept in memory until the end, then written by a pool of workers,
+#   concurrently for all streams, in bounded chunks of `dump_chunk_bytes` per stream, with progress printed.
+#   Optionally, during the session, data is flushed in the background whenever the CPU load of the process is low,
+#   leaving the files in the same state as a dump at the end would, and with less left to write at the end.
+# Each writer keeps I/O counters: bytes and samples written, write duration histogram, and backlog of its Stream FIFO.
+#   They can be published on the TOPIC_LOGGER_STATS topic after every write iteration,
+#   and are summarized as a table in the HDF5 metadata and the log history file at the end.
 # Note that the is_video / is_audio flags of each stream will be used to identify video/audio.
 #   Classes with audio streams will also require a method get_audioStreaming_info()
 #     that returns a dict with keys num_channels, sample_width, sampling_rate.
@@ -84,6 +123,10 @@ class LoggerInterface(ABC):
   async def _log_data(self) -> None:
     pass
 
+  @abstractmethod
+  async def _dump_data(self) -> None:
+    pass
+
   @abstractmethod
   def _is_to_stream(self) -> bool:
     pass
@@ -132,7 +175,10 @@ class StartState(BrokerState):
     self._context._initialize(streams)
 
   def run(self) -> None:
-    self._context._set_state(StreamState(self._context))
+    if not self._context._is_to_stream() and self._context._is_to_dump():
+      self._context._set_state(DumpState(self._context))
+    else:
+      self._context._set_state(StreamState(self._context))
 
 
 class StreamState(BrokerState):
@@ -143,8 +189,10 @@ class StreamState(BrokerState):
       self._context._start_stream_logging()
 
   def run(self) -> None:
-    asyncio.run(self._context._log_data())
-    self._context._release_thread_pool()
+    # Without any enabled writer (i.e. a Pipeline that only publishes), there is nothing to log.
+    if self._context._is_to_stream():
+      asyncio.run(self._context._log_data())
+      self._context._release_thread_pool()
     self._is_continue_fsm = False
     # self._context._set_state(DumpState(self._context))
 
@@ -159,12 +207,8 @@ class DumpState(BrokerState):
 
   def run(self) -> None:
     # Until top-level module's main thread indicated that it finished producing data,
-    #   periodically sleep the thread to yield the CPU.
-    self._context._wait_till_flush()
-    # TODO: When experiment ended, write data once and wrap up.
-    #   Use the end log time to not overwrite written streamed data with empty dumped files?
-    asyncio.run(self._context._log_data())
-    # Release Thread Pool used for AsyncIO for file writing.
+    #   flush in the background only when the system is idle, then write out all the data and wrap up.
+    asyncio.run(self._context._dump_data())
     self._context._release_thread_pool()
     self._is_continue_fsm = False
 
@@ -177,30 +221,89 @@ class Logger(LoggerInterface):
                experiment: dict[str, str],
                stream_csv: bool = False,
                stream_hdf5: bool = False,
+               stream_parquet: bool = False,
                stream_video: bool = False,
                stream_audio: bool = False,
                dump_csv: bool = False,
                dump_hdf5: bool = False,
+               dump_parquet: bool = False,
                dump_video: bool = False,
                dump_audio: bool = False,
                video_codec: VideoCodecDict | None = None,
+               video_codec_config_filepath: str | None = None,
                video_codec_num_cpu: int = 1,
+               video_queue_len: int = 60,
+               video_backlog_policy: str = 'block',
+               video_passthrough: bool = False,
                audio_format: str = "wav",
                stream_period_s: float = 30.0,
+               is_adaptive_flush: bool = False,
+               stream_period_min_s: float = 1.0,
+               stream_period_max_s: float = 60.0,
+               stream_flush_bytes: int = 16*1024**2,
+               stream_flush_samples: int | None = None,
+               dump_num_workers: int | None = None,
+               dump_chunk_bytes: int | None = 64*1024**2,
+               dump_background_period_s: float | None = None,
+               dump_background_max_load: float = 0.25,
+               is_publish_stats: bool = False,
+               stats_port: str = PORT_BACKEND,
+               log_history_filepath: str | None = None,
+               hdf5_compression: str | None = None,
+               hdf5_compression_level: int | None = None,
+               hdf5_shuffle: bool = True,
+               hdf5_storage_overrides: dict[str, dict] | None = None,
+               hdf5_swmr: bool = False,
+               hdf5_sharded: bool = False,
+               hdf5_shard_queue_len: int = 64,
+               segment_duration_s: float | None = None,
+               segment_size_gb: float | None = None,
+               hdf5_segment_vds: bool = False,
                **_):
 
     # Record the configuration options.
     self._stream_hdf5 = stream_hdf5
     self._stream_csv = stream_csv
+    self._stream_parquet = stream_parquet
     self._stream_video = stream_video
     self._stream_audio = stream_audio
     self._stream_period_s = stream_period_s
+    self._is_adaptive_flush = is_adaptive_flush
+    self._stream_period_min_s = stream_period_min_s
+    self._stream_period_max_s = stream_period_max_s
+    self._stream_flush_bytes = stream_flush_bytes
+    self._stream_flush_samples = stream_flush_samples
+    self._dump_num_workers = dump_num_workers
+    self._dump_chunk_bytes = dump_chunk_bytes
+    self._dump_background_period_s = dump_background_period_s
+    self._dump_background_max_load = dump_background_max_load
+    self._is_dumping: bool = False
+    self._is_publish_stats = is_publish_stats
+    self._stats_port = stats_port
+    self._log_history_filepath = log_history_filepath
+    self._hdf5_compression = hdf5_compression
+    self._hdf5_compression_level = hdf5_compression_level
+    self._hdf5_shuffle = hdf5_shuffle
+    self._hdf5_storage_overrides = hdf5_storage_overrides or {}
+    self._hdf5_swmr = hdf5_swmr
+    self._hdf5_sharded = hdf5_sharded
+    self._hdf5_shard_queue_len = hdf5_shard_queue_len
+    self._segment_duration_s = segment_duration_s
+    self._segment_size_bytes = None if segment_size_gb is None else int(segment_size_gb * 1024**3)
+    self._hdf5_segment_vds = hdf5_segment_vds
+    if hdf5_sharded and (hdf5_swmr or segment_duration_s is not None or segment_size_gb is not None):
+      raise ValueError('Sharded HDF5 output does not support SWMR mode or segmenting.')
     self._dump_hdf5 = dump_hdf5
     self._dump_csv = dump_csv
+    self._dump_parquet = dump_parquet
     self._dump_video = dump_video
     self._dump_audio = dump_audio
     self._video_codec = video_codec
     self._video_codec_num_cpu = video_codec_num_cpu
+    self._video_queue_len = video_queue_len
+    self._video_backlog_policy = video_backlog_policy
+    self._video_passthrough = video_passthrough
+    self._is_auto_video_codec = video_codec is None and video_codec_config_filepath == 'auto'
     self._audio_format = audio_format
     self._log_tag = log_tag
     self._log_dir = log_dir
@@ -210,14 +313,38 @@ class Logger(LoggerInterface):
     # Initialize the logging writers.
     self._thread_pool: concurrent.futures.ThreadPoolExecutor
     self._hdf5_file: h5py.File | None = None
-    self._video_writers: list[tuple[Popen, str, str, str]] = []
+    self._hdf5_filepath: str | None = None
+    self._hdf5_valid_length_keys: list[tuple[str, str, str]] = []
+    self._hdf5_shards: OrderedDict[str, HDF5Shard] = OrderedDict()
+    self._hdf5_shard_errors: OrderedDict[str, HDF5ShardError] = OrderedDict()
+    self._video_writers: list[tuple[VideoFeeder, str, str, str]] = []
     self._audio_writers: list[tuple[wave.Wave_write, str, str, str]] = []
     self._csv_writers: list[tuple[TextIOWrapper, str, str, str]] = []
     self._csv_writer_metadata: TextIOWrapper | None = None
+    self._parquet_writers: list[tuple['pq.ParquetWriter', str, str, str]] = []
+
+    # Initialize the segment rotation state.
+    #   Closing of rotated-out files is offloaded to its own thread pool, to not stall the writers.
+    self._is_segmenting: bool = False
+    self._segment_index: int = 0
+    self._segment_start_time_s: float = float('nan')
+    self._segment_pool: concurrent.futures.ThreadPoolExecutor | None = None
+    self._segment_index_writer: TextIOWrapper | None = None
+    self._segment_index_lock = threading.Lock()
+    self._hdf5_segment_filepaths: list[str] = []
+    self._hdf5_segment_time_range_s: list[float] = [float('nan'), float('nan')]
+    self._video_segments: dict[tuple[str, str, str], dict[str, Any]] = dict()
+
+    # Initialize the flush schedule of each stream, and the streams due for writing in the current iteration.
+    self._flush_states: OrderedDict[tuple[str, str, str], dict[str, Any]] = OrderedDict()
+    self._due_streams: set[tuple[str, str, str]] = set()
+
+    # Initialize the I/O counters of each writer, by (writer type, streamer, device, stream).
+    self._writer_stats: OrderedDict[tuple[str, str, str, str], WriterStats] = OrderedDict()
+    self._stats_pub: zmq.SyncSocket | None = None
   
     # Create the log directory if needed.
-    if self._stream_csv or self._stream_hdf5 or self._stream_video or self._stream_audio \
-        or self._dump_csv or self._dump_hdf5 or self._dump_video or self._dump_audio:
+    if self._is_to_stream() or self._is_to_dump():
       os.makedirs(self._log_dir, exist_ok=True)
 
     # Initialize variables that will guide the thread that will do stream/dump logging of data available in the Stream objects.
@@ -225,6 +352,7 @@ class Logger(LoggerInterface):
     self._is_streaming: bool   # whether periodic writing is active
     self._is_flush: bool       # whether remaining data at the end should now be flushed
     self._is_finished: bool    # whether the logging loop is finished and all data was flushed
+    self._is_stop_requested: bool = False  # whether the owner already stopped logging, possibly before it started
 
 
   def __call__(self, streams: OrderedDict[str, Stream]) -> None:
@@ -269,20 +397,26 @@ class Logger(LoggerInterface):
 
 
   def _is_to_stream(self) -> bool:
-    return self._stream_csv or self._stream_hdf5 or self._stream_video or self._stream_audio
+    return self._stream_csv or self._stream_hdf5 or self._stream_parquet or self._stream_video or self._stream_audio
 
 
   def _is_to_dump(self) -> bool:
-    return self._dump_csv or self._dump_hdf5 or self._dump_video or self._dump_audio
+    return self._dump_csv or self._dump_hdf5 or self._dump_parquet or self._dump_video or self._dump_audio
 
 
   def _start_stream_logging(self) -> None:
+    # Set up rotation of segments, if configured.
+    self._is_segmenting = self._segment_duration_s is not None or self._segment_size_bytes is not None
+    if self._is_segmenting:
+      self._init_segments()
     # Set up CSV/HDF5 file writers for stream-logging if desired.
     num_workers: int = 0
     if self._stream_csv:
       num_workers += self._init_files_csv()
     if self._stream_hdf5:
       num_workers += self._init_files_hdf5()
+    if self._stream_parquet:
+      num_workers += self._init_files_parquet()
     if self._stream_video:
       num_workers += self._init_files_video()
     if self._stream_audio:
@@ -292,6 +426,7 @@ class Logger(LoggerInterface):
     self._is_streaming = True
     self._is_flush = False
     self._is_finished = False
+    self._keep_stop_request()
 
 
   # Helper to stop the stream-logging thread to periodically write data.
@@ -299,37 +434,52 @@ class Logger(LoggerInterface):
   #  and will log any metadata associated with the streamers.
   # Will wait for the thread to finish before returning.
   def _stop_stream_logging(self) -> None:
+    self._is_stop_requested = True
     self._is_streaming = False
     self._is_flush = True
 
 
+  # Starting the logging resets the flags, keep a stop that the owner requested before that (i.e. a very short session).
+  #   Checked after the flags are reset, so a concurrent stop either sees the reset or is seen here.
+  def _keep_stop_request(self) -> None:
+    if self._is_stop_requested:
+      self._is_streaming = False
+      self._is_flush = True
+
+
+  # Dump workers are sized to the number of cores, or `dump_num_workers` (i.e. to match what the disk sustains).
   def _start_dump_logging(self) -> None:
+    # Dumped data is written at once, into unsegmented files.
+    self._is_segmenting = False
+    self._is_dumping = True
     num_workers: int = 0
     if self._dump_csv:
       num_workers += self._init_files_csv()
     if self._dump_hdf5:
       num_workers += self._init_files_hdf5()
+    if self._dump_parquet:
+      num_workers += self._init_files_parquet()
     if self._dump_video:
       num_workers += self._init_files_video()
     if self._dump_audio:
       num_workers += self._init_files_audio()
-    # Log all data.
-    # Will basically enable periodic stream-logging,
-    #  but will set self._is_flush and self._is_streaming such that
-    #  it seems like the experiment ended and just a final flush is required.
-    #  This will cause the stream-logging in self._log_data()
-    #  to fetch and write any outstanding data, which is all data since
-    #  none is written yet.  It will then exit after the single write.
+    # Reuse the stream-logging writers for the dump, driven by self._dump_data():
+    #  it waits until the experiment ended (except for opportunistic background flushes),
+    #  then writes all the outstanding data in bounded chunks.
     # Pretend like the dumping options are actually streaming options.
     self._stream_csv = self._dump_csv
     self._stream_hdf5 = self._dump_hdf5
+    self._stream_parquet = self._dump_parquet
     self._stream_video = self._dump_video
     self._stream_audio = self._dump_audio
     # Clear the is_finished flag in case dump is run after stream so the log loop can run once to flush all logged data that wasn't stream-logged.
     self._is_finished = False
+    self._is_streaming = False
+    self._is_flush = False
+    self._keep_stop_request()
     # Initialize indexes and log all of the data.
     self._init_log_indices()
-    self._thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers)
+    self._thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self._dump_num_workers or max(1, min(num_workers, os.cpu_count() or 1)))
 
 
   def _wait_till_flush(self) -> None:
@@ -347,12 +497,134 @@ class Logger(LoggerInterface):
   # Initialize the data indices to fetch for logging.
   # Will record the next data indices that should be fetched for each stream,
   #  and the number of timesteps that each streamer needs before data is solidified.
+  # Starts the flush schedule of each stream that an enabled writer consumes,
+  #   the others are never popped (i.e. video when only HDF5 is written) and stay out of the schedule and the dump progress.
   def _init_log_indices(self) -> None:
+    start_time_s = get_time()
     for (streamer_name, stream) in self._streams.items():
       for (device_name, device_info) in stream.get_stream_info_all().items():
         self._timesteps_before_solidified[streamer_name][device_name] = OrderedDict()
         for (stream_name, stream_info) in device_info.items():
           self._timesteps_before_solidified[streamer_name][device_name][stream_name] = stream_info['timesteps_before_solidified']
+          if not self._is_written(stream_info):
+            continue
+          self._flush_states[(streamer_name, device_name, stream_name)] = {
+            'sample_bytes': int(np.prod(stream_info['sample_size'])) * np.dtype(stream_info['data_type']).itemsize,
+            'last_flush_time_s': start_time_s,
+            'num_flushes': 0,
+            'num_samples_total': 0,
+            'num_bytes_total': 0,
+            'period_total_s': 0.0,
+          }
+
+
+  # Whether any enabled writer consumes a stream:
+  #   video and audio streams go only to their own writers, all other streams to the CSV, HDF5 and Parquet writers.
+  def _is_written(self, stream_info: dict[str, Any]) -> bool:
+    if stream_info['is_video']:
+      return self._stream_video
+    elif stream_info['is_audio']:
+      return self._stream_audio
+    else:
+      return self._stream_csv or self._stream_hdf5 or self._stream_parquet
+
+
+  # Decide which streams to write in this iteration, from the backlog of each in their Stream FIFO.
+  # With the fixed-period schedule, or when flushing the remaining data, all streams are due.
+  # Records the achieved write size and period of each stream.
+  def _schedule_flush(self) -> None:
+    now_s = get_time()
+    self._due_streams = set()
+    for ((streamer_name, device_name, stream_name), flush_state) in self._flush_states.items():
+      num_samples = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+      num_bytes = num_samples * flush_state['sample_bytes']
+      period_s = now_s - flush_state['last_flush_time_s']
+      if self._is_flush or not self._is_adaptive_flush:
+        is_due = True
+      elif period_s < self._stream_period_min_s:
+        is_due = False
+      else:
+        is_due = (period_s >= self._stream_period_max_s
+                  or num_bytes >= self._stream_flush_bytes
+                  or (self._stream_flush_samples is not None and num_samples >= self._stream_flush_samples))
+      if not is_due:
+        continue
+      self._due_streams.add((streamer_name, device_name, stream_name))
+      flush_state['last_flush_time_s'] = now_s
+      flush_state['num_flushes'] += 1
+      flush_state['num_samples_total'] += num_samples
+      flush_state['num_bytes_total'] += num_bytes
+      flush_state['period_total_s'] += period_s
+
+
+  def _is_due(self, streamer_name: str, device_name: str, stream_name: str) -> bool:
+    return (streamer_name, device_name, stream_name) in self._due_streams
+
+
+  # Max number of samples to pop from a stream in one write: a bounded chunk when dumping, everything otherwise.
+  def _get_pop_limit(self, streamer_name: str, device_name: str, stream_name: str) -> int | None:
+    if not self._is_dumping or self._dump_chunk_bytes is None:
+      return None
+    return max(1, self._dump_chunk_bytes // max(1, self._flush_states[(streamer_name, device_name, stream_name)]['sample_bytes']))
+
+
+  # Achieved write size and period of each stream: mean number of samples and bytes per write, and mean time between writes.
+  def get_flush_stats(self) -> dict[str, dict[str, float | int]]:
+    return {'/'.join(key): {
+              'num_flushes': flush_state['num_flushes'],
+              'write_samples_mean': flush_state['num_samples_total'] / flush_state['num_flushes'] if flush_state['num_flushes'] else float('nan'),
+              'write_bytes_mean': flush_state['num_bytes_total'] / flush_state['num_flushes'] if flush_state['num_flushes'] else float('nan'),
+              'write_period_mean_s': flush_state['period_total_s'] / flush_state['num_flushes'] if flush_state['num_flushes'] else float('nan'),
+            } for (key, flush_state) in self._flush_states.items()}
+
+
+  # Update the I/O counters of a writer after a write call that started at `start_time_s`.
+  def _record_write(self,
+                    writer_type: str,
+                    streamer_name: str,
+                    device_name: str,
+                    stream_name: str,
+                    num_samples: int,
+                    num_bytes: int,
+                    start_time_s: float,
+                    queue_depth: int) -> None:
+    key = (writer_type, streamer_name, device_name, stream_name)
+    if (writer_stats := self._writer_stats.get(key)) is None:
+      writer_stats = self._writer_stats.setdefault(key, WriterStats('%s:%s/%s/%s' % key))
+    writer_stats.record(num_samples=num_samples,
+                        num_bytes=num_bytes,
+                        duration_s=get_time() - start_time_s,
+                        queue_depth=queue_depth)
+
+
+  # I/O counters of each writer, see `WriterStats`.
+  def get_writer_stats(self) -> list[dict[str, float | int | str | list[int]]]:
+    return [writer_stats.get_stats() for writer_stats in self._writer_stats.values()]
+
+
+  # Path of the HDF5 file written by the Logger (of the last segment, if segmenting), None if not logging to HDF5.
+  def get_hdf5_filepath(self) -> str | None:
+    return self._hdf5_filepath
+
+
+  # Publish the I/O counters of all writers, encoders, and the flush schedule, for live monitoring.
+  def _publish_stats(self) -> None:
+    if self._stats_pub is None:
+      return
+    self._stats_pub.send_multipart([('%s.%s' % (TOPIC_LOGGER_STATS, self._log_tag)).encode('utf-8'),
+                                    serialize(log_tag=self._log_tag,
+                                              time_s=get_time(),
+                                              writers=self.get_writer_stats(),
+                                              video_encoders=self.get_video_stats(),
+                                              flush=self.get_flush_stats())])
+
+
+  # Append the summary table of the I/O counters to the log history file.
+  def _log_stats_history(self, stats_table: str) -> None:
+    print("%s Logger I/O statistics:\n%s" % (self._log_tag, stats_table), flush=True)
+    if self._log_history_filepath is not None:
+      with open(self._log_history_filepath, 'a') as f:
+        f.write('%s %s Logger I/O statistics:\n%s\n' % (get_time_str(get_time(), '%Y-%m-%d %H:%M:%S', False), self._log_tag, stats_table))
 
 
   # Create and initialize CSV files.
@@ -408,15 +680,84 @@ class Logger(LoggerInterface):
   # Will have a single file for all streams from all devices.
   # Currently assumes that device names are unique across all streamers.
   def _init_files_hdf5(self) -> int:
-    # Open an HDF5 file writerю
-    filename_hdf5 = '%s.hdf5' % self._log_tag
+    if self._hdf5_sharded:
+      return self._open_files_hdf5_sharded()
+    self._open_file_hdf5(self._get_filepath_hdf5())
+    return 1
+
+
+  # Start a shard writer process for each streamer with data to store in HDF5.
+  #   The master file is created at the regular HDF5 path when closing.
+  def _open_files_hdf5_sharded(self) -> int:
+    self._hdf5_filepath = self._get_filepath_hdf5()
+    filename_base = os.path.splitext(self._hdf5_filepath)[0]
+    for (streamer_name, stream) in self._streams.items():
+      dataset_specs = [('/'.join([streamer_name, device_name, stream_name]),
+                        self._get_hdf5_dataset_kwargs(streamer_name=streamer_name,
+                                                      device_name=device_name,
+                                                      stream_name=stream_name,
+                                                      stream_info=stream_info))
+                       for (device_name, device_info) in stream.get_stream_info_all().items()
+                       for (stream_name, stream_info) in device_info.items()
+                       # Skip saving video and audio in the HDF5.
+                       if not (stream_info['is_video'] or stream_info['is_audio'])]
+      if dataset_specs:
+        self._hdf5_shards[streamer_name] = HDF5Shard(filepath='%s_%s.hdf5' % (filename_base, streamer_name),
+                                                     dataset_specs=dataset_specs,
+                                                     max_queue_len=self._hdf5_shard_queue_len)
+    return len(self._hdf5_shards)
+
+
+  # Unique path of the HDF5 file (of the current segment, if segmenting).
+  def _get_filepath_hdf5(self) -> str:
+    filename_base = ('%s_seg%03d' % (self._log_tag, self._segment_index)) if self._is_segmenting else self._log_tag
+    filename_hdf5 = '%s.hdf5' % filename_base
     filepath_hdf5 = os.path.join(self._log_dir, filename_hdf5)
     num_to_append = 0
     while os.path.exists(filepath_hdf5):
       num_to_append += 1
-      filename_hdf5 = '%s_%02d.hdf5' % (self._log_tag, num_to_append)
+      filename_hdf5 = '%s_%02d.hdf5' % (filename_base, num_to_append)
       filepath_hdf5 = os.path.join(self._log_dir, filename_hdf5)
-    self._hdf5_file = h5py.File(filepath_hdf5, 'w')
+    return filepath_hdf5
+
+
+  # Keyword arguments of `h5py.Group.create_dataset` for the dataset of a stream.
+  # The main data has specifications defined by stream_info,
+  #   chunks are sized to the amount of data written per flush, with the configured compression filters.
+  def _get_hdf5_dataset_kwargs(self,
+                               streamer_name: str,
+                               device_name: str,
+                               stream_name: str,
+                               stream_info: dict[str, Any]) -> dict[str, Any]:
+    sample_size = stream_info['sample_size']
+    data_type = stream_info['data_type']
+    storage_policy = get_hdf5_storage_policy(sampling_rate_hz=float(stream_info['sampling_rate_hz']),
+                                             sample_size=tuple(sample_size),
+                                             data_type=data_type,
+                                             stream_period_s=self._stream_period_s,
+                                             compression=self._hdf5_compression,
+                                             compression_level=self._hdf5_compression_level,
+                                             is_shuffle=self._hdf5_shuffle,
+                                             overrides=get_hdf5_storage_overrides(self._hdf5_storage_overrides,
+                                                                                  streamer_name=streamer_name,
+                                                                                  device_name=device_name,
+                                                                                  stream_name=stream_name))
+    return {'shape': (self._hdf5_log_length_increment, *sample_size),
+            'maxshape': (None, *sample_size),
+            'dtype': data_type,
+            **storage_policy}
+
+
+  # Open an HDF5 file writer with a dataset for each stream, and start writing each from index 0.
+  # In SWMR mode, the whole file structure and metadata are created upfront,
+  #   because no new objects or attributes can be added once readers may attach to the file.
+  #   Datasets then start empty and grow in chunk-sized steps, their valid lengths are published separately, see `_write_hdf5`.
+  def _open_file_hdf5(self, filepath_hdf5: str) -> None:
+    self._hdf5_filepath = filepath_hdf5
+    self._hdf5_file = h5py.File(filepath_hdf5, 'w', libver='latest' if self._hdf5_swmr else 'earliest')
+    self._next_data_indices_hdf5 = OrderedDict([(streamer_name, OrderedDict()) for streamer_name in self._streams.keys()])
+    self._hdf5_valid_length_keys = []
+    self._hdf5_segment_time_range_s = [float('nan'), float('nan')]
     # Create a dataset for each data key of each stream of each device.
     for (streamer_name, stream) in self._streams.items():
       streamer_group = self._hdf5_file.create_group(streamer_name)
@@ -428,24 +769,62 @@ class Logger(LoggerInterface):
           if stream_info['is_video'] or stream_info['is_audio']:
             continue
           self._next_data_indices_hdf5[streamer_name][device_name][stream_name] = 0
-          # The main data has specifications defined by stream_info.
-          sample_size = stream_info['sample_size']
-          data_type = stream_info['data_type']
           # Create the dataset.
-          device_group.create_dataset(name=stream_name,
-                                      shape=(self._hdf5_log_length_increment, *sample_size),
-                                      maxshape=(None, *sample_size),
-                                      dtype=data_type,
-                                      chunks=True)
-    return 1
+          dataset_kwargs = self._get_hdf5_dataset_kwargs(streamer_name=streamer_name,
+                                                         device_name=device_name,
+                                                         stream_name=stream_name,
+                                                         stream_info=stream_info)
+          if self._hdf5_swmr:
+            dataset_kwargs['shape'] = (0, *dataset_kwargs['shape'][1:])
+          dataset = device_group.create_dataset(name=stream_name, **dataset_kwargs)
+          if self._hdf5_swmr:
+            dataset.attrs[HDF5_VALID_LENGTH_INDEX_KEY] = len(self._hdf5_valid_length_keys)
+            self._hdf5_valid_length_keys.append((streamer_name, device_name, stream_name))
+    # Switch the file into single-writer/multiple-reader mode after all objects exist.
+    if self._hdf5_swmr:
+      self._hdf5_file.create_dataset(HDF5_VALID_LENGTHS_PATH, data=np.zeros(len(self._hdf5_valid_length_keys), dtype='int64'))
+      self._log_metadata_hdf5()
+      self._hdf5_file.swmr_mode = True
+
+
+  # Create and initialize Parquet files.
+  # Will have a separate file for each stream of each device, like CSV.
+  # The schema is derived from the stream info: 1-element samples become a scalar column,
+  #   N-D samples a fixed-size list column of the flattened sample (original shape in the schema metadata).
+  def _init_files_parquet(self) -> int:
+    num_writers: int = 0
+    for (streamer_name, stream) in self._streams.items():
+      for (device_name, device_info) in stream.get_stream_info_all().items():
+        for (stream_name, stream_info) in device_info.items():
+          # Skip saving video or audio in a Parquet file.
+          if stream_info['is_video'] or stream_info['is_audio']:
+            continue
+          filename_parquet = '%s_%s_%s.parquet' % (self._log_tag, device_name, stream_name)
+          filepath_parquet = os.path.join(self._log_dir, filename_parquet)
+          data_type = np.dtype(stream_info['data_type'])
+          num_values = int(np.prod(stream_info['sample_size']))
+          value_type = pa.string() if data_type.char == 'S' else pa.from_numpy_dtype(data_type)
+          column_type = value_type if num_values == 1 else pa.list_(value_type, num_values)
+          data_notes = stream_info['data_notes']
+          stream_metadata = convert_dict_values_to_str({Stream.metadata_class_name_key: type(stream).__name__,
+                                                        'Sample size': list(stream_info['sample_size']),
+                                                        'Sampling rate [Hz]': stream_info['sampling_rate_hz'],
+                                                        **(data_notes if isinstance(data_notes, dict) else {'Notes': data_notes})},
+                                                       preserve_nested_dicts=False)
+          schema = pa.schema([pa.field(stream_name, column_type)], metadata=stream_metadata)
+          parquet_writer = pq.ParquetWriter(filepath_parquet, schema)
+          self._parquet_writers.append((parquet_writer, streamer_name, device_name, stream_name))
+          num_writers += 1
+    return num_writers
 
 
   # Create and initialize video writers.
+  # Frames that arrive already encoded (i.e. JPEG or H.264 from the edge) are muxed as-is with PTS from their frame index,
+  #   unless `video_passthrough` is off, then they are decoded and re-encoded like raw frames with the configured video codec.
   def _init_files_video(self) -> int:
+    if self._is_auto_video_codec:
+      self._select_video_codec()
     # Create a video writer for each video stream of each device.
-    if self._video_codec is None:
-      raise ValueError('Must provide video codec specification when streaming video.')
-
     num_writers: int = 0
     for (streamer_name, streamer) in self._streams.items():
       for (device_name, device_info) in streamer.get_stream_info_all().items():
@@ -453,54 +832,138 @@ class Logger(LoggerInterface):
           # Skip non-video streams.
           if not stream_info['is_video']:
             continue
-          # Create a unique file.
-          filename_base = '%s_%s' % (self._log_tag, device_name)
-          filename_video = '%s.mkv' % (filename_base)
-          filepath_video = os.path.join(self._log_dir, filename_video)
-          num_to_append = 0
-          while os.path.exists(filepath_video):
-            num_to_append += 1
-            filename_video = '%s_%02d.mkv' % (filename_base, num_to_append)
-            filepath_video = os.path.join(self._log_dir, filename_video)
-          # Create a video writer.
-          frame_height = stream_info['sample_size'][0]
-          frame_width = stream_info['sample_size'][1]
-          fps = stream_info['sampling_rate_hz']
-          input_stream_pix_fmt: str = stream_info['color_format']['ffmpeg']
-          input_stream_format: str = stream_info['ffmpeg_input_format']
-          metadata_dict = {'metadata:g:%d'%i: '%s=%s'%(k,v) for i, (k,v) in enumerate([('title', '/'.join(self._experiment.values())),
-                                                                                       ('date', get_time_str(self._log_time_s, '%Y-%m-%d', False)),
-                                                                                       ('comment', 'HERMES multi-modal data acquisition system recording'),
-                                                                                       *map(lambda tup: ('X%s'%tup[0], tup[1]), list(self._experiment.items())),
-                                                                                       ('Xencoder', self._video_codec['codec_name']),
-                                                                                       ('Xencoded-by', 'HERMES')])}
-          # Make a subprocess pipe to FFMPEG that streams in our frames and encode them into a video.
-          video_stream = ffmpeg.input('pipe:', # type: ignore
-                                      format=input_stream_format,
-                                      pix_fmt=input_stream_pix_fmt, # color format of piped input frames.
-                                      s='{}x{}'.format(frame_width, frame_height), # size of frames from the sensor.
-                                      framerate=fps,
-                                      cpucount=self._video_codec_num_cpu,
-                                      **self._video_codec['input_options'])
-          # TODO: use this to stream encoded video into a local file, and also as RTSP stream to the GUI.
-          # video_stream = ffmpeg.filter_multi_output
-          video_stream = ffmpeg.output(video_stream, # type: ignore
-                                       filename=filepath_video,
-                                       vcodec=self._video_codec['codec_name'],
-                                       pix_fmt=self._video_codec['pix_format'],
-                                       cpucount=self._video_codec_num_cpu, # prevent ffmpeg from suffocating the processor.
-                                       **self._video_codec['output_options'],
-                                       **metadata_dict)
-          video_stream = video_stream.global_args('-hide_banner')
-          # video_writer: Popen = ffmpeg.run_async(video_stream, quiet=True, pipe_stdin=True) # type: ignore
-          video_writer: Popen = ffmpeg.run_async(video_stream, pipe_stdin=True) # type: ignore
-
-          # Store the writer.
-          self._video_writers.append((video_writer, streamer_name, device_name, stream_name))
+          video_feeder = self._open_file_video(streamer_name=streamer_name,
+                                               device_name=device_name,
+                                               stream_name=stream_name,
+                                               stream_info=stream_info)
+          self._video_writers.append((video_feeder, streamer_name, device_name, stream_name))
           num_writers += 1
     return num_writers
 
 
+  # Probe the encoders of the local FFmpeg build on the video streams that need encoding,
+  #   and use the one that keeps up with all of them for the least CPU (cached per host after the first run).
+  def _select_video_codec(self) -> None:
+    stream_configs: list[tuple[int, int, str, float]] = []
+    for streamer in self._streams.values():
+      for device_info in streamer.get_stream_info_all().values():
+        for stream_info in device_info.values():
+          if not stream_info['is_video'] or (stream_info['ffmpeg_input_format'] != 'rawvideo' and self._video_passthrough):
+            continue
+          stream_configs.append((stream_info['sample_size'][1],
+                                 stream_info['sample_size'][0],
+                                 stream_info['color_format']['ffmpeg'],
+                                 float(stream_info['sampling_rate_hz'])))
+    if not stream_configs:
+      return
+    codecs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'resources', 'codecs')
+    self._video_codec, selection = select_video_codec(stream_configs=stream_configs,
+                                                      codecs_dir=codecs_dir,
+                                                      num_cpu=self._video_codec_num_cpu)
+    print("%s selected video codec '%s' (%s): %.0f%% of its capacity, %.2f CPU cores."
+          % (self._log_tag, selection['name'], self._video_codec['codec_name'], 100*selection['load'], selection['cpu_s_per_s']), flush=True)
+
+
+  # Start a video writer for a video stream (of the current segment, if segmenting).
+  def _open_file_video(self,
+                       streamer_name: str,
+                       device_name: str,
+                       stream_name: str,
+                       stream_info: dict[str, Any]) -> VideoFeeder:
+    # Create a unique file.
+    filename_base = '%s_%s' % (self._log_tag, device_name)
+    if self._is_segmenting:
+      filename_base = '%s_seg%03d' % (filename_base, self._segment_index)
+    filename_video = '%s.mkv' % (filename_base)
+    filepath_video = os.path.join(self._log_dir, filename_video)
+    num_to_append = 0
+    while os.path.exists(filepath_video):
+      num_to_append += 1
+      filename_video = '%s_%02d.mkv' % (filename_base, num_to_append)
+      filepath_video = os.path.join(self._log_dir, filename_video)
+    # Create a video writer.
+    frame_height = stream_info['sample_size'][0]
+    frame_width = stream_info['sample_size'][1]
+    fps = stream_info['sampling_rate_hz']
+    input_stream_pix_fmt: str = stream_info['color_format']['ffmpeg']
+    input_stream_format: str = stream_info['ffmpeg_input_format']
+    is_encoded_input: bool = input_stream_format != 'rawvideo'
+    is_passthrough: bool = is_encoded_input and self._video_passthrough
+    if not is_passthrough and self._video_codec is None:
+      raise ValueError('Must provide video codec specification when streaming raw video or re-encoding encoded video.')
+    encoder_name: str = 'copy' if is_passthrough else self._video_codec['codec_name'] # type: ignore
+    metadata = [('title', '/'.join(self._experiment.values())),
+                ('date', get_time_str(self._log_time_s, '%Y-%m-%d', False)),
+                ('comment', 'HERMES multi-modal data acquisition system recording'),
+                *map(lambda tup: ('X%s'%tup[0], tup[1]), list(self._experiment.items())),
+                ('Xencoder', encoder_name),
+                ('Xencoded-by', 'HERMES')]
+    metadata_dict = {'metadata:g:%d'%i: '%s=%s'%(k,v) for i, (k,v) in enumerate(metadata)}
+    # Keep track of the frames that go into this segment.
+    #   Raw and JPEG frames are each independent, an H.264 stream can only be cut on a keyframe.
+    if self._is_segmenting:
+      self._video_segments[(streamer_name, device_name, stream_name)] = {
+        'segment': self._segment_index,
+        'filepath': filepath_video,
+        'is_intra_only': input_stream_format in ('rawvideo', 'image2pipe'),
+        'first_frame_index': None,
+        'last_frame_index': None,
+        'start_time_s': float('nan'),
+        'end_time_s': float('nan'),
+      }
+    if is_passthrough:
+      # Mux the encoded packets as-is, timestamped by their frame index, without decoding.
+      return PassthroughVideoFeeder(filepath=filepath_video,
+                                    codec_name='mjpeg' if input_stream_format == 'image2pipe' else input_stream_format,
+                                    width=frame_width,
+                                    height=frame_height,
+                                    name=filename_video,
+                                    sampling_rate_hz=float(fps),
+                                    metadata={k: str(v) for k, v in metadata},
+                                    max_queue_len=self._video_queue_len,
+                                    backlog_policy=self._video_backlog_policy)
+    if is_encoded_input:
+      # Make a subprocess pipe to FFMPEG that decodes our encoded packets and re-encodes them into a video.
+      video_stream = ffmpeg.input('pipe:', # type: ignore
+                                  format=input_stream_format,
+                                  framerate=fps)
+      video_stream = ffmpeg.output(video_stream, # type: ignore
+                                   filename=filepath_video,
+                                   vcodec=self._video_codec['codec_name'], # type: ignore
+                                   pix_fmt=self._video_codec['pix_format'], # type: ignore
+                                   cpucount=self._video_codec_num_cpu,
+                                   **self._video_codec['output_options'], # type: ignore
+                                   **metadata_dict)
+    else:
+      # Make a subprocess pipe to FFMPEG that streams in our frames and encode them into a video.
+      video_stream = ffmpeg.input('pipe:', # type: ignore
+                                  format=input_stream_format,
+                                  pix_fmt=input_stream_pix_fmt, # color format of piped input frames.
+                                  s='{}x{}'.format(frame_width, frame_height), # size of frames from the sensor.
+                                  framerate=fps,
+                                  cpucount=self._video_codec_num_cpu,
+                                  **self._video_codec['input_options']) # type: ignore
+      # TODO: use this to stream encoded video into a local file, and also as RTSP stream to the GUI.
+      # video_stream = ffmpeg.filter_multi_output
+      video_stream = ffmpeg.output(video_stream, # type: ignore
+                                   filename=filepath_video,
+                                   vcodec=self._video_codec['codec_name'], # type: ignore
+                                   pix_fmt=self._video_codec['pix_format'], # type: ignore
+                                   cpucount=self._video_codec_num_cpu, # prevent ffmpeg from suffocating the processor.
+                                   **self._video_codec['output_options'], # type: ignore
+                                   **metadata_dict)
+    video_stream = video_stream.global_args('-hide_banner')
+    # video_writer: Popen = ffmpeg.run_async(video_stream, quiet=True, pipe_stdin=True) # type: ignore
+    video_writer: Popen = ffmpeg.run_async(video_stream, pipe_stdin=True) # type: ignore
+
+    # Return the writer, fed from its own thread.
+    return VideoFeeder(video_writer=video_writer,
+                       name=filename_video,
+                       sampling_rate_hz=float(fps),
+                       max_queue_len=self._video_queue_len,
+                       backlog_policy=self._video_backlog_policy)
+
+
   # Create and initialize audio writers.
   # TODO: implement audio streaming info on the Stream object.
   # TODO: switch to ffmpeg for audio file writing.
@@ -557,37 +1020,52 @@ class Logger(LoggerInterface):
             self._csv_writer_metadata.write('\n')
 
 
-  def _log_metadata_hdf5(self) -> None:
-    # Add experiment metadata on the HDF5 file.
+  # Experiment metadata of the HDF5 file, and metadata per streamer group and per stream dataset, by object path.
+  # Flatten and prune the dictionaries to make them HDF5 compatible.
+  def _get_metadata_hdf5(self) -> tuple[dict[str, str], OrderedDict[str, dict[str, str]]]:
     file_metadata = convert_dict_values_to_str({**self._experiment,
                                                 'Date': get_time_str(self._log_time_s, '%Y-%m-%d', False),
                                                 'Time': get_time_str(self._log_time_s, '%H-%M-%S', False),
                                                 'Comment': 'HERMES multi-modal data acquisition system recording'}, preserve_nested_dicts=False)
+    objects_metadata: OrderedDict[str, dict[str, str]] = OrderedDict()
+    for (streamer_name, stream) in self._streams.items():
+      # Add the class name.
+      objects_metadata[streamer_name] = convert_dict_values_to_str({Stream.metadata_class_name_key: type(stream).__name__}, preserve_nested_dicts=False)
+      for (device_name, device_info) in stream.get_stream_info_all().items():
+        # NOTE: no per-device metadata for now.
+        # Get data notes for each stream.
+        for (stream_name, stream_info) in device_info.items():
+          data_notes = stream_info['data_notes']
+          if isinstance(data_notes, dict):
+            stream_metadata = data_notes
+          else:
+            stream_metadata = {'Notes': data_notes}
+          objects_metadata['/'.join([streamer_name, device_name, stream_name])] = convert_dict_values_to_str(stream_metadata, preserve_nested_dicts=False)
+    return file_metadata, objects_metadata
+
+
+  # NOTE: in SWMR mode, this is done on file creation since attributes can't be added to a live file.
+  def _log_metadata_hdf5(self) -> None:
+    if self._hdf5_file is not None and self._hdf5_file.swmr_mode:
+      return
+    file_metadata, objects_metadata = self._get_metadata_hdf5()
+    # Add experiment metadata on the HDF5 file.
     if self._hdf5_file is not None:
-      file_group = self._hdf5_file['/']
-      file_group.attrs.update(file_metadata)
-      # Add metadata per stream.
-      # Flatten and prune the dictionary to make it HDF5 compatible.
-      for (streamer_name, stream) in self._streams.items():
-        # Add the class name.
-        streamer_metadata = convert_dict_values_to_str({Stream.metadata_class_name_key: type(stream).__name__}, preserve_nested_dicts=False)
-        streamer_group = self._hdf5_file['/'.join([streamer_name])]
-        streamer_group.attrs.update(streamer_metadata)
-        for (device_name, device_info) in stream.get_stream_info_all().items():
-          # NOTE: no per-device metadata for now.
-          # Get data notes for each stream.
-          for (stream_name, stream_info) in device_info.items():
-            try:
-              stream_group = self._hdf5_file['/'.join([streamer_name, device_name, stream_name])]
-              data_notes = stream_info['data_notes']
-              if isinstance(data_notes, dict):
-                stream_metadata = data_notes
-              else:
-                stream_metadata = {'Notes': data_notes}
-              stream_metadata = convert_dict_values_to_str(stream_metadata, preserve_nested_dicts=False)
-              stream_group.attrs.update(stream_metadata)
-            except KeyError: # a writer was not created for this stream
-              pass
+      self._hdf5_file['/'].attrs.update(file_metadata)
+      # Add metadata per streamer and per stream.
+      for (object_path, object_metadata) in objects_metadata.items():
+        if object_path in self._hdf5_file: # a writer was not created for video/audio streams
+          self._hdf5_file[object_path].attrs.update(object_metadata)
+    # Each shard gets the file metadata and the metadata of its own streamer.
+    for (streamer_name, hdf5_shard) in self._hdf5_shards.items():
+      if streamer_name in self._hdf5_shard_errors:
+        continue
+      try:
+        hdf5_shard.update_metadata({'/': file_metadata,
+                                    **{object_path: object_metadata for (object_path, object_metadata) in objects_metadata.items()
+                                       if object_path.split('/')[0] == streamer_name}})
+      except HDF5ShardError as e:
+        self._set_hdf5_shard_error(streamer_name, e)
 
 
   def _log_metadata_video(self) -> None:
@@ -610,33 +1088,102 @@ class Logger(LoggerInterface):
 
 
   # Flush/close the HDF5 file writer.
-  def _close_files_hdf5(self) -> None:
-    # Also resize datasets to remove extra empty rows.
+  # Adds the summary table of the Logger's I/O counters to the file metadata.
+  def _close_files_hdf5(self, stats_table: str | None = None) -> None:
+    if self._hdf5_shards:
+      self._close_files_hdf5_sharded(stats_table=stats_table)
     if self._hdf5_file is not None:
-      for (streamer_name, stream) in self._streams.items():
-        for (device_name, device_info) in stream.get_stream_info_all().items():
-          for (stream_name, stream_info) in device_info.items():
-            try:
-              dataset: h5py.Dataset = self._hdf5_file['/'.join([streamer_name, device_name, stream_name])]  # type: ignore
-            except KeyError: # a dataset was not created for this stream
-              continue
-            starting_index = self._next_data_indices_hdf5[streamer_name][device_name][stream_name]
-            ending_index = starting_index - 1
-            dataset.resize((ending_index+1, *dataset.shape[1:]))
-      self._hdf5_file.close()
+      self._close_file_hdf5(hdf5_file=self._hdf5_file,
+                            filepath_hdf5=self._hdf5_filepath, # type: ignore
+                            next_data_indices=self._next_data_indices_hdf5,
+                            file_metadata=None if stats_table is None else {'Logger I/O statistics': stats_table})
       self._hdf5_file = None
+      if self._is_segmenting:
+        self._log_segment(self._segment_index, 'hdf5', self._hdf5_filepath, *self._hdf5_segment_time_range_s) # type: ignore
+
+
+  # Wait for all the shards to be written out and closed, and link them into the master file.
+  #   Shards that failed are left out of the master file.
+  def _close_files_hdf5_sharded(self, stats_table: str | None = None) -> None:
+    for (streamer_name, hdf5_shard) in self._hdf5_shards.items():
+      try:
+        hdf5_shard.close()
+      except HDF5ShardError as e:
+        self._set_hdf5_shard_error(streamer_name, e)
+    file_metadata, _ = self._get_metadata_hdf5()
+    if stats_table is not None:
+      file_metadata['Logger I/O statistics'] = stats_table
+    create_hdf5_link_master(filepath=self._hdf5_filepath, # type: ignore
+                            shard_filepaths={streamer_name: hdf5_shard.filepath for (streamer_name, hdf5_shard) in self._hdf5_shards.items()
+                                             if streamer_name not in self._hdf5_shard_errors},
+                            file_metadata=file_metadata)
+    self._hdf5_shards = OrderedDict()
+
+
+  # Record the error of a streamer's shard, the data of that streamer is discarded from then on.
+  def _set_hdf5_shard_error(self, streamer_name: str, error: HDF5ShardError) -> None:
+    if streamer_name not in self._hdf5_shard_errors:
+      print("%s %s, discarding the HDF5 data of %s from now on." % (self._log_tag, error, streamer_name), flush=True)
+      self._hdf5_shard_errors[streamer_name] = error
+
+
+  # Errors of the HDF5 shards that failed, by streamer.
+  def get_hdf5_shard_errors(self) -> OrderedDict[str, HDF5ShardError]:
+    return self._hdf5_shard_errors
+
+
+  # Resize datasets of an HDF5 file to remove extra empty rows, and close it.
+  # Optional @param file_metadata is added to the root attributes, once the file is out of SWMR mode.
+  #   The valid lengths of a SWMR file are dropped once its datasets are trimmed to them.
+  def _close_file_hdf5(self,
+                       hdf5_file: h5py.File,
+                       filepath_hdf5: str,
+                       next_data_indices: OrderedDict[str, OrderedDict[str, OrderedDict[str, int]]],
+                       file_metadata: dict[str, str] | None = None) -> None:
+    # Datasets of a SWMR file can't be shrunk while readers may be attached,
+    #   reopen the file in normal mode to trim it, if no reader holds it anymore.
+    if hdf5_file.swmr_mode:
+      hdf5_file.close()
+      try:
+        hdf5_file = h5py.File(filepath_hdf5, 'r+')
+      except OSError as e:
+        print("%s could not trim %s, still open by a reader, use `get_hdf5_valid_length` to read its datasets: %s"
+              % (self._log_tag, filepath_hdf5, e), flush=True)
+        return
+      del hdf5_file[HDF5_VALID_LENGTHS_PATH]
+    for (streamer_name, stream) in self._streams.items():
+      for (device_name, device_info) in stream.get_stream_info_all().items():
+        for (stream_name, stream_info) in device_info.items():
+          try:
+            dataset: h5py.Dataset = hdf5_file['/'.join([streamer_name, device_name, stream_name])]  # type: ignore
+          except KeyError: # a dataset was not created for this stream
+            continue
+          starting_index = next_data_indices[streamer_name][device_name][stream_name]
+          ending_index = starting_index - 1
+          dataset.resize((ending_index+1, *dataset.shape[1:]))
+          if HDF5_VALID_LENGTH_INDEX_KEY in dataset.attrs:
+            del dataset.attrs[HDF5_VALID_LENGTH_INDEX_KEY]
+    if file_metadata is not None:
+      hdf5_file.attrs.update(file_metadata)
+    hdf5_file.close()
 
 
   # Flush/close all of the video writers.
+  # Reports the encoder statistics of each, to see if any fell behind.
   def _close_files_video(self) -> None:
-    for (video_writer, *_) in self._video_writers:
-      video_writer.stdin.close() # type: ignore
-      # video_writer.stderr.close() # type: ignore
-      # video_writer.stdout.close() # type: ignore
-      video_writer.wait()
+    for (video_feeder, streamer_name, device_name, stream_name) in self._video_writers:
+      video_feeder.close()
+      print("%s %s" % (self._log_tag, video_feeder.get_stats_str()), flush=True)
+      if self._is_segmenting:
+        self._log_segment_video(self._video_segments[(streamer_name, device_name, stream_name)])
     self._video_writers = []
 
 
+  # Counters of each video encoder: backlog, written/dropped frames, achieved fps and pipe write latency.
+  def get_video_stats(self) -> list[dict[str, float | int | str]]:
+    return [video_feeder.get_stats() for (video_feeder, *_) in self._video_writers]
+
+
   # Flush/close all of the CSV writers.
   def _close_files_csv(self) -> None:
     for (stream_writer, *_) in self._csv_writers:
@@ -647,6 +1194,13 @@ class Logger(LoggerInterface):
       self._csv_writer_metadata = None
 
 
+  # Flush/close all of the Parquet writers.
+  def _close_files_parquet(self) -> None:
+    for (parquet_writer, *_) in self._parquet_writers:
+      parquet_writer.close()
+    self._parquet_writers = []
+
+
   # Flush/close all of the audio writers.
   def _close_files_audio(self) -> None:
     for (audio_writer, *_) in self._audio_writers:
@@ -655,76 +1209,370 @@ class Logger(LoggerInterface):
 
 
   # Flush/close CSV, HDF5, and video file writers.
+  # Summarizes the I/O counters of all writers into the HDF5 metadata and the log history.
   def _close_files(self) -> None:
+    stats_table = format_writer_stats_table(list(self._writer_stats.values())) if self._writer_stats else None
     self._close_files_csv()
-    self._close_files_hdf5()
+    self._close_files_hdf5(stats_table=stats_table)
+    self._close_files_parquet()
     self._close_files_video()
     self._close_files_audio()
+    self._close_segments()
+    if stats_table is not None:
+      self._log_stats_history(stats_table)
+
+
+  ################################
+  ###### SEGMENT OPERATIONS ######
+  ################################
+  # Start the first segment, the index of segments and the thread pool that closes rotated-out files.
+  # The index has a row per segment file, with the range of 'process_time_s' of its data for HDF5,
+  #   and the range of frame indices and the time of handing them to the encoder for video
+  #   (map frame indices to the exact capture time through the HDF5 data of the video stream's device).
+  def _init_segments(self) -> None:
+    self._segment_index = 0
+    self._segment_start_time_s = get_time()
+    self._segment_pool = concurrent.futures.ThreadPoolExecutor()
+    self._hdf5_segment_filepaths = []
+    self._video_segments = dict()
+    filename_csv = '%s__segments.csv' % (self._log_tag)
+    self._segment_index_writer = open(os.path.join(self._log_dir, filename_csv), 'w')
+    self._segment_index_writer.write('Segment,Type,File,Start time [s],End time [s],First frame index,Last frame index')
+    self._segment_index_writer.flush()
+
+
+  # Whether the current segment is long or big enough to start a new one.
+  # Waits for all the video writers to switch over to the previous segment first.
+  def _is_segment_due(self) -> bool:
+    if any(video_segment['segment'] < self._segment_index for video_segment in self._video_segments.values()):
+      return False
+    if self._segment_duration_s is not None and (get_time() - self._segment_start_time_s) >= self._segment_duration_s:
+      return True
+    if self._segment_size_bytes is not None:
+      filepaths = [video_segment['filepath'] for video_segment in self._video_segments.values()]
+      if self._hdf5_file is not None:
+        filepaths.append(self._hdf5_filepath)
+      return any(os.path.exists(filepath) and os.path.getsize(filepath) >= self._segment_size_bytes for filepath in filepaths)
+    return False
+
+
+  # Start a new segment.
+  # The HDF5 file is switched right away, in between writes,
+  #   video writers switch over in `_sync_write_video` on their next keyframe.
+  def _rotate_segments(self) -> None:
+    self._segment_index += 1
+    self._segment_start_time_s = get_time()
+    if self._hdf5_file is not None:
+      self._rotate_file_hdf5()
+
+
+  # Swap the HDF5 file for a new one, and trim/close the old one in the background.
+  def _rotate_file_hdf5(self) -> None:
+    self._log_metadata_hdf5()
+    hdf5_file = self._hdf5_file
+    filepath_hdf5 = self._hdf5_filepath
+    next_data_indices = self._next_data_indices_hdf5
+    time_range_s = self._hdf5_segment_time_range_s
+    self._hdf5_segment_filepaths.append(filepath_hdf5) # type: ignore
+    self._open_file_hdf5(self._get_filepath_hdf5())
+    self._segment_pool.submit(self._close_segment_hdf5, # type: ignore
+                              hdf5_file, filepath_hdf5, next_data_indices, self._segment_index-1, time_range_s)
+
+
+  def _close_segment_hdf5(self,
+                          hdf5_file: h5py.File,
+                          filepath_hdf5: str,
+                          next_data_indices: OrderedDict[str, OrderedDict[str, OrderedDict[str, int]]],
+                          segment_index: int,
+                          time_range_s: list[float]) -> None:
+    self._close_file_hdf5(hdf5_file=hdf5_file, filepath_hdf5=filepath_hdf5, next_data_indices=next_data_indices)
+    self._log_segment(segment_index, 'hdf5', filepath_hdf5, *time_range_s)
+
+
+  # Switch a video writer over to the current segment, if the frame can start a new video.
+  # Records the range of frames of the writer's segment.
+  # Returns the video writer to write the frame into.
+  def _update_segment_video(self,
+                            writer_index: int,
+                            video_writer: VideoFeeder,
+                            is_keyframe: bool,
+                            frame_index: int) -> VideoFeeder:
+    _, streamer_name, device_name, stream_name = self._video_writers[writer_index]
+    video_segment = self._video_segments[(streamer_name, device_name, stream_name)]
+    if video_segment['segment'] < self._segment_index and (is_keyframe or video_segment['is_intra_only']):
+      new_video_writer = self._open_file_video(streamer_name=streamer_name,
+                                               device_name=device_name,
+                                               stream_name=stream_name,
+                                               stream_info=self._streams[streamer_name].get_stream_info(device_name=device_name,
+                                                                                                       stream_name=stream_name))
+      self._video_writers[writer_index] = (new_video_writer, streamer_name, device_name, stream_name)
+      self._segment_pool.submit(self._close_segment_video, video_writer, video_segment) # type: ignore
+      video_writer = new_video_writer
+      video_segment = self._video_segments[(streamer_name, device_name, stream_name)]
+    if video_segment['first_frame_index'] is None:
+      video_segment['first_frame_index'] = int(frame_index)
+      video_segment['start_time_s'] = get_time()
+    video_segment['last_frame_index'] = int(frame_index)
+    video_segment['end_time_s'] = get_time()
+    return video_writer
+
+
+  def _close_segment_video(self, video_writer: VideoFeeder, video_segment: dict[str, Any]) -> None:
+    video_writer.close()
+    print("%s %s" % (self._log_tag, video_writer.get_stats_str()), flush=True)
+    self._log_segment_video(video_segment)
+
+
+  def _log_segment_video(self, video_segment: dict[str, Any]) -> None:
+    self._log_segment(video_segment['segment'],
+                      'video',
+                      video_segment['filepath'],
+                      video_segment['start_time_s'],
+                      video_segment['end_time_s'],
+                      video_segment['first_frame_index'],
+                      video_segment['last_frame_index'])
+
+
+  # Add a finished segment file to the index.
+  # Called from the writing threads and the threads closing rotated-out files.
+  def _log_segment(self,
+                   segment_index: int,
+                   segment_type: str,
+                   filepath: str,
+                   start_time_s: float,
+                   end_time_s: float,
+                   first_frame_index: int | None = None,
+                   last_frame_index: int | None = None) -> None:
+    with self._segment_index_lock:
+      if self._segment_index_writer is None:
+        return
+      self._segment_index_writer.write('\n%d,%s,%s,%.6f,%.6f,%s,%s' % (segment_index,
+                                                                       segment_type,
+                                                                       os.path.basename(filepath),
+                                                                       start_time_s,
+                                                                       end_time_s,
+                                                                       '' if first_frame_index is None else first_frame_index,
+                                                                       '' if last_frame_index is None else last_frame_index))
+      self._segment_index_writer.flush()
+
+
+  # Wait for the rotated-out files to be closed, then create the HDF5 master file and close the index.
+  def _close_segments(self) -> None:
+    if self._segment_pool is None:
+      return
+    self._segment_pool.shutdown(wait=True)
+    self._segment_pool = None
+    if self._hdf5_segment_vds and self._hdf5_filepath is not None:
+      self._hdf5_segment_filepaths.append(self._hdf5_filepath)
+      filepath_master = os.path.join(self._log_dir, '%s_master.hdf5' % self._log_tag)
+      try:
+        create_hdf5_vds_master(filepath_master, self._hdf5_segment_filepaths)
+      except OSError as e:
+        print("%s could not create the HDF5 master file %s: %s" % (self._log_tag, filepath_master, e), flush=True)
+    self._hdf5_segment_filepaths = []
+    self._video_segments = dict()
+    with self._segment_index_lock:
+      if self._segment_index_writer is not None:
+        self._segment_index_writer.close()
+        self._segment_index_writer = None
+
+
+  # Drain all available samples of a stream into one contiguous block,
+  #   shaped (num_samples, *sample_size), so it can be written with a single call.
+  # Returns None if there is no new data.
+  def _pop_data_stacked(self,
+                        streamer_name: str,
+                        device_name: str,
+                        stream_name: str,
+                        dtype: np.dtype,
+                        sample_size: tuple[int, ...]) -> np.ndarray | None:
+    new_data: list[Any] = list(self._streams[streamer_name].pop_data(device_name=device_name,
+                                                                     stream_name=stream_name,
+                                                                     num_oldest_to_pop=self._get_pop_limit(streamer_name, device_name, stream_name),
+                                                                     is_flush=self._is_flush))
+    if not new_data:
+      return None
+    if dtype.char == 'S':
+      new_data = [data.encode("ascii", "ignore") if isinstance(data, str) else data for data in new_data]
+    try:
+      # Fast path: all samples have the same shape and get stacked by NumPy in one go.
+      #   Each element may be a single sample or a batch of samples.
+      arr = np.array(new_data, dtype=dtype)
+      return arr.reshape(-1, *sample_size)
+    except ValueError:
+      # Ragged input (i.e. a mix of single samples and batches), stack into a preallocated block.
+      samples = [np.array(data, dtype=dtype, ndmin=1).reshape(-1, *sample_size) for data in new_data]
+      arr = np.empty((sum(len(s) for s in samples), *sample_size), dtype=dtype)
+      start_index = 0
+      for s in samples:
+        arr[start_index:start_index+len(s)] = s
+        start_index += len(s)
+      return arr
 
 
   # Write provided data to the HDF5 file.
   # Note that this can be called during streaming (periodic writing)
   #  or during post-experiment dumping.
+  # All the available samples of the stream are written as one block (single hyperslab selection),
+  #   growing the dataset geometrically so that resizes become rarer as the recording goes on.
   def _sync_write_hdf5(self, 
                        streamer_name: str, 
                        device_name: str, 
                        stream_name: str) -> None:
-    if self._hdf5_file is not None:
+    if self._hdf5_file is not None and self._is_due(streamer_name, device_name, stream_name):
       try:
         dataset: h5py.Dataset = self._hdf5_file['/'.join([streamer_name, device_name, stream_name])]  # type: ignore
       except KeyError: # a dataset was not created for this stream
         return
-      new_data: Iterator[Any] = self._streams[streamer_name].pop_data(device_name=device_name, stream_name=stream_name, is_flush=self._is_flush)
-      # Write all available data to HDF5 file.
-      for data in new_data:
-        dataset_dtype: np.dtype = dataset.dtype
-        if dataset_dtype.char == 'S':
-          data: str
-          encoded_text = [data.encode("ascii", "ignore")]
-          arr = np.array(encoded_text, ndmin=1)
+      queue_depth = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+      start_time_s = get_time()
+      arr = self._pop_data_stacked(streamer_name=streamer_name,
+                                   device_name=device_name,
+                                   stream_name=stream_name,
+                                   dtype=dataset.dtype,
+                                   sample_size=dataset.shape[1:])
+      if arr is None:
+        return
+      num_elements = arr.shape[0]
+      start_index = self._next_data_indices_hdf5[streamer_name][device_name][stream_name]
+      end_index = start_index + num_elements
+      # Expand the dataset if needed, at least doubling its size.
+      #   In SWMR mode, it grows to the next whole chunk instead, to not hold much unwritten space in a file that readers follow.
+      if end_index > len(dataset):
+        if self._hdf5_file.swmr_mode:
+          chunk_length = dataset.chunks[0] # type: ignore
+          dataset.resize((-(-end_index // chunk_length) * chunk_length, *dataset.shape[1:]))
         else:
-          arr = np.array(data, ndmin=1)
-        num_elements = 1 if arr.shape == dataset.shape[1:] else arr.shape[0]
-        # Extend the dataset as needed while iterating over the 'new_data'.
-        start_index = self._next_data_indices_hdf5[streamer_name][device_name][stream_name]
-        # Expand the dataset if needed.
-        if not (start_index+num_elements < len(dataset)):
-          dataset.resize((len(dataset) + self._hdf5_log_length_increment, *dataset.shape[1:]))
-        dataset[start_index:start_index+num_elements,:] = arr
-        # Write the new entries.
-        # Update the next starting index to use.
-        start_index += num_elements
-        self._next_data_indices_hdf5[streamer_name][device_name][stream_name] = start_index
-      # Flush the file with the new data.
-      self._hdf5_file.flush()
+          dataset.resize((max(end_index, 2*len(dataset), self._hdf5_log_length_increment), *dataset.shape[1:]))
+      # Write all available data to HDF5 file at once.
+      dataset[start_index:end_index] = arr
+      # Update the next starting index to use.
+      self._next_data_indices_hdf5[streamer_name][device_name][stream_name] = end_index
+      # Keep track of the time range covered by the segment.
+      if self._is_segmenting and stream_name == 'process_time_s':
+        self._hdf5_segment_time_range_s = [float(np.fmin(self._hdf5_segment_time_range_s[0], arr.min())),
+                                           float(np.fmax(self._hdf5_segment_time_range_s[1], arr.max()))]
+      self._record_write('hdf5', streamer_name, device_name, stream_name, num_elements, arr.nbytes, start_time_s, queue_depth)
+
+
+  # Write provided data of a streamer to its HDF5 shard.
+  # Note that this can be called during streaming (periodic writing)
+  #  or during post-experiment dumping.
+  # Stacks all available samples of each stream into a block and hands it to the shard process.
+  # Data of a failed shard is still drained from the Streams, to not pile up in memory.
+  def _sync_write_hdf5_shard(self, hdf5_shard: HDF5Shard, streamer_name: str) -> None:
+    for (device_name, device_info) in self._streams[streamer_name].get_stream_info_all().items():
+      for (stream_name, stream_info) in device_info.items():
+        if stream_info['is_video'] or stream_info['is_audio'] or not self._is_due(streamer_name, device_name, stream_name):
+          continue
+        queue_depth = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+        start_time_s = get_time()
+        arr = self._pop_data_stacked(streamer_name=streamer_name,
+                                     device_name=device_name,
+                                     stream_name=stream_name,
+                                     dtype=np.dtype(stream_info['data_type']),
+                                     sample_size=tuple(stream_info['sample_size']))
+        if arr is None or streamer_name in self._hdf5_shard_errors:
+          continue
+        try:
+          hdf5_shard.write('/'.join([streamer_name, device_name, stream_name]), arr)
+        except HDF5ShardError as e:
+          self._set_hdf5_shard_error(streamer_name, e)
+          continue
+        self._record_write('hdf5', streamer_name, device_name, stream_name, len(arr), arr.nbytes, start_time_s, queue_depth)
+    if streamer_name not in self._hdf5_shard_errors:
+      try:
+        hdf5_shard.flush()
+      except HDF5ShardError as e:
+        self._set_hdf5_shard_error(streamer_name, e)
 
 
   # Write provided data to the video files.
   # Note that this can be called during streaming (periodic writing)
   #   or during post-experiment dumping.
+  # Only hands the frames off to the encoder's feeder thread, which does the actual pipe writes.
+  # If segmenting, switches to the writer of the next segment at the first keyframe after rotation.
   def _sync_write_video(self,
-                        video_writer: Popen,
+                        video_writer: VideoFeeder,
+                        writer_index: int,
                         streamer_name: str,
                         device_name: str,
                         stream_name: str):
+    if not self._is_due(streamer_name, device_name, stream_name):
+      return
+    queue_depth = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+    start_time_s = get_time()
+    num_frames = 0
+    num_bytes = 0
     # Write all available video frames to file.
     new_data: Iterator[tuple[bytes, bool, int]] = self._streams[streamer_name].pop_data(device_name=device_name, 
                                                                                         stream_name=stream_name, 
+                                                                                        num_oldest_to_pop=self._get_pop_limit(streamer_name, device_name, stream_name),
                                                                                         is_flush=self._is_flush)
     for frame_buffer, is_keyframe, frame_index in new_data:
-      video_writer.stdin.write(frame_buffer) # type: ignore
+      if self._is_segmenting:
+        video_writer = self._update_segment_video(writer_index=writer_index,
+                                                  video_writer=video_writer,
+                                                  is_keyframe=is_keyframe,
+                                                  frame_index=frame_index)
+      video_writer.put(frame_buffer, frame_index)
+      num_frames += 1
+      num_bytes += len(frame_buffer)
+    if num_frames:
+      self._record_write('video', streamer_name, device_name, stream_name, num_frames, num_bytes, start_time_s, queue_depth)
+
+
+  # Fixed printf-style format of a single CSV value, per data type.
+  #   Floats get just enough significant digits to round-trip exactly.
+  #   Booleans keep the True/False of the per-row writer.
+  def _get_csv_value_format(self, data_type: np.dtype) -> str:
+    if data_type.kind == 'f':
+      return {2: '%.5g', 4: '%.9g'}.get(data_type.itemsize, '%.17g')
+    elif data_type.kind == 'b':
+      return '%s'
+    else:
+      return '%d'
 
 
   # Write provided data to the CSV file.
   # Note that this can be called during streaming (periodic writing)
   #  or during post-experiment dumping.
+  # Numeric streams are drained into one 2-D block and formatted with a single
+  #   formatting call for all rows, then written at once.
   def _sync_write_csv(self,
                       stream_writer: TextIOWrapper,
                       streamer_name: str, 
                       device_name: str, 
                       stream_name: str) -> None:
-    new_data: Iterator[Any] = self._streams[streamer_name].pop_data(device_name=device_name, stream_name=stream_name, is_flush=self._is_flush)
+    if not self._is_due(streamer_name, device_name, stream_name):
+      return
+    queue_depth = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+    start_time_s = get_time()
+    stream_info = self._streams[streamer_name].get_stream_info(device_name=device_name, stream_name=stream_name)
+    data_type = np.dtype(stream_info['data_type'])
+    if data_type.kind in 'biuf':
+      arr = self._pop_data_stacked(streamer_name=streamer_name,
+                                   device_name=device_name,
+                                   stream_name=stream_name,
+                                   dtype=data_type,
+                                   sample_size=tuple(stream_info['sample_size']))
+      if arr is not None:
+        # Unwrap each sample into columns in the same order as the headers written in _init_files_csv().
+        arr = arr.reshape(len(arr), -1)
+        row_format = '\n' + ','.join([self._get_csv_value_format(data_type)] * arr.shape[1])
+        rows = (row_format * arr.shape[0]) % tuple(arr.ravel().tolist())
+        stream_writer.write(rows)
+        stream_writer.flush()
+        self._record_write('csv', streamer_name, device_name, stream_name, len(arr), len(rows), start_time_s, queue_depth)
+      return
+    # Text and other non-numeric data are written row by row.
+    new_data: Iterator[Any] = self._streams[streamer_name].pop_data(device_name=device_name,
+                                                                    stream_name=stream_name,
+                                                                    num_oldest_to_pop=self._get_pop_limit(streamer_name, device_name, stream_name),
+                                                                    is_flush=self._is_flush)
     # Write all available data to CSV file.
+    num_rows = 0
+    num_bytes = 0
     for data_to_write in new_data:
       # Create a list of column entries to write.
       # Note that they should match the heading order in _init_writing_csv().
@@ -735,9 +1583,50 @@ class Logger(LoggerInterface):
       else:
         to_write = list(data_to_write)
       # Write the new row.
-      stream_writer.write('\n')
-      stream_writer.write(','.join([str(x) for x in to_write]))
+      row = '\n' + ','.join([str(x) for x in to_write])
+      stream_writer.write(row)
+      num_rows += 1
+      num_bytes += len(row)
     stream_writer.flush()
+    if num_rows:
+      self._record_write('csv', streamer_name, device_name, stream_name, num_rows, num_bytes, start_time_s, queue_depth)
+
+
+  # Write provided data to the Parquet file.
+  # Note that this can be called during streaming (periodic writing)
+  #  or during post-experiment dumping.
+  # All the available samples are written as one row group.
+  def _sync_write_parquet(self,
+                          parquet_writer: 'pq.ParquetWriter',
+                          streamer_name: str,
+                          device_name: str,
+                          stream_name: str) -> None:
+    if not self._is_due(streamer_name, device_name, stream_name):
+      return
+    queue_depth = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+    start_time_s = get_time()
+    stream_info = self._streams[streamer_name].get_stream_info(device_name=device_name, stream_name=stream_name)
+    arr = self._pop_data_stacked(streamer_name=streamer_name,
+                                 device_name=device_name,
+                                 stream_name=stream_name,
+                                 dtype=np.dtype(stream_info['data_type']),
+                                 sample_size=tuple(stream_info['sample_size']))
+    if arr is None:
+      return
+    column_type: pa.DataType = parquet_writer.schema.field(0).type
+    if pa.types.is_fixed_size_list(column_type):
+      values = arr.reshape(-1)
+      value_type = column_type.value_type
+    else:
+      values = arr.reshape(len(arr))
+      value_type = column_type
+    if pa.types.is_string(value_type):
+      values = np.char.decode(values, 'ascii', 'ignore')
+    column = pa.array(values, type=value_type)
+    if pa.types.is_fixed_size_list(column_type):
+      column = pa.FixedSizeListArray.from_arrays(column, column_type.list_size)
+    parquet_writer.write_table(pa.Table.from_arrays([column], schema=parquet_writer.schema))
+    self._record_write('parquet', streamer_name, device_name, stream_name, len(arr), arr.nbytes, start_time_s, queue_depth)
 
 
   # Write provided data to the audio files.
@@ -748,11 +1637,25 @@ class Logger(LoggerInterface):
                         streamer_name: str, 
                         device_name: str, 
                         stream_name: str):
-    new_data: Iterator[Any] = self._streams[streamer_name].pop_data(device_name=device_name, stream_name=stream_name, is_flush=self._is_flush)
+    if not self._is_due(streamer_name, device_name, stream_name):
+      return
+    queue_depth = self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+    start_time_s = get_time()
+    num_frames = 0
+    num_bytes = 0
+    new_data: Iterator[Any] = self._streams[streamer_name].pop_data(device_name=device_name,
+                                                                    stream_name=stream_name,
+                                                                    num_oldest_to_pop=self._get_pop_limit(streamer_name, device_name, stream_name),
+                                                                    is_flush=self._is_flush)
     # Write all available audio frames to file.
     for frame in new_data:
       # Assume the data is a list of lists (each entry is a list of chunked audio data).
-      audio_writer.writeframes(bytearray(frame))
+      frame_bytes = bytearray(frame)
+      audio_writer.writeframes(frame_bytes)
+      num_frames += 1
+      num_bytes += len(frame_bytes)
+    if num_frames:
+      self._record_write('audio', streamer_name, device_name, stream_name, num_frames, num_bytes, start_time_s, queue_depth)
 
 
   # Wraps writing of multiple asynchronous Stream Deque data structures 
@@ -765,18 +1668,35 @@ class Logger(LoggerInterface):
           self._sync_write_hdf5(streamer_name=streamer_name, 
                                 device_name=device_name, 
                                 stream_name=stream_name)
+    # Flush the file once with the new data of all streams.
+    #   In SWMR mode, the valid lengths are published only after that, so readers never see rows that are not on disk yet.
+    if self._hdf5_file is not None:
+      self._hdf5_file.flush()
+      if self._hdf5_file.swmr_mode:
+        self._publish_valid_lengths_hdf5()
+
+
+  # Publish the number of valid samples of every dataset to SWMR readers, see `get_hdf5_valid_length`.
+  #   A single small write and flush for all the datasets of the file.
+  def _publish_valid_lengths_hdf5(self) -> None:
+    valid_lengths: h5py.Dataset = self._hdf5_file[HDF5_VALID_LENGTHS_PATH] # type: ignore
+    valid_lengths[:] = [self._next_data_indices_hdf5[streamer_name][device_name][stream_name]
+                        for (streamer_name, device_name, stream_name) in self._hdf5_valid_length_keys]
+    valid_lengths.flush()
 
 
   # Wraps synchronous writing of multiple asynchronous Stream Deque data structures 
   #   into an asynchronous coroutine used to concurrently write multiple video files.
   async def _write_video(self,
-                         video_writer: Popen,
+                         video_writer: VideoFeeder,
+                         writer_index: int,
                          streamer_name: str,
                          device_name: str,
                          stream_name: str):
     await asyncio.get_event_loop().run_in_executor(
       self._thread_pool,
       lambda: self._sync_write_video(video_writer=video_writer,
+                                     writer_index=writer_index,
                                      streamer_name=streamer_name, 
                                      device_name=device_name, 
                                      stream_name=stream_name))
@@ -797,6 +1717,21 @@ class Logger(LoggerInterface):
                                    stream_name=stream_name))
 
 
+  # Wraps synchronous writing of multiple asynchronous Stream Deque data structures 
+  #   into an asynchronous coroutine used to concurrently write multiple Parquet files.
+  async def _write_parquet(self,
+                           parquet_writer: 'pq.ParquetWriter',
+                           streamer_name: str,
+                           device_name: str,
+                           stream_name: str):
+    await asyncio.get_event_loop().run_in_executor(
+      self._thread_pool,
+      lambda: self._sync_write_parquet(parquet_writer=parquet_writer,
+                                       streamer_name=streamer_name, 
+                                       device_name=device_name, 
+                                       stream_name=stream_name))
+
+
   # Wraps synchronous writing of multiple asynchronous Stream Deque data structures 
   #   into an asynchronous coroutine used to concurrently write multiple audio files.
   async def _write_audio(self,
@@ -815,7 +1750,15 @@ class Logger(LoggerInterface):
   # Wraps synchronous writing to a single HDF5 file, 
   #   from multiple asynchronous Stream Deque data structures,
   #   into an asynchronous coroutine that can be run concurrently to other file IO.
+  # With sharded output, each shard is fed concurrently instead.
   async def _write_files_hdf5(self):
+    if self._hdf5_shards:
+      await asyncio.gather(*[asyncio.get_event_loop().run_in_executor(
+                               self._thread_pool,
+                               lambda hdf5_shard=hdf5_shard, streamer_name=streamer_name: self._sync_write_hdf5_shard(hdf5_shard=hdf5_shard,
+                                                                                                                    streamer_name=streamer_name))
+                             for (streamer_name, hdf5_shard) in self._hdf5_shards.items()])
+      return
     await asyncio.get_event_loop().run_in_executor(
       self._thread_pool,
       lambda: self._write_hdf5())
@@ -826,9 +1769,10 @@ class Logger(LoggerInterface):
   async def _write_files_video(self):
     tasks = []
     # Write new data for each stream of each device of each streamer.
-    for (video_writer, streamer_name, device_name, stream_name) in self._video_writers:
+    for writer_index, (video_writer, streamer_name, device_name, stream_name) in enumerate(self._video_writers):
       tasks.append(
         self._write_video(video_writer=video_writer,
+                          writer_index=writer_index,
                           streamer_name=streamer_name, 
                           device_name=device_name, 
                           stream_name=stream_name))
@@ -849,6 +1793,20 @@ class Logger(LoggerInterface):
     await asyncio.gather(*tasks)
     
 
+  # Awaits completion from a wrapper that wraps concurrent writing to multiple Parquet files,
+  #   of multiple asynchronous Stream Deque data structures containing numeric/text data.
+  async def _write_files_parquet(self):
+    tasks = []
+    # Write new data for each stream of each device of each streamer.
+    for (parquet_writer, streamer_name, device_name, stream_name) in self._parquet_writers:
+      tasks.append(
+        self._write_parquet(parquet_writer=parquet_writer,
+                            streamer_name=streamer_name, 
+                            device_name=device_name, 
+                            stream_name=stream_name))
+    await asyncio.gather(*tasks)
+
+
   # Awaits completion from a wrapper that wraps concurrent writing to multiple audio files,
   #   of multiple asynchronous Stream Deque data structures containing audio data.
   async def _write_files_audio(self):
@@ -866,8 +1824,65 @@ class Logger(LoggerInterface):
   ##########################
   ###### DATA LOGGING ######
   ##########################
+  # Write the streams due in this iteration to all the configured outputs.
+  async def _write_files(self) -> None:
+    # Delegate file writing to each AsyncIO method that manages corresponding stream type writing.
+    tasks = []
+    if self._stream_hdf5:
+      tasks.append(self._write_files_hdf5())
+    if self._stream_video:
+      tasks.append(self._write_files_video())
+    if self._stream_csv:
+      tasks.append(self._write_files_csv())
+    if self._stream_parquet:
+      tasks.append(self._write_files_parquet())
+    if self._stream_audio:
+      tasks.append(self._write_files_audio())
+    await asyncio.gather(*tasks)
+
+
+  # Total number of samples waiting in the Stream FIFOs of all the written streams.
+  def _get_num_available_total(self) -> int:
+    return sum(self._streams[streamer_name].get_num_available(device_name=device_name, stream_name=stream_name)
+               for (streamer_name, device_name, stream_name) in self._flush_states.keys())
+
+
+  # Write all the data once the session ended, in bounded chunks, by all the workers concurrently.
+  # Until then, if configured, flush in the background every `dump_background_period_s`
+  #   if the process used less than `dump_background_max_load` of the CPU cores since the last check.
+  #   Background flushes leave the last few unsolidified samples of each stream, like periodic writing does.
+  async def _dump_data(self) -> None:
+    last_check_time_s = get_time()
+    last_cpu_time_s = time.process_time()
+    while not self._is_flush:
+      await asyncio.sleep(1 if self._dump_background_period_s is None else self._dump_background_period_s)
+      if self._dump_background_period_s is None or self._is_flush:
+        continue
+      check_time_s, cpu_time_s = get_time(), time.process_time()
+      load = (cpu_time_s - last_cpu_time_s) / max(1e-6, (check_time_s - last_check_time_s) * (os.cpu_count() or 1))
+      if load < self._dump_background_max_load:
+        self._schedule_flush()
+        await self._write_files()
+      last_check_time_s, last_cpu_time_s = get_time(), time.process_time()
+    # Drain everything that is left, one bounded chunk of each stream per pass.
+    num_total = self._get_num_available_total()
+    start_time_s = get_time()
+    while (num_remaining := self._get_num_available_total()) > 0:
+      print("%s dumping: %d/%d samples written (%.1f%%), %.1f s elapsed"
+            % (self._log_tag, num_total-num_remaining, num_total, 100*(num_total-num_remaining)/num_total, get_time()-start_time_s), flush=True)
+      self._schedule_flush()
+      await self._write_files()
+    print("%s dumping: all %d samples written in %.1f s" % (self._log_tag, num_total, get_time()-start_time_s), flush=True)
+    # Log metadata.
+    self._log_metadata()
+    # Save and close the files.
+    self._close_files()
+    self._is_finished = True
+    self._is_dumping = False
+
   # Poll data from each streamer and log it, either periodically or all at once.
-  # The poll period is set by self._stream_period_s.
+  # The poll period is set by self._stream_period_s,
+  #   or by self._stream_period_min_s with adaptive flushing, where each iteration only writes the streams that are due.
   # Will loop until self._is_streaming is False, and then
   #  will do one final fetch/log if self._is_flush is True.
   # Usage to periodically poll data from each streamer and log it:
@@ -880,16 +1895,21 @@ class Logger(LoggerInterface):
   async def _log_data(self) -> None:
     # Used to run periodic data writing.
     last_log_time_s = None
+    log_period_s = self._stream_period_min_s if self._is_adaptive_flush else self._stream_period_s
     # Set at the beginning of the iteration if _is_flush is externally modified to indicate cleanup and exit,
     #   to catch case where external command to flush happened while some of streamers already saved part of available data.
     is_flush_all_in_current_iteration = False
+    # Socket to publish the I/O counters on, owned by this thread.
+    if self._is_publish_stats:
+      self._stats_pub = zmq.Context.instance().socket(zmq.PUB)
+      self._stats_pub.connect("tcp://%s:%s" % (DNS_LOCALHOST, self._stats_port))
     while (self._is_streaming or self._is_flush) and not self._is_finished:
       # Wait until it is time to write new data, which is either:
       #  1. This is the first iteration.
       #  2. It has been at least self._stream_period_s since the last write.
       #  3. Periodic logging has been deactivated.
       while (last_log_time_s is not None
-            and (time_to_next_period := (last_log_time_s + self._stream_period_s - get_time())) > 0
+            and (time_to_next_period := (last_log_time_s + log_period_s - get_time())) > 0
             and self._is_streaming):
         # Will wake up periodically to check if the experiment had been ended.
         #   Will proceed only if time for next logging or if experiment ended.
@@ -906,18 +1926,14 @@ class Logger(LoggerInterface):
       # If the log should be flushed, record that it is happening during this iteration for ALL streamers.
       if self._is_flush:
         is_flush_all_in_current_iteration = True
-      # Delegate file writing to each AsyncIO method that manages corresponding stream type writing.
-      tasks = []
-      if self._stream_hdf5:
-        tasks.append(self._write_files_hdf5())
-      if self._stream_video:
-        tasks.append(self._write_files_video())
-      if self._stream_csv:
-        tasks.append(self._write_files_csv())
-      if self._stream_audio:
-        tasks.append(self._write_files_audio())
+      # Pick the streams to write in this iteration.
+      self._schedule_flush()
       # Execute all file writing concurrently.
-      await asyncio.gather(*tasks)
+      await self._write_files()
+      # Start a new segment once the current one is long or big enough.
+      if self._is_streaming and self._is_segmenting and self._is_segment_due():
+        self._rotate_segments()
+      self._publish_stats()
       # If stream-logging is disabled, but a final flush had been requested,
       #   record that the flush is complete so streaming can really stop now.
       # Note that it also checks whether the flush was configured to happen for all streamers during this iteration.
@@ -931,3 +1947,222 @@ class Logger(LoggerInterface):
     self._log_metadata()
     # Save and close the files.
     self._close_files()
+    if self._stats_pub is not None:
+      self._stats_pub.close()
+      self._stats_pub = None
+
+
+##############################################################################################
+##############################################################################################
+# Handles to the Logger owned by a Node, hiding where the Logger runs.
+# Node hands every new message to the handle with `log`, instead of appending to the Streams itself.
+#   ThreadLoggerHandle: Logger runs in a thread of the Node process on the Node's own Streams,
+#     file writing competes for the GIL with the Node's main loop.
+#   ProcessLoggerHandle: Logger runs in a dedicated process with its own copy of the Streams,
+#     Node forwards the already serialized messages over a local ZeroMQ PUSH/PULL channel,
+#     bounded by the high water mark, which blocks the Node if the Logger process falls too far behind.
+#     NOTE: Node's own Streams then stay empty, use thread mode for Nodes that read their Streams (i.e. GUI).
+#   JournalLoggerHandle: no Logger runs during the session, the serialized messages are appended as-is
+#     to journal files, and converted into the regular Logger outputs offline with `convert_journal`.
+# Shutdown semantics are the same in both modes:
+#   `cleanup` lets the Logger flush the remaining data and `join` waits until the files are closed.
+##############################################################################################
+##############################################################################################
+class LoggerHandle(ABC):
+  # Record a new message of a Stream.
+  # @param payload is the serialized message, @param msg is the deserialized one, if the caller already has it.
+  @abstractmethod
+  def log(self, stream_key: str, payload: bytes, msg: dict | None = None) -> None:
+    pass
+
+  @abstractmethod
+  def cleanup(self) -> None:
+    pass
+
+  @abstractmethod
+  def join(self) -> None:
+    pass
+
+
+class ThreadLoggerHandle(LoggerHandle):
+  def __init__(self,
+               log_tag: str,
+               streams: OrderedDict[str, Stream],
+               logging_spec: dict):
+    self._streams = streams
+    self._logger = Logger(log_tag, **logging_spec)
+    # Launch datalogging thread with reference to the Stream objects.
+    self._logger_thread = threading.Thread(target=self._logger, args=(streams,))
+    self._logger_thread.start()
+
+
+  def log(self, stream_key: str, payload: bytes, msg: dict | None = None) -> None:
+    self._streams[stream_key].append_data(**(msg if msg is not None else deserialize(payload)))
+
+
+  def cleanup(self) -> None:
+    self._logger.cleanup()
+
+
+  def join(self) -> None:
+    self._logger_thread.join()
+
+
+  # Path of the HDF5 file the Logger wrote, see `Logger.get_hdf5_filepath`.
+  def get_hdf5_filepath(self) -> str | None:
+    return self._logger.get_hdf5_filepath()
+
+
+class ProcessLoggerHandle(LoggerHandle):
+  def __init__(self,
+               log_tag: str,
+               stream_factories: list[tuple[str, type, dict]],
+               logging_spec: dict,
+               ctx: zmq.Context,
+               logger_process_hwm: int = 10000):
+    # Socket to forward messages to the Logger process.
+    self._push: zmq.SyncSocket = ctx.socket(zmq.PUSH)
+    self._push.setsockopt(zmq.SNDHWM, logger_process_hwm)
+    port = self._push.bind_to_random_port("tcp://%s" % IP_LOOPBACK)
+    # Spawn a fresh interpreter, a forked child would inherit the ZeroMQ context and its threads in an undefined state.
+    self._logger_process = multiprocessing.get_context('spawn').Process(target=run_logger_process,
+                                                                        args=(log_tag,
+                                                                              stream_factories,
+                                                                              logging_spec,
+                                                                              "tcp://%s:%d" % (IP_LOOPBACK, port),
+                                                                              logger_process_hwm))
+    self._logger_process.start()
+
+
+  def log(self, stream_key: str, payload: bytes, msg: dict | None = None) -> None:
+    self._push.send_multipart([stream_key.encode('utf-8'), payload])
+
+
+  # Tell the Logger process that no more data will come, so it can flush and close the files.
+  def cleanup(self) -> None:
+    self._push.send_multipart([CMD_END.encode('utf-8'), b''])
+
+
+  def join(self) -> None:
+    self._logger_process.join()
+    self._push.close()
+
+
+class JournalLoggerHandle(LoggerHandle):
+  def __init__(self,
+               log_tag: str,
+               stream_factories: list[tuple[str, type, dict]],
+               logging_spec: dict):
+    self._journal = JournalWriter(log_dir=logging_spec['log_dir'],
+                                  log_tag=log_tag,
+                                  journal_spec={'stream_factories': stream_factories, 'logging_spec': logging_spec},
+                                  flush_period_s=logging_spec.get('journal_flush_period_s', 0.5),
+                                  fsync_period_s=logging_spec.get('journal_fsync_period_s', 5.0),
+                                  max_file_size_bytes=int(logging_spec.get('journal_file_size_gb', 1.0) * 1024**3))
+
+
+  def log(self, stream_key: str, payload: bytes, msg: dict | None = None) -> None:
+    self._journal.append(stream_key, payload)
+
+
+  def cleanup(self) -> None:
+    self._journal.close()
+
+
+  def join(self) -> None:
+    pass
+
+
+# Entry-point of the Logger process.
+# Recreates the Node's Streams from their factories, fills them with the forwarded messages,
+#   and runs the Logger on them in a background thread, exactly as the Node would in thread mode.
+def run_logger_process(log_tag: str,
+                       stream_factories: list[tuple[str, type, dict]],
+                       logging_spec: dict,
+                       address: str,
+                       logger_process_hwm: int) -> None:
+  streams: OrderedDict[str, Stream] = OrderedDict([(stream_key, class_type.create_stream(stream_info))
+                                                    for (stream_key, class_type, stream_info) in stream_factories])
+  logger_handle = ThreadLoggerHandle(log_tag=log_tag, streams=streams, logging_spec=logging_spec)
+  ctx = zmq.Context()
+  pull: zmq.SyncSocket = ctx.socket(zmq.PULL)
+  pull.setsockopt(zmq.RCVHWM, logger_process_hwm)
+  pull.connect(address)
+  while (packet := pull.recv_multipart())[0] != CMD_END.encode('utf-8'):
+    stream_key, payload = packet
+    logger_handle.log(stream_key.decode('utf-8'), payload)
+  # Node stopped producing data, flush the rest and wait for the files to close.
+  logger_handle.cleanup()
+  logger_handle.join()
+  pull.close()
+  ctx.term()
+
+
+# Launches the Logger of a Node either in a thread of the Node, or in its own process,
+#   depending on the 'is_logger_process' flag of the logging spec,
+#   or journals the raw messages instead if the 'is_journal' flag is set.
+# @param streams are the Node's Stream objects, used in thread mode.
+# @param stream_factories are (stream key, Node class, stream info) tuples to recreate the same Streams
+#   with `create_stream` in the Logger process.
+def create_logger_handle(log_tag: str,
+                         streams: OrderedDict[str, Stream],
+                         stream_factories: list[tuple[str, type, dict]],
+                         logging_spec: dict,
+                         ctx: zmq.Context) -> LoggerHandle:
+  if logging_spec.get('is_journal', False):
+    return JournalLoggerHandle(log_tag=log_tag,
+                               stream_factories=stream_factories,
+                               logging_spec=logging_spec)
+  elif logging_spec.get('is_logger_process', False):
+    return ProcessLoggerHandle(log_tag=log_tag,
+                               stream_factories=stream_factories,
+                               logging_spec=logging_spec,
+                               ctx=ctx,
+                               logger_process_hwm=logging_spec.get('logger_process_hwm', 10000))
+  else:
+    return ThreadLoggerHandle(log_tag=log_tag,
+                              streams=streams,
+                              logging_spec=logging_spec)
+
+
+# Worker of `convert_journal` that replays the journaled messages of one Stream into a Logger,
+#   configured like the Node's Logger would have been during the session.
+# Returns the path of the HDF5 file it wrote, if any.
+def convert_journal_stream(log_tag: str,
+                           stream_factory: tuple[str, type, dict],
+                           logging_spec: dict) -> str | None:
+  stream_key, class_type, stream_info = stream_factory
+  streams: OrderedDict[str, Stream] = OrderedDict([(stream_key, class_type.create_stream(stream_info))])
+  logger_handle = ThreadLoggerHandle(log_tag='%s_%s' % (log_tag, stream_key),
+                                     streams=streams,
+                                     logging_spec={**logging_spec, 'is_journal': False, 'is_logger_process': False})
+  for (topic, toa_s, payload) in read_journal(logging_spec['log_dir'], log_tag, topics={stream_key}):
+    logger_handle.log(topic, payload)
+  logger_handle.cleanup()
+  logger_handle.join()
+  return logger_handle.get_hdf5_filepath()
+
+
+# Converts the journal of a Node into the regular Logger outputs, in parallel with a process per Stream.
+# The per-Stream HDF5 files are merged into a single '<log_tag>.hdf5' with the usual /streamer/device/stream layout,
+#   other outputs keep the per-Stream '<log_tag>_<streamer>' prefix.
+def convert_journal(log_dir: str, log_tag: str, num_workers: int | None = None) -> None:
+  journal_spec = load_journal_spec(log_dir, log_tag)
+  stream_factories: list[tuple[str, type, dict]] = journal_spec['stream_factories']
+  logging_spec: dict = {**journal_spec['logging_spec'], 'log_dir': log_dir}
+  with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers or len(stream_factories),
+                                              mp_context=multiprocessing.get_context('spawn')) as pool:
+    filepaths_hdf5 = list(pool.map(convert_journal_stream,
+                                   [log_tag]*len(stream_factories),
+                                   stream_factories,
+                                   [logging_spec]*len(stream_factories)))
+  filepaths_hdf5 = [filepath for filepath in filepaths_hdf5 if filepath is not None and os.path.exists(filepath)]
+  if not filepaths_hdf5:
+    return
+  with h5py.File(os.path.join(log_dir, '%s.hdf5' % log_tag), 'w') as hdf5_file:
+    for filepath in filepaths_hdf5:
+      with h5py.File(filepath, 'r') as stream_hdf5_file:
+        hdf5_file.attrs.update(stream_hdf5_file.attrs)
+        for streamer_name in stream_hdf5_file.keys():
+          stream_hdf5_file.copy(stream_hdf5_file[streamer_name], hdf5_file, name=streamer_name)
+      os.remove(filepath)
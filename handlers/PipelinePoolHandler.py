@@ -0,0 +1,170 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import multiprocessing
+from typing import Any
+import zlib
+
+import zmq
+
+from utils.msgpack_utils import deserialize, serialize
+from utils.zmq_utils import *
+
+
+# Raised by the pool once one of its worker processes died, instead of waiting for its outputs forever.
+class PipelineWorkerError(RuntimeError):
+  pass
+
+
+# Fans the input messages of a Pipeline out to worker processes, and merges their outputs back in input order.
+# Each worker runs the Pipeline type's `_create_worker` once, then `_run_worker` on every message it gets.
+# Messages go round-robin, or by device (the devices in the message), to keep per-device state in one worker.
+# At most `max_reorder_len` messages are in flight: submitting more waits for the oldest outputs,
+#   which bounds the reorder buffer and pushes back on the Pipeline when the workers can't keep up.
+# Workers connect over local TCP, so their outputs can be polled along the Node's other sockets.
+# Waiting for outputs is done in steps of `poll_period_s`, checking in between that the workers are alive,
+#   so a crashed worker raises `PipelineWorkerError` instead of blocking the Pipeline forever.
+class PipelineWorkerPool:
+  def __init__(self,
+               pipeline_type: type,
+               worker_spec: dict,
+               num_workers: int,
+               ctx: zmq.Context,
+               routing: str = 'round_robin', # [round_robin, device]
+               max_reorder_len: int = 64,
+               poll_period_s: float = 1.0):
+    if routing not in ('round_robin', 'device'):
+      raise ValueError("Unsupported worker routing '%s', must be one of ('round_robin', 'device')." % routing)
+    self._num_workers = num_workers
+    self._poll_period_s = poll_period_s
+    self._routing = routing
+    self._max_reorder_len = max(max_reorder_len, num_workers)
+    self._next_seq = 0
+    self._next_out_seq = 0
+    self._reorder_buffer: dict[int, list[tuple[str, dict]]] = dict()
+
+    self.result_socket: zmq.SyncSocket = ctx.socket(zmq.PULL)
+    port_result = self.result_socket.bind_to_random_port("tcp://%s" % IP_LOOPBACK)
+    self._work_sockets: list[zmq.SyncSocket] = []
+    self._processes: list[multiprocessing.Process] = []
+    # Spawn fresh interpreters, a forked child would inherit the ZeroMQ context and its threads in an undefined state.
+    mp_context = multiprocessing.get_context('spawn')
+    for _ in range(num_workers):
+      work_socket: zmq.SyncSocket = ctx.socket(zmq.PUSH)
+      port_work = work_socket.bind_to_random_port("tcp://%s" % IP_LOOPBACK)
+      self._work_sockets.append(work_socket)
+      self._processes.append(mp_context.Process(target=run_pipeline_worker, args=(pipeline_type, worker_spec, port_work, port_result)))
+    for process in self._processes:
+      process.start()
+    # Wait until every worker loaded whatever it needs, so the first messages are not delayed.
+    for _ in range(num_workers):
+      self._wait_result()
+      self.result_socket.recv_multipart()
+
+
+  # Hand a message to its worker. Returns the outputs that became ready in order while waiting for space, if any.
+  def submit(self, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    outputs = []
+    while self._next_seq - self._next_out_seq >= self._max_reorder_len:
+      self._wait_result()
+      outputs.extend(self._recv_result(flags=0))
+    if self._routing == 'round_robin':
+      worker_id = self._next_seq % self._num_workers
+    else:
+      worker_id = zlib.crc32(','.join(sorted(msg['data'].keys())).encode('utf-8')) % self._num_workers
+    self._work_sockets[worker_id].send_multipart([self._next_seq.to_bytes(8, 'big'), topic.encode('utf-8'), serialize(**msg)])
+    self._next_seq += 1
+    return outputs
+
+
+  # Outputs of all the results already received, that are next in order.
+  def collect(self) -> list[tuple[str, dict]]:
+    outputs = []
+    while True:
+      try:
+        outputs.extend(self._recv_result(flags=zmq.NOBLOCK))
+      except zmq.Again:
+        return outputs
+
+
+  # Wait for the outputs of all the messages in flight.
+  def drain(self) -> list[tuple[str, dict]]:
+    outputs = []
+    while self._next_out_seq < self._next_seq:
+      self._wait_result()
+      outputs.extend(self._recv_result(flags=0))
+    return outputs
+
+
+  # Let the workers finish and exit, not waiting on the ones already dead.
+  def close(self) -> None:
+    for work_socket, process in zip(self._work_sockets, self._processes):
+      if process.is_alive():
+        work_socket.send_multipart([b'', b'', CMD_END.encode('utf-8')])
+    for process in self._processes:
+      process.join()
+    for work_socket in self._work_sockets:
+      work_socket.close(linger=0)
+    self.result_socket.close()
+
+
+  # Block until a result can be received, while all the workers are alive.
+  def _wait_result(self) -> None:
+    while not self.result_socket.poll(timeout=int(1000*self._poll_period_s)):
+      for worker_id, process in enumerate(self._processes):
+        if not process.is_alive():
+          raise PipelineWorkerError("Pipeline worker %d exited with code %s." % (worker_id, process.exitcode))
+
+
+  def _recv_result(self, flags: int) -> list[tuple[str, dict]]:
+    seq, *parts = self.result_socket.recv_multipart(flags=flags)
+    self._reorder_buffer[int.from_bytes(seq, 'big')] = [(parts[i].decode('utf-8'), deserialize(parts[i+1])) for i in range(0, len(parts), 2)]
+    outputs = []
+    while self._next_out_seq in self._reorder_buffer:
+      outputs.extend(self._reorder_buffer.pop(self._next_out_seq))
+      self._next_out_seq += 1
+    return outputs
+
+
+# Entry-point of a worker process.
+def run_pipeline_worker(pipeline_type: type, worker_spec: dict, port_work: int, port_result: int) -> None:
+  ctx = zmq.Context()
+  work_socket: zmq.SyncSocket = ctx.socket(zmq.PULL)
+  work_socket.connect("tcp://%s:%d" % (IP_LOOPBACK, port_work))
+  result_socket: zmq.SyncSocket = ctx.socket(zmq.PUSH)
+  result_socket.connect("tcp://%s:%d" % (IP_LOOPBACK, port_result))
+  worker: Any = pipeline_type._create_worker(worker_spec)
+  # Ready.
+  result_socket.send_multipart([b''])
+  while True:
+    seq, topic, payload = work_socket.recv_multipart()
+    if payload == CMD_END.encode('utf-8'):
+      break
+    outputs = pipeline_type._run_worker(worker, topic.decode('utf-8'), deserialize(payload))
+    result_socket.send_multipart([seq, *[part for tag, kwargs in outputs for part in (tag.encode('utf-8'), serialize(**kwargs))]])
+  work_socket.close()
+  result_socket.close(linger=-1)
+  ctx.term()
@@ -75,6 +75,13 @@ class PupilFacade:
     # Sync the Pupil Core clock with the system clock.
     self._sync()
 
+    # Have Pupil Capture publish the video frames in the requested format,
+    #   i.e. JPEG to record the world camera as-is, without decoding and re-encoding it.
+    if self._is_stream_video_world or self._is_stream_video_eye:
+      self._send_to_ipc(payload={'subject': 'start_plugin',
+                                 'name': 'Frame_Publisher',
+                                 'args': {'format': self._video_image_format}})
+
     # Subscribe to the desired topics.
     self._topics = ['notify.', 'gaze.3d.%s'%('01.' if self._is_binocular else '0.')]
     if self._is_stream_video_world:
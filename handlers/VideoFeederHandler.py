@@ -0,0 +1,250 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from fractions import Fraction
+from subprocess import Popen
+import queue
+import threading
+
+from utils.time_utils import get_time
+
+try:
+  import av
+except ImportError as e:
+  print(e, "\nPyAV not installed, will crash if you configure passthrough recording of encoded video.", flush=True)
+
+
+# What to do with a new frame when the encoder can't keep up and the frame queue is full.
+#   'block': wait for room in the queue, back-pressuring the Logger (no frames lost).
+#   'drop': discard the new frame and count it (Logger never stalls on a slow encoder).
+VIDEO_BACKLOG_POLICIES = ('block', 'drop')
+
+
+# Feeds frames into the stdin pipe of a single FFmpeg encoder subprocess from a dedicated thread.
+# Logger hands frames off to a bounded queue, so a slow encoder only stalls its own feeder thread.
+# If the encoder fails (i.e. FFmpeg exited and the pipe broke), the error is recorded
+#   and all later frames are dropped, so that the Logger never blocks on a dead encoder.
+# Keeps counters of the encoder's health:
+#   backlog of queued frames, frames written and dropped,
+#   achieved frame rate vs. the nominal rate of the stream, and pipe write latency.
+class VideoFeeder:
+  def __init__(self,
+               video_writer: Popen,
+               name: str,
+               sampling_rate_hz: float,
+               max_queue_len: int = 60,
+               backlog_policy: str = 'block'):
+    if backlog_policy not in VIDEO_BACKLOG_POLICIES:
+      raise ValueError("Unsupported video backlog policy '%s', must be one of %s." % (backlog_policy, VIDEO_BACKLOG_POLICIES))
+    self._video_writer = video_writer
+    self._name = name
+    self._sampling_rate_hz = sampling_rate_hz
+    self._is_drop = backlog_policy == 'drop'
+    self._queue: queue.Queue[tuple[bytes, int | None] | None] = queue.Queue(maxsize=max_queue_len)
+
+    self._num_frames_written: int = 0
+    self._num_frames_dropped: int = 0
+    self._num_frames_lost: int = 0 # queued frames discarded by the feeder thread after the encoder failed
+    self._max_backlog: int = 0
+    self._write_latency_total_s: float = 0.0
+    self._write_latency_max_s: float = 0.0
+    self._first_write_time_s: float | None = None
+    self._last_write_time_s: float | None = None
+    self._error: Exception | None = None
+
+    self._feeder_thread = threading.Thread(target=self._feed)
+    self._feeder_thread.start()
+
+
+  # Hand a frame off to the encoder's queue, according to the backlog policy.
+  # Returns whether the frame was accepted.
+  def put(self, frame_buffer: bytes, frame_index: int | None = None) -> bool:
+    if self._error is not None:
+      self._num_frames_dropped += 1
+      return False
+    if self._is_drop:
+      try:
+        self._queue.put_nowait((frame_buffer, frame_index))
+      except queue.Full:
+        self._num_frames_dropped += 1
+        return False
+    else:
+      self._queue.put((frame_buffer, frame_index))
+    self._max_backlog = max(self._max_backlog, self._queue.qsize())
+    return True
+
+
+  # Write queued frames into the encoder until the None sentinel.
+  # After a failed write, keeps draining the queue without writing, so a `put` waiting for room is released.
+  def _feed(self) -> None:
+    while (item := self._queue.get()) is not None:
+      if self._error is not None:
+        self._num_frames_lost += 1
+        continue
+      start_time_s = get_time()
+      try:
+        self._write(*item)
+      except Exception as e:
+        self._error = e
+        self._num_frames_lost += 1
+        print("%s encoder failed, dropping all further frames: %r" % (self._name, e), flush=True)
+        continue
+      end_time_s = get_time()
+      latency_s = end_time_s - start_time_s
+      self._write_latency_total_s += latency_s
+      self._write_latency_max_s = max(self._write_latency_max_s, latency_s)
+      if self._first_write_time_s is None:
+        self._first_write_time_s = start_time_s
+      self._last_write_time_s = end_time_s
+      self._num_frames_written += 1
+
+
+  def _write(self, frame_buffer: bytes, frame_index: int | None) -> None:
+    self._video_writer.stdin.write(frame_buffer) # type: ignore
+
+
+  def _finalize(self) -> None:
+    self._video_writer.stdin.close() # type: ignore
+    self._video_writer.wait()
+
+
+  # Write out all the queued frames, then close the pipe and wait for the encoder to finalize the file.
+  def close(self) -> None:
+    self._queue.put(None)
+    self._feeder_thread.join()
+    try:
+      self._finalize()
+    except Exception as e:
+      if self._error is None:
+        self._error = e
+      print("%s encoder failed to finalize the file: %r" % (self._name, e), flush=True)
+
+
+  # The error that stopped the encoder, if any.
+  def get_error(self) -> Exception | None:
+    return self._error
+
+
+  def get_stats(self) -> dict[str, float | int | str]:
+    if self._num_frames_written > 1 and self._last_write_time_s != self._first_write_time_s:
+      achieved_fps = (self._num_frames_written - 1) / (self._last_write_time_s - self._first_write_time_s) # type: ignore
+    else:
+      achieved_fps = float('nan')
+    return {
+      'name': self._name,
+      'backlog': self._queue.qsize(),
+      'max_backlog': self._max_backlog,
+      'frames_written': self._num_frames_written,
+      'frames_dropped': self._num_frames_dropped + self._num_frames_lost,
+      'achieved_fps': achieved_fps,
+      'target_fps': self._sampling_rate_hz,
+      'write_latency_mean_s': self._write_latency_total_s / self._num_frames_written if self._num_frames_written else float('nan'),
+      'write_latency_max_s': self._write_latency_max_s,
+      'error': '' if self._error is None else repr(self._error),
+    }
+
+
+  def get_stats_str(self) -> str:
+    stats = self.get_stats()
+    return ("%s: %d frames written, %d dropped, max backlog %d, %.2f/%.2f fps, write latency mean %.2f ms max %.2f ms"
+            % (stats['name'], stats['frames_written'], stats['frames_dropped'], stats['max_backlog'],
+               stats['achieved_fps'], stats['target_fps'],
+               1000*stats['write_latency_mean_s'], 1000*stats['write_latency_max_s'])
+            + ((", failed: %s" % stats['error']) if stats['error'] else ''))
+
+
+# Muxes already encoded packets (JPEG, H.264) into a file as they are, without decoding or re-encoding.
+# Unlike stream copy through an FFmpeg pipe, which numbers the packets consecutively at the nominal rate,
+#   each packet gets its PTS from the frame index of its source frame (relative to the first one in the file),
+#   so frames lost upstream leave gaps in the timeline instead of shifting all later frames.
+# H.264 packets must be in Annex B with SPS/PPS in front of keyframes, as the edge encoders produce them.
+class PassthroughVideoFeeder(VideoFeeder):
+  def __init__(self,
+               filepath: str,
+               codec_name: str,
+               width: int,
+               height: int,
+               name: str,
+               sampling_rate_hz: float,
+               metadata: dict[str, str] | None = None,
+               max_queue_len: int = 60,
+               backlog_policy: str = 'block'):
+    self._container = av.open(filepath, mode='w', format='matroska')
+    self._container.metadata.update(metadata or {})
+    self._stream = self._container.add_stream(codec_name, rate=Fraction(sampling_rate_hz).limit_denominator(1001))
+    self._stream.width = width
+    self._stream.height = height
+    # The muxer opens the stream's codec context when writing the header, which needs a pixel format, though nothing is encoded.
+    self._stream.pix_fmt = 'yuvj420p' if codec_name == 'mjpeg' else 'yuv420p'
+    self._time_base = 1 / Fraction(sampling_rate_hz).limit_denominator(1001)
+    self._stream.time_base = self._time_base
+    self._is_h264 = codec_name == 'h264'
+    self._is_header_written = False
+    self._first_frame_index: int | None = None
+    self._last_pts: int = -1
+    super().__init__(video_writer=None, # type: ignore
+                     name=name,
+                     sampling_rate_hz=sampling_rate_hz,
+                     max_queue_len=max_queue_len,
+                     backlog_policy=backlog_policy)
+
+
+  def _write(self, frame_buffer: bytes, frame_index: int | None) -> None:
+    if not self._is_header_written:
+      # The muxer needs SPS/PPS up front to describe an H.264 stream, take them from the first keyframe.
+      if self._is_h264:
+        self._stream.codec_context.extradata = self._get_h264_parameter_sets(frame_buffer)
+      self._is_header_written = True
+    if frame_index is None:
+      pts = self._last_pts + 1
+    else:
+      if self._first_frame_index is None:
+        self._first_frame_index = int(frame_index)
+      # Guard against reordered or repeated indices, the muxer requires strictly increasing timestamps.
+      pts = max(int(frame_index) - self._first_frame_index, self._last_pts + 1)
+    packet = av.Packet(frame_buffer)
+    packet.stream = self._stream
+    packet.time_base = self._time_base
+    packet.pts = pts
+    packet.dts = pts
+    packet.duration = 1
+    self._container.mux(packet)
+    self._last_pts = pts
+
+
+  def _finalize(self) -> None:
+    self._container.close()
+
+
+  # Concatenate the SPS and PPS NAL units found in an Annex B packet, with their start codes.
+  def _get_h264_parameter_sets(self, packet: bytes) -> bytes:
+    parameter_sets = b''
+    for nal_unit in packet.split(b'\x00\x00\x01')[1:]:
+      nal_unit = nal_unit.rstrip(b'\x00')
+      if nal_unit and (nal_unit[0] & 0x1F) in (7, 8):
+        parameter_sets += b'\x00\x00\x00\x01' + nal_unit
+    return parameter_sets
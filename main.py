@@ -139,8 +139,9 @@ if __name__ == '__main__':
         exit('Error parsing CLI inputs.')
     args = parser.parse_args()
 
-  # Load video codec spec.
-  if 'stream_video' in args.logging_spec and args.logging_spec['stream_video']:
+  # Load video codec spec, unless the Logger should probe the encoders of the host and pick one itself.
+  if ('stream_video' in args.logging_spec and args.logging_spec['stream_video']
+      and args.logging_spec['video_codec_config_filepath'] != 'auto'):
     with open(args.logging_spec['video_codec_config_filepath'], "r") as f:
       try:
         args.logging_spec['video_codec'] = yaml.safe_load(f)
@@ -167,6 +168,7 @@ if __name__ == '__main__':
   args.logging_spec['log_dir'] = log_dir
   args.logging_spec['experiment'] = args.experiment
   args.logging_spec['log_time_s'] = log_time_s
+  args.logging_spec['log_history_filepath'] = log_history_filepath
 
   # Add logging spec to each producer.
   for spec in args.producer_specs:
@@ -177,6 +179,7 @@ if __name__ == '__main__':
     spec['logging_spec']['log_dir'] = log_dir
     spec['logging_spec']['experiment'] = args.experiment # type: ignore
     spec['logging_spec']['log_time_s'] = log_time_s
+    spec['logging_spec']['log_history_filepath'] = log_history_filepath
     spec['log_history_filepath'] = log_history_filepath
 
   # Add logging spec to each consumer.
@@ -184,6 +187,7 @@ if __name__ == '__main__':
     spec['logging_spec']['log_dir'] = log_dir
     spec['logging_spec']['experiment'] = args.experiment # type: ignore
     spec['logging_spec']['log_time_s'] = log_time_s
+    spec['logging_spec']['log_history_filepath'] = log_history_filepath
     spec['log_history_filepath'] = log_history_filepath
 
   producer_specs: list[dict] = args.producer_specs
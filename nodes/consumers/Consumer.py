@@ -25,8 +25,7 @@
 #
 # ############
 
-import threading
-from handlers.LoggingHandler import Logger
+from handlers.LoggingHandler import LoggerHandle, create_logger_handle
 from nodes.Node import Node
 from nodes.producers.Producer import Producer
 from nodes.pipelines.Pipeline import Pipeline
@@ -38,7 +37,6 @@ from abc import abstractmethod
 from collections import OrderedDict
 import zmq
 
-from utils.msgpack_utils import deserialize
 from utils.zmq_utils import *
 
 
@@ -69,6 +67,7 @@ class Consumer(Node):
 
     # Instantiate all desired Streams that DataLogger will subscribe to.
     self._streams: OrderedDict[str, Stream] = OrderedDict()
+    stream_factories: list[tuple[str, type, dict]] = []
     for stream_spec in stream_specs:
       class_name: str = stream_spec['class']
       class_args = stream_spec.copy()
@@ -79,12 +78,15 @@ class Consumer(Node):
       # Store the streamer object.
       self._streams.setdefault(class_type._log_source_tag(), class_object)
       self._is_producer_ended.setdefault(class_type._log_source_tag(), False)
+      stream_factories.append((class_type._log_source_tag(), class_type, class_args))
 
-    # Create the DataLogger object
-    self._logger = Logger(self._log_source_tag(), **logging_spec)
-    # Launch datalogging thread with reference to the Stream object.
-    self._logger_thread = threading.Thread(target=self._logger, args=(self._streams,))
-    self._logger_thread.start()
+    # Launch datalogging thread or process with reference to the Stream objects.
+    #   In process mode, received packets are forwarded as-is, without deserializing them in this process.
+    self._logger: LoggerHandle = create_logger_handle(log_tag=self._log_source_tag(),
+                                                      streams=self._streams,
+                                                      stream_factories=stream_factories,
+                                                      logging_spec=logging_spec,
+                                                      ctx=self._ctx)
 
 
   # Initialize backend parameters specific to Consumer.
@@ -118,9 +120,8 @@ class Consumer(Node):
   # In normal operation mode, all messages are 2-part.
   def _poll_data_packets(self) -> None:
     topic, payload = self._sub.recv_multipart()
-    msg = deserialize(payload)
     topic_tree: list[str] = topic.decode('utf-8').split('.')
-    self._streams[topic_tree[0]].append_data(**msg)
+    self._logger.log(topic_tree[0], payload)
 
 
   # When system triggered a safe exit, Consumer gets a mix of normal 2-part messages
@@ -137,9 +138,8 @@ class Consumer(Node):
         self._is_done = True
     # Regular data packets.
     else:
-      msg = deserialize(payload)
       topic_tree: list[str] = topic.decode('utf-8').split('.')
-      self._streams[topic_tree[0]].append_data(**msg)
+      self._logger.log(topic_tree[0], payload)
 
 
   def _trigger_stop(self):
@@ -153,7 +153,7 @@ class Consumer(Node):
   def _cleanup(self):
     # Finish up the file saving before exitting.
     self._logger.cleanup()
-    self._logger_thread.join()
+    self._logger.join()
     # Before closing the PUB socket, wait for the 'BYE' signal from the Broker.
     self._sync.send_multipart([self._log_source_tag().encode('utf-8'), CMD_EXIT.encode('utf-8')]) 
     host, cmd = self._sync.recv_multipart() # no need to read contents of the message.
@@ -56,9 +56,11 @@ class DataVisualizer(Consumer):
                port_killsig: str = PORT_KILL,
                **_):
 
+    # GUI reads the local Streams, so they must be filled and drained within this process,
+    #   neither by a Logger process nor skipped by journaling the raw messages.
     super().__init__(host_ip=host_ip,
                      stream_specs=stream_specs,
-                     logging_spec=logging_spec,
+                     logging_spec={**logging_spec, 'is_logger_process': False, 'is_journal': False},
                      port_sub=port_sub,
                      port_sync=port_sync,
                      port_killsig=port_killsig,
@@ -66,19 +66,22 @@ class DummyPipeline(Pipeline):
     return DummyStream(**stream_info)
 
 
-  def _process_data(self) -> None:
-    if self._is_continue_produce:
-      process_time_s: float = get_time()
-      tag: str = "%s.data" % self._log_source_tag()
-      self._publish(tag, time_s=process_time_s, data=process_time_s)
-    elif not self._is_continue_produce:
-      # If triggered to stop and no more available data, send empty 'END' packet and join.
-      self._send_end_packet()
-
-
-  def _stop_new_data(self):
-    pass
-  
-
-  def _cleanup(self) -> None:
-    super()._cleanup()
+  @classmethod
+  def _get_stage_specs(cls, stream_info: dict = {}, **_) -> tuple[dict, dict]:
+    return {}, stream_info
+
+
+  @classmethod
+  def _create_worker(cls, worker_spec: dict) -> dict:
+    return {}
+
+
+  # Stamps every input message with the time it got processed.
+  @classmethod
+  def _run_worker(cls, worker: dict, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    process_time_s: float = get_time()
+    return [("%s.data" % cls._log_source_tag(), {'process_time_s': process_time_s, 'data': {'sensor-emulator': {'toa': process_time_s}}})]
+
+
+  def _process_data(self, topic: str, msg: dict) -> None:
+    self._publish_outputs(self._run_worker({}, topic, msg))
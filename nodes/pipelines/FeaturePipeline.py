@@ -0,0 +1,167 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+from nodes.pipelines.Pipeline import Pipeline
+from streams import FeatureStream
+
+from utils.time_utils import get_time
+from utils.zmq_utils import *
+from utils.feature_utils import FEATURES, SlidingWindowFeatures
+
+import numpy as np
+
+
+#######################################################################
+#######################################################################
+# A class for computing windowed features of EMG, IMU, etc. streams,
+#   incrementally as the samples come in.
+# Each of `input_specs` picks one stream of the subscribed Producers:
+#   'name': device name of its features in the output Stream,
+#   'device', 'stream': where its samples are in the Producer's messages,
+#   'sampling_rate_hz', 'num_channels': of the input stream,
+#   'is_block': if the first axis of a message's samples is time,
+#     i.e. blocks of 2 kHz Cometa EMG, rather than one (multi-sensor) snapshot per message.
+# Features of every input are published every `hop_s` over the last `window_s`.
+# Can run in a pool of worker processes routed by device, each keeping the windows of its devices.
+#######################################################################
+#######################################################################
+class FeaturePipeline(Pipeline):
+  @classmethod
+  def _log_source_tag(cls) -> str:
+    return 'features'
+
+
+  def __init__(self,
+               host_ip: str,
+               input_specs: list[dict],
+               logging_spec: dict,
+               stream_specs: list[dict],
+               window_s: float = 0.2,
+               hop_s: float = 0.05,
+               features: tuple[str, ...] = FEATURES,
+               bands_hz: tuple[tuple[float, float], ...] = (),
+               port_pub: str = PORT_BACKEND,
+               port_sub: str = PORT_FRONTEND,
+               port_sync: str = PORT_SYNC_HOST,
+               port_killsig: str = PORT_KILL,
+               latency_budget_s: float | None = None,
+               num_workers: int = 1,
+               worker_routing: str = 'device', # [round_robin, device]
+               max_reorder_len: int = 64,
+               **_):
+    self._worker_spec, stream_info = self._get_stage_specs(input_specs=input_specs,
+                                                           window_s=window_s,
+                                                           hop_s=hop_s,
+                                                           features=features,
+                                                           bands_hz=bands_hz)
+    # Processes the messages itself, unless it runs a pool of workers.
+    self._worker: dict = self._create_worker(self._worker_spec)
+
+    super().__init__(host_ip=host_ip,
+                     stream_info=stream_info,
+                     logging_spec=logging_spec,
+                     stream_specs=stream_specs,
+                     port_pub=port_pub,
+                     port_sub=port_sub,
+                     port_sync=port_sync,
+                     port_killsig=port_killsig,
+                     latency_budget_s=latency_budget_s,
+                     num_workers=num_workers,
+                     worker_routing=worker_routing,
+                     max_reorder_len=max_reorder_len)
+
+
+  @classmethod
+  def create_stream(cls, stream_info: dict) -> FeatureStream:
+    return FeatureStream(**stream_info)
+
+
+  @classmethod
+  def _get_stage_specs(cls,
+                       input_specs: list[dict],
+                       window_s: float = 0.2,
+                       hop_s: float = 0.05,
+                       features: tuple[str, ...] = FEATURES,
+                       bands_hz: tuple[tuple[float, float], ...] = (),
+                       **_) -> tuple[dict, dict]:
+    worker_spec = {
+      'input_specs': input_specs,
+      'window_s': window_s,
+      'hop_s': hop_s,
+      'features': features,
+      'bands_hz': bands_hz,
+    }
+    stream_info = {
+      "input_specs": input_specs,
+      "features": features,
+      "bands_hz": bands_hz,
+      "window_s": window_s,
+      "hop_s": hop_s,
+      "sampling_rate_hz": 1.0/hop_s,
+    }
+    return worker_spec, stream_info
+
+
+  # Input specs and feature extractors of all the inputs.
+  @classmethod
+  def _create_worker(cls, worker_spec: dict) -> dict:
+    return {
+      'input_specs': worker_spec['input_specs'],
+      'extractors': {
+        input_spec['name']: SlidingWindowFeatures(num_channels=input_spec['num_channels'],
+                                                  window_len=max(2, round(worker_spec['window_s']*input_spec['sampling_rate_hz'])),
+                                                  hop=max(1, round(worker_spec['hop_s']*input_spec['sampling_rate_hz'])),
+                                                  fs=input_spec['sampling_rate_hz'],
+                                                  features=worker_spec['features'],
+                                                  bands_hz=worker_spec['bands_hz'])
+        for input_spec in worker_spec['input_specs']},
+    }
+
+
+  @classmethod
+  def _run_worker(cls, worker: dict, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    outputs = []
+    for input_spec in worker['input_specs']:
+      device_data = msg['data'].get(input_spec['device'])
+      if device_data is None or input_spec['stream'] not in device_data:
+        continue
+      samples = np.asarray(device_data[input_spec['stream']], dtype=np.float64)
+      samples = samples.reshape(-1, input_spec['num_channels']) if input_spec.get('is_block', False) else samples.reshape(1, -1)
+      for features in worker['extractors'][input_spec['name']].push(samples):
+        outputs.append(("%s.data" % cls._log_source_tag(), {'process_time_s': get_time(), 'data': {input_spec['name']: features}}))
+    return outputs
+
+
+  def _get_worker_spec(self) -> dict:
+    return self._worker_spec
+
+
+  def _process_data(self, topic: str, msg: dict) -> None:
+    self._publish_outputs(self._run_worker(self._worker, topic, msg))
+
+
+  def _stop_new_data(self):
+    pass
@@ -27,15 +27,18 @@
 
 from nodes.Node import Node
 from nodes.producers.Producer import Producer
-from handlers.LoggingHandler import Logger
+from handlers.LoggingHandler import LoggerHandle, create_logger_handle
+from handlers.PipelinePoolHandler import PipelineWorkerPool
 from streams import Stream
+from streams.ConflationStream import ConflationStream
 
 from utils.msgpack_utils import deserialize, serialize
 from utils.dict_utils import *
+from utils.time_utils import get_time
 from utils.zmq_utils import *
 
 from abc import abstractmethod
-import threading
+from typing import Any
 import zmq
 
 
@@ -43,6 +46,14 @@ import zmq
 ##############################################################
 # An abstract class to interface with a data-producing worker.
 #   I.e. a superclass for AI worker, controllable GUI, etc.
+# With a latency budget, when processing falls behind,
+#   all pending messages are logged but only the freshest of each topic is processed,
+#   and the number of skipped messages and the staleness are logged and published along each output.
+#   Staleness is measured on the local clock, relative to the fastest delivery seen from each producer,
+#   so the clock offset of producers on other hosts cancels out.
+# With `num_workers` > 1, messages are processed in a pool of worker processes instead,
+#   by Pipelines that implement `_create_worker` and `_run_worker`,
+#   and their outputs are published in input order.
 ##############################################################
 ##############################################################
 class Pipeline(Node):
@@ -54,11 +65,19 @@ class Pipeline(Node):
                port_pub: str = PORT_BACKEND,
                port_sub: str = PORT_FRONTEND,
                port_sync: str = PORT_SYNC_HOST,
-               port_killsig: str = PORT_KILL) -> None:
+               port_killsig: str = PORT_KILL,
+               latency_budget_s: float | None = None,
+               num_workers: int = 1,
+               worker_routing: str = 'device', # [round_robin, device]
+               max_reorder_len: int = 64) -> None:
     # import within this context to avoid circular imports.
     from nodes.pipelines import PIPELINES
     from nodes.producers import PRODUCERS
 
+    # Reject a pool for Pipelines that can't run one, before anything is started.
+    if num_workers > 1 and type(self)._create_worker.__func__ is Pipeline._create_worker.__func__:
+      raise ValueError("%s does not support parallel workers, `num_workers` must be 1." % type(self).__name__)
+
     super().__init__(host_ip=host_ip,
                      port_sync=port_sync,
                      port_killsig=port_killsig)
@@ -67,14 +86,24 @@ class Pipeline(Node):
     self._is_continue_produce = True
     self._is_more_data_in = True
     self._publish_fn = lambda tag, kwargs: None
+    self._latency_budget_s = latency_budget_s
+    self._num_skipped: int = 0
+    self._staleness_s: float = float('nan')
+    self._min_delays_s: dict[str, float] = {}
+    self._num_workers = num_workers
+    self._worker_routing = worker_routing
+    self._max_reorder_len = max_reorder_len
+    self._pool: PipelineWorkerPool | None = None
+    self._process_fn = self._process_data
 
     # Data structure for keeping track of the Pipeline's output data.
     self._out_stream: Stream = self.create_stream(stream_info)
 
     # Instantiate all desired Streams that the Pipeline will process.
     self._in_streams: OrderedDict[str, Stream] = OrderedDict()
-    self._poll_data_fn = self._poll_data_packets
+    self._poll_data_fn = self._poll_data_packets if latency_budget_s is None else self._poll_conflated_data_packets
     self._is_producer_ended: OrderedDict[str, bool] = OrderedDict()
+    stream_factories: list[tuple[str, type, dict]] = [(self._log_source_tag(), type(self), stream_info)]
     for stream_spec in stream_specs:
       class_name: str = stream_spec['class']
       class_args = stream_spec.copy()
@@ -85,17 +114,27 @@ class Pipeline(Node):
       # Store the streamer object.
       self._in_streams.setdefault(class_type._log_source_tag(), class_object)
       self._is_producer_ended.setdefault(class_type._log_source_tag(), False)
-
-    # Create the Logger object.
-    self._logger = Logger(self._log_source_tag(), **logging_spec)
-
-    # Launch datalogging thread with reference to the Stream objects, to save Pipeline's outputs and inputs.
-    self._logger_thread = threading.Thread(target=self._logger,
-                                           args=(OrderedDict([
-                                             (self._log_source_tag(), self._out_stream),
-                                             *list(self._in_streams.items())
-                                             ]),))
-    self._logger_thread.start()
+      stream_factories.append((class_type._log_source_tag(), class_type, class_args))
+
+    # Other outputs (i.e. of chained stages) and conflation metrics are logged next to the outputs, as Streams of their own.
+    logged_streams: list[tuple[str, Stream]] = [(self._log_source_tag(), self._out_stream)]
+    for (key, stream_type, extra_stream_info) in self._get_extra_stream_factories():
+      logged_streams.append((key, stream_type.create_stream(extra_stream_info)))
+      stream_factories.append((key, stream_type, extra_stream_info))
+    if latency_budget_s is not None:
+      conflation_stream_info = {'sampling_rate_hz': stream_info.get('sampling_rate_hz', 0.0)}
+      logged_streams.append((self._conflation_key(), ConflationStream.create_stream(conflation_stream_info)))
+      stream_factories.append((self._conflation_key(), ConflationStream, conflation_stream_info))
+
+    # Launch datalogging thread or process with reference to the Stream objects, to save Pipeline's outputs and inputs.
+    self._logger: LoggerHandle = create_logger_handle(log_tag=self._log_source_tag(),
+                                                      streams=OrderedDict([
+                                                        *logged_streams,
+                                                        *list(self._in_streams.items())
+                                                      ]),
+                                                      stream_factories=stream_factories,
+                                                      logging_spec=logging_spec,
+                                                      ctx=self._ctx)
 
 
   # Instantiate Stream datastructure object specific to this Pipeline.
@@ -122,10 +161,22 @@ class Pipeline(Node):
     for tag in self._in_streams.keys():
       self._sub.subscribe(tag)
 
+    # Start the worker processes, each builds its own state (i.e. loads a model) before the Node syncs.
+    if self._num_workers > 1:
+      self._pool = PipelineWorkerPool(pipeline_type=type(self),
+                                      worker_spec=self._get_worker_spec(),
+                                      num_workers=self._num_workers,
+                                      ctx=self._ctx,
+                                      routing=self._worker_routing,
+                                      max_reorder_len=self._max_reorder_len)
+      self._process_fn = self._submit_to_pool
+
 
   # Launch data receiving and result producing.
   def _activate_data_poller(self) -> None:
     self._poller.register(self._sub, zmq.POLLIN)
+    if self._pool is not None:
+      self._poller.register(self._pool.result_socket, zmq.POLLIN)
 
 
   # Process custom event first, then Node generic (killsig).
@@ -133,6 +184,8 @@ class Pipeline(Node):
     if self._sub in poll_res[0]:
       # Receiving a modality packet, process until all data sources sent 'END' packet.
       self._poll_data_fn()
+    if self._pool is not None and self._pool.result_socket in poll_res[0]:
+      self._publish_outputs(self._pool.collect())
     super()._on_poll(poll_res)
 
 
@@ -146,8 +199,46 @@ class Pipeline(Node):
     topic, payload = self._sub.recv_multipart()
     msg = deserialize(payload)
     topic_tree: list[str] = topic.decode('utf-8').split('.')
-    self._in_streams[topic_tree[0]].append_data(**msg)
-    self._process_data(topic=topic_tree[0], msg=msg)
+    self._logger.log(topic_tree[0], payload, msg)
+    self._process_fn(topic=topic_tree[0], msg=msg)
+
+
+  # With a latency budget: drain all the messages pending on the socket, and log them all.
+  #   Per topic, if the oldest pending message is already staler than the budget, only process the freshest one,
+  #   otherwise process all of them in order.
+  # 'END' packets are handled as in `_poll_ending_data_packets`.
+  def _poll_conflated_data_packets(self) -> None:
+    packets = [self._sub.recv_multipart()]
+    while True:
+      try:
+        packets.append(self._sub.recv_multipart(flags=zmq.NOBLOCK))
+      except zmq.Again:
+        break
+    receive_time_s = get_time()
+    pending: OrderedDict[str, list[dict]] = OrderedDict()
+    for topic, payload, *_ in packets:
+      topic_tree: list[str] = topic.decode('utf-8').split('.')
+      if CMD_END.encode('utf-8') in [payload, *_]:
+        self._on_end_packet(topic_tree[0])
+        continue
+      msg = deserialize(payload)
+      self._logger.log(topic_tree[0], payload, msg)
+      pending.setdefault(topic_tree[0], []).append(msg)
+      self._min_delays_s[topic_tree[0]] = min(self._min_delays_s.get(topic_tree[0], float('inf')), receive_time_s - msg['process_time_s'])
+    for topic, msgs in pending.items():
+      if self._get_staleness_s(topic, msgs[0]) > self._latency_budget_s: # type: ignore
+        self._num_skipped += len(msgs) - 1
+        msgs = msgs[-1:]
+      for msg in msgs:
+        self._staleness_s = self._get_staleness_s(topic, msg)
+        self._process_fn(topic=topic, msg=msg)
+
+
+  # Time a message waited, on the local clock, beyond the fastest delivery seen from its producer.
+  #   The smallest difference between the local receive time and the producer's timestamp is the clock offset
+  #   between the hosts plus the minimal transit delay, subtracting it leaves the queueing delay only.
+  def _get_staleness_s(self, topic: str, msg: dict) -> float:
+    return get_time() - msg['process_time_s'] - self._min_delays_s[topic]
 
 
   # When system triggered a safe exit, Pipeline gets a mix of normal 2-part messages
@@ -159,18 +250,22 @@ class Pipeline(Node):
     # 'END' empty packet from a Producer.
     if CMD_END.encode('utf-8') in payload:
       topic_tree: list[str] = topic.decode('utf-8').split('.')
-      self._is_producer_ended[topic_tree[0]] = True
-      if all(list(self._is_producer_ended.values())):
-        self._is_more_data_in = False
-        # If triggered to stop and no more available data, send empty 'END' packet and join.
-        # not self._is_more_data_in and not self._is_continue_produce
-        self._send_end_packet()
+      self._on_end_packet(topic_tree[0])
     # Regular data packets.
     else:
       msg = deserialize(payload)
       topic_tree: list[str] = topic.decode('utf-8').split('.')
-      self._in_streams[topic_tree[0]].append_data(**msg)
-      self._process_data(topic=topic_tree[0], msg=msg)
+      self._logger.log(topic_tree[0], payload, msg)
+      self._process_fn(topic=topic_tree[0], msg=msg)
+
+
+  def _on_end_packet(self, topic: str) -> None:
+    self._is_producer_ended[topic] = True
+    if all(list(self._is_producer_ended.values())):
+      self._is_more_data_in = False
+      # If triggered to stop and no more available data, send empty 'END' packet and join.
+      # not self._is_more_data_in and not self._is_continue_produce
+      self._send_end_packet()
 
 
   # Iteration loop logic for the worker.
@@ -181,6 +276,45 @@ class Pipeline(Node):
     pass
 
 
+  # Build the state a worker process of the pool processes messages with, from `_get_worker_spec`.
+  # Pipelines whose processing can run in parallel override this and `_run_worker`.
+  @classmethod
+  def _create_worker(cls, worker_spec: dict) -> Any:
+    raise NotImplementedError("%s does not support parallel workers." % cls.__name__)
+
+
+  # Process one message in a worker process, returns the (tag, kwargs) of each output to publish, in order.
+  @classmethod
+  def _run_worker(cls, worker: Any, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    raise NotImplementedError("%s does not support parallel workers." % cls.__name__)
+
+
+  # Picklable arguments for `_create_worker`.
+  def _get_worker_spec(self) -> dict:
+    return {}
+
+
+  # Arguments for `_create_worker` and `create_stream` from the Pipeline's config kwargs,
+  #   to run it as a stage of a `PipelineChain`, within the chain's process.
+  @classmethod
+  def _get_stage_specs(cls, **kwargs) -> tuple[dict, dict]:
+    raise NotImplementedError("%s can't run as a stage of a chain." % cls.__name__)
+
+
+  # Other outputs logged next to the Pipeline's own, as (key, type with `create_stream`, stream info) tuples.
+  def _get_extra_stream_factories(self) -> list[tuple[str, type, dict]]:
+    return []
+
+
+  def _submit_to_pool(self, topic: str, msg: dict) -> None:
+    self._publish_outputs(self._pool.submit(topic, msg)) # type: ignore
+
+
+  def _publish_outputs(self, outputs: list[tuple[str, dict]]) -> None:
+    for tag, kwargs in outputs:
+      self._publish(tag, **kwargs)
+
+
   def _publish(self, tag: str, **kwargs) -> None:
     self._publish_fn(tag, **kwargs)
 
@@ -192,29 +326,45 @@ class Pipeline(Node):
     msg = serialize(**kwargs)
     # Send the data packet on the PUB socket.
     self._pub.send_multipart([tag.encode('utf-8'), msg])
-    # Store the captured data into the data structure.
-    self._out_stream.append_data(**kwargs)
+    # Store the captured data into the data structure for logging.
+    self._logger.log(self._log_source_tag(), msg, kwargs)
+    # Along each output, report how far behind the processing is.
+    if self._latency_budget_s is not None:
+      conflation_kwargs = {'process_time_s': kwargs['process_time_s'],
+                           'data': {'conflation': {'num_skipped': self._num_skipped, 'staleness_s': self._staleness_s}}}
+      conflation_msg = serialize(**conflation_kwargs)
+      self._pub.send_multipart([('%s.%s' % (TOPIC_CONFLATION, self._log_source_tag())).encode('utf-8'), conflation_msg])
+      self._logger.log(self._conflation_key(), conflation_msg, conflation_kwargs)
+      self._num_skipped = 0
+
+
+  def _conflation_key(self) -> str:
+    return '%s-conflation' % self._log_source_tag()
 
 
   def _trigger_stop(self):
-    self._poll_data_fn = self._poll_ending_data_packets
+    if self._latency_budget_s is None:
+      self._poll_data_fn = self._poll_ending_data_packets
     self._is_continue_produce = False
     self._stop_new_data()
 
 
   # Stop sampling data, continue sending already captured until none is left.
-  @abstractmethod
+  # Pipelines that sample data on their own override it.
   def _stop_new_data(self) -> None:
     pass
 
 
   # Send 'END' empty packet and label Node as done to safely finish and exit the process and its threads.
   def _send_end_packet(self) -> None:
+    # Outputs of the messages still in the workers go out before the 'END' packet.
+    if self._pool is not None:
+      self._publish_outputs(self._pool.drain())
     self._pub.send_multipart([("%s.data" % self._log_source_tag()).encode('utf-8'), b'', CMD_END.encode('utf-8')])
     self._is_done = not self._is_more_data_in and not self._is_continue_produce
 
 
-  @abstractmethod
+  # Pipelines with their own resources to release extend it.
   def _cleanup(self) -> None:
     # Indicate to Logger to wrap up and exit.
     self._logger.cleanup()
@@ -225,8 +375,10 @@ class Pipeline(Node):
                                        cmd.decode('utf-8'),
                                        host.decode('utf-8')),
                                        flush=True)
+    if self._pool is not None:
+      self._pool.close()
     self._pub.close()
     self._sub.close()
     # Join on the logging background thread last, so that all things can finish in parallel.
-    self._logger_thread.join()
+    self._logger.join()
     super()._cleanup()
@@ -0,0 +1,159 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+from collections import OrderedDict
+from typing import Any
+
+from nodes.pipelines.Pipeline import Pipeline
+from streams import ChainStream
+
+from utils.msgpack_utils import serialize
+from utils.time_utils import get_time
+from utils.zmq_utils import *
+
+
+###########################################################################
+###########################################################################
+# A class for running a chain of Pipelines (i.e. preprocessing, features, classifier) in one process.
+# Each stage passes its outputs to the next one as in-memory objects,
+#   instead of a serialize, PUB, Broker forward, SUB and deserialize per stage,
+#   and the chain has one Logger for all of them.
+# Stages are configured like Pipelines, in order, in `stages`, with the chain's `stream_specs` as the inputs of the first.
+#   Each stage is named by its `name`, or by its Pipeline type and position in the chain (i.e. 'features-1'),
+#   so the same Pipeline type can run in several stages.
+#   Only stages with `is_output` (by default, the last one) are published under their stage name as topic and logged.
+# Stages run through the Pipelines' `_get_stage_specs`, `_create_worker` and `_run_worker`,
+#   so the chain can also run in a pool of worker processes, like any Pipeline.
+# The time of every stage per input message is logged and published as the chain's own output.
+###########################################################################
+###########################################################################
+class PipelineChain(Pipeline):
+  @classmethod
+  def _log_source_tag(cls) -> str:
+    return 'chain'
+
+
+  def __init__(self,
+               host_ip: str,
+               stages: list[dict],
+               logging_spec: dict,
+               stream_specs: list[dict],
+               port_pub: str = PORT_BACKEND,
+               port_sub: str = PORT_FRONTEND,
+               port_sync: str = PORT_SYNC_HOST,
+               port_killsig: str = PORT_KILL,
+               num_workers: int = 1,
+               worker_routing: str = 'device', # [round_robin, device]
+               max_reorder_len: int = 64,
+               **_):
+    # import within this context to avoid circular imports.
+    from nodes.pipelines import PIPELINES
+
+    self._worker_spec: dict = {'stages': []}
+    self._extra_stream_factories: list[tuple[str, type, dict]] = []
+    for i, stage in enumerate(stages):
+      stage_args = stage.copy()
+      stage_type: type[Pipeline] = PIPELINES[stage_args.pop('class')]
+      is_output: bool = stage_args.pop('is_output', i == len(stages)-1)
+      name: str = stage_args.pop('name', '%s-%d' % (stage_type._log_source_tag(), i))
+      if name in [s['name'] for s in self._worker_spec['stages']] or name == self._log_source_tag():
+        raise ValueError("Stage name '%s' is already used in the chain, each stage needs a unique name." % name)
+      stage_worker_spec, stage_stream_info = stage_type._get_stage_specs(**stage_args)
+      self._worker_spec['stages'].append({'name': name,
+                                          'type': stage_type,
+                                          'worker_spec': stage_worker_spec,
+                                          'is_output': is_output})
+      if is_output:
+        self._extra_stream_factories.append((name, stage_type, stage_stream_info))
+    # Processes the messages itself, unless it runs a pool of workers, each building its own stages (i.e. loading models).
+    self._worker: dict = self._create_worker(self._worker_spec) if num_workers == 1 else {}
+
+    stream_info = {
+      "stage_names": [stage['name'] for stage in self._worker_spec['stages']],
+    }
+
+    super().__init__(host_ip=host_ip,
+                     stream_info=stream_info,
+                     logging_spec=logging_spec,
+                     stream_specs=stream_specs,
+                     port_pub=port_pub,
+                     port_sub=port_sub,
+                     port_sync=port_sync,
+                     port_killsig=port_killsig,
+                     num_workers=num_workers,
+                     worker_routing=worker_routing,
+                     max_reorder_len=max_reorder_len)
+
+
+  @classmethod
+  def create_stream(cls, stream_info: dict) -> ChainStream:
+    return ChainStream(**stream_info)
+
+
+  def _get_extra_stream_factories(self) -> list[tuple[str, type, dict]]:
+    return self._extra_stream_factories
+
+
+  @classmethod
+  def _create_worker(cls, worker_spec: dict) -> dict:
+    return {'stages': [{**stage, 'worker': stage['type']._create_worker(stage['worker_spec'])} for stage in worker_spec['stages']]}
+
+
+  # Feed the message through all the stages, returns the outputs of the output stages and the time each stage took.
+  # Outputs of a stage are tagged with the stage name instead of its Pipeline type's, for the next stage and publishing.
+  @classmethod
+  def _run_worker(cls, worker: dict, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    outputs = []
+    latencies_s: OrderedDict[str, Any] = OrderedDict()
+    msgs: list[tuple[str, dict]] = [(topic, msg)]
+    start_time_s = get_time()
+    for stage in worker['stages']:
+      stage_start_time_s = get_time()
+      stage_outputs = [('%s.%s' % (stage['name'], tag.split('.', 1)[-1]), kwargs) for (stage_topic, stage_msg) in msgs
+                       for (tag, kwargs) in stage['type']._run_worker(stage['worker'], stage_topic, stage_msg)]
+      latencies_s['%s_latency_s' % stage['name']] = get_time() - stage_start_time_s
+      if stage['is_output']:
+        outputs.extend(stage_outputs)
+      msgs = [(tag.split('.')[0], kwargs) for (tag, kwargs) in stage_outputs]
+    end_time_s = get_time()
+    latencies_s['total_latency_s'] = end_time_s - start_time_s
+    outputs.append(("%s.data" % cls._log_source_tag(), {'process_time_s': end_time_s, 'data': {'pipeline-chain': latencies_s}}))
+    return outputs
+
+
+  def _get_worker_spec(self) -> dict:
+    return self._worker_spec
+
+
+  def _process_data(self, topic: str, msg: dict) -> None:
+    self._publish_outputs(self._run_worker(self._worker, topic, msg))
+
+
+  # Outputs of every stage go under the stage's own topic and log key.
+  def _store_and_broadcast(self, tag: str, **kwargs) -> None:
+    msg = serialize(**kwargs)
+    self._pub.send_multipart([tag.encode('utf-8'), msg])
+    self._logger.log(tag.split('.')[0], msg, kwargs)
@@ -31,19 +31,23 @@ from streams import PytorchStream
 from utils.time_utils import get_time
 from utils.zmq_utils import *
 from utils.ai_utils import *
+from utils.datastructures.join import StreamJoiner
+from utils.inference_utils import DEFAULT_TCN_KWARGS, create_inference_backend
 
 import numpy as np
 import torch
-from torch import nn
-from collections import deque
-from pytorch_tcn import TCN
 
 
 ######################################################
 ######################################################
 # A class for processing sensor data with an AI model.
-# TODO: Keep the module fixed, instantiate PyTorch
-#       model as an object from user parameters.
+# The model runs on one of the inference backends:
+#   eager PyTorch, TorchScript or ONNX Runtime,
+#   loaded and warmed up before the Node syncs.
+# Inputs are the sensor-first arrays of `input_streams` of the `input_device`, concatenated into (num_sensors, num_channels) snapshots,
+#   by default the accelerations and angular velocities of the DOTs, or i.e. the features of a previous stage in a `PipelineChain`.
+# Can run in a pool of worker processes routed by device,
+#   each keeping the model, normalization and smoothing state of its devices.
 ######################################################
 ######################################################
 class PytorchWorker(Pipeline):
@@ -64,39 +68,50 @@ class PytorchWorker(Pipeline):
                port_sub: str = PORT_FRONTEND,
                port_sync: str = PORT_SYNC_HOST,
                port_killsig: str = PORT_KILL,
+               model_backend: str = 'eager', # [eager, torchscript, onnx]
+               model_kwargs: dict = DEFAULT_TCN_KWARGS,
+               window_len: int = 64,
+               num_intra_op_threads: int = 1,
+               num_inter_op_threads: int = 1,
+               num_warmup_steps: int = 100,
+               is_streaming_inference: bool = True,
+               stream_gap_s: float = 0.5,
+               quantization: str | None = None, # [None, dynamic, static]
+               calibration_hdf5_path: str | None = None,
+               num_calibration_steps: int = 6000,
+               latency_budget_s: float | None = None,
+               num_workers: int = 1,
+               worker_routing: str = 'device', # [device]
+               max_reorder_len: int = 64,
+               join_spec: dict | None = None,
+               input_device: str = 'dots-imu',
+               input_streams: tuple[str, ...] = ('acceleration', 'gyroscope'),
+               normalizer_spec: dict | None = None,
                **_):
-    self._model: nn.Module = TCN(
-      num_inputs=30,
-      num_channels=[16, 32, 32, 32, 16],
-      kernel_size=3,
-      dropout=0.1,
-      output_projection=2,
-      output_activation=None,
-      causal=True
-    )
-    self._model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=True))
-    self._model.eval()
-    # to keep the latest valid IMU sample (because at some time frames a single IMU sample can be None).
-    self._buffer: list[deque[np.ndarray]] = [deque([np.zeros(input_size[1])], maxlen=1) for _ in range(input_size[0])]
-    # Globally turn off gradient calculation. Inference-only mode.
-    torch.set_grad_enabled(False)
-
-    # Initialize any state that the sensor needs.
-    stream_info = {
-      "classes": output_classes,
-      "sampling_rate_hz": sampling_rate_hz
-    }
-
-    # Initialize highpass filter
-    self.b, self.a, self.zi = init_iir_filter(fs=sampling_rate_hz, cutoff_hz=0.3, order=4, num_channels=input_size[1])
-
-    # Initialize vars needed for pre-processing: (x-mean)/std
-    self._mean = np.zeros(6, dtype=np.float32)    
-    self._var = np.ones(6, dtype=np.float32)       
-    self._count = 0 
-
-    # to keep state for label smoothing
-    self.smooth_state = (False, 0, 0)  # (in_fog, consec_ones, consec_zeros)
+    if num_workers > 1 and worker_routing != 'device':
+      raise ValueError("PytorchWorker keeps the model and normalization state of a device in one worker, `worker_routing` must be 'device'.")
+    self._worker_spec, stream_info = self._get_stage_specs(model_path=model_path,
+                                                           input_size=input_size,
+                                                           output_classes=output_classes,
+                                                           sampling_rate_hz=sampling_rate_hz,
+                                                           model_backend=model_backend,
+                                                           model_kwargs=model_kwargs,
+                                                           window_len=window_len,
+                                                           num_intra_op_threads=num_intra_op_threads,
+                                                           num_inter_op_threads=num_inter_op_threads,
+                                                           num_warmup_steps=num_warmup_steps,
+                                                           is_streaming_inference=is_streaming_inference,
+                                                           stream_gap_s=stream_gap_s,
+                                                           quantization=quantization,
+                                                           calibration_hdf5_path=calibration_hdf5_path,
+                                                           num_calibration_steps=num_calibration_steps,
+                                                           join_spec=join_spec,
+                                                           input_device=input_device,
+                                                           input_streams=input_streams,
+                                                           normalizer_spec=normalizer_spec)
+    # The model is loaded in `_initialize`, within the Node's process and before syncing,
+    #   or by each worker process of the pool instead.
+    self._worker: dict
 
     super().__init__(host_ip=host_ip,
                      stream_info=stream_info,
@@ -105,7 +120,11 @@ class PytorchWorker(Pipeline):
                      port_pub=port_pub,
                      port_sub=port_sub,
                      port_sync=port_sync,
-                     port_killsig=port_killsig)
+                     port_killsig=port_killsig,
+                     latency_budget_s=latency_budget_s,
+                     num_workers=num_workers,
+                     worker_routing=worker_routing,
+                     max_reorder_len=max_reorder_len)
 
 
   @classmethod
@@ -113,44 +132,175 @@ class PytorchWorker(Pipeline):
     return PytorchStream(**stream_info)
 
 
-  def _generate_prediction(self) -> tuple[list[float], int]:
-    input_tensor = torch.tensor(np.concatenate([buf[0] for buf in self._buffer]), dtype=torch.float32)[None,:,None]
-    output = self._model(input_tensor, inference=True)
-    logits = output.squeeze().numpy()
-    prediction = output.squeeze().argmax().item()
-    prediction, self.smooth_state = smooth(prediction, self.smooth_state)
-    return logits, prediction
+  @classmethod
+  def _get_stage_specs(cls,
+                       model_path: str,
+                       input_size: tuple[int, int],
+                       output_classes: list[str],
+                       sampling_rate_hz: int,
+                       model_backend: str = 'eager',
+                       model_kwargs: dict = DEFAULT_TCN_KWARGS,
+                       window_len: int = 64,
+                       num_intra_op_threads: int = 1,
+                       num_inter_op_threads: int = 1,
+                       num_warmup_steps: int = 100,
+                       is_streaming_inference: bool = True,
+                       stream_gap_s: float = 0.5,
+                       quantization: str | None = None,
+                       calibration_hdf5_path: str | None = None,
+                       num_calibration_steps: int = 6000,
+                       join_spec: dict | None = None,
+                       input_device: str = 'dots-imu',
+                       input_streams: tuple[str, ...] = ('acceleration', 'gyroscope'),
+                       normalizer_spec: dict | None = None,
+                       **_) -> tuple[dict, dict]:
+    backend_spec = {
+      'model_backend': model_backend,
+      'model_path': model_path,
+      'num_inputs': input_size[0]*input_size[1],
+      'num_intra_op_threads': num_intra_op_threads,
+      'num_inter_op_threads': num_inter_op_threads,
+    }
+    if quantization == 'static' and calibration_hdf5_path is None:
+      raise ValueError('Static quantization needs a recorded session to calibrate on: set `calibration_hdf5_path`.')
+    if model_backend == 'eager':
+      backend_spec.update({'model_kwargs': model_kwargs,
+                           'is_streaming_inference': is_streaming_inference,
+                           'quantization': quantization})
+    elif quantization is not None:
+      raise ValueError("Quantized inference is only supported with the 'eager' backend.")
+    else:
+      backend_spec['window_len'] = window_len
+    worker_spec = {
+      'backend_spec': backend_spec,
+      'input_size': tuple(input_size),
+      'sampling_rate_hz': sampling_rate_hz,
+      'calibration_hdf5_path': calibration_hdf5_path,
+      'num_calibration_steps': num_calibration_steps,
+      'num_warmup_steps': num_warmup_steps,
+      'stream_gap_s': stream_gap_s,
+      'join_spec': join_spec,
+      'input_device': input_device,
+      'input_streams': tuple(input_streams),
+      'normalizer_spec': {'cutoff_hz': 0.3, 'order': 4, **(normalizer_spec or {})},
+    }
+    stream_info = {
+      "classes": output_classes,
+      "sampling_rate_hz": sampling_rate_hz
+    }
+    return worker_spec, stream_info
 
 
-  def _process_data(self, topic: str, msg: dict) -> None:
-    acc = msg['data']['dots-imu']['acceleration']
-    gyr = msg['data']['dots-imu']['gyroscope']
-    toa_s = msg['data']['dots-imu']['toa_s']
+  # Load the model and run it until its latency settles, so the first real snapshots are not delayed.
+  # The worker also keeps the state of the pre-processing and of the label smoothing.
+  @classmethod
+  def _create_worker(cls, worker_spec: dict) -> dict:
+    # Globally turn off gradient calculation. Inference-only mode.
+    torch.set_grad_enabled(False)
+    backend_spec = dict(worker_spec['backend_spec'])
+    input_size = worker_spec['input_size']
+    sampling_rate_hz = worker_spec['sampling_rate_hz']
+    if backend_spec.get('quantization') == 'static':
+      backend_spec['calibration_inputs'] = load_session_inputs(worker_spec['calibration_hdf5_path'],
+                                                               input_size=input_size,
+                                                               sampling_rate_hz=sampling_rate_hz,
+                                                               num_steps=worker_spec['num_calibration_steps'])
+    backend = create_inference_backend(**backend_spec)
+    stats = backend.warm_up(num_steps=worker_spec['num_warmup_steps'])
+    print("%s loaded '%s' model in %.3f s, steady-state inference latency mean %.3f ms, p95 %.3f ms."
+          % (cls._log_source_tag(), backend_spec['model_backend'], stats['load_time_s'],
+             1000*stats['latency_mean_s'], 1000*stats['latency_p95_s']), flush=True)
+
+    # Optionally resample the sensors onto the clock of the model by their time of arrival, instead of taking the snapshots as they come:
+    #   'interpolation' and 'tolerance_s' of each sensor and the 'max_lateness_s' of a sensor, as for the `StreamJoiner`.
+    joiner: StreamJoiner | None = None
+    if worker_spec['join_spec'] is not None:
+      join_spec = dict(worker_spec['join_spec'])
+      max_lateness_s = join_spec.pop('max_lateness_s', 0.1)
+      joiner = StreamJoiner(stream_specs={str(i): {'sample_shape': (input_size[1],), **join_spec} for i in range(input_size[0])},
+                            rate_hz=sampling_rate_hz,
+                            max_lateness_s=max_lateness_s)
+
+    return {
+      'backend': backend,
+      'input_device': worker_spec['input_device'],
+      'input_streams': worker_spec['input_streams'],
+      # Highpass filter of the accelerometers and the running statistics for pre-processing: (x-mean)/std,
+      #   applied to all the sensors of a snapshot at once.
+      #   `normalizer_spec` picks other filtered and centered channels, i.e. none to filter for features.
+      'normalizer': SnapshotNormalizer(num_sensors=input_size[0],
+                                       fs=sampling_rate_hz,
+                                       num_channels=input_size[1],
+                                       **worker_spec['normalizer_spec']),
+      'joiner': joiner,
+      # to keep the latest valid IMU sample (because at some time frames a single IMU sample can be None).
+      'buffer': np.zeros(input_size, dtype=np.float32),
+      # Model state is reset when no snapshot came for longer than `stream_gap_s`.
+      'stream_gap_s': worker_spec['stream_gap_s'],
+      'last_snapshot_time_s': None,
+      # to keep state for label smoothing: (in_fog, consec_ones, consec_zeros)
+      'smooth_state': (False, 0, 0),
+    }
+
 
-    for i, sensor_sample in enumerate(np.concatenate((acc, gyr), axis=1)):
-      if all(map(lambda el: not np.isnan(el), sensor_sample)):
-        norm_sample, self.zi, self._count, self._mean, self._var = normalize(sensor_sample, self.b, self.a, self.zi, self._count, self._mean, self._var)
-        self._buffer[i].append(norm_sample)
+  @classmethod
+  def _run_worker(cls, worker: dict, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    device_data = msg['data'].get(worker['input_device'])
+    if device_data is None:
+      return []
+    num_sensors = len(worker['buffer'])
+    snapshot = np.concatenate([np.reshape(device_data[stream_name], (num_sensors, -1)) for stream_name in worker['input_streams']], axis=1)
+    # Inputs without arrival times of their own (i.e. features of a previous stage) arrived with the message.
+    toa_s = np.asarray(device_data.get('toa_s', [msg['process_time_s']]*num_sensors), dtype=np.float64)
+
+    if worker['joiner'] is None:
+      return [cls._run_model(worker, snapshot, toa_s, msg['process_time_s'])]
+    # Run the model on every tick of the common clock the sensors' samples completed, missing sensors are NaN.
+    for i, (sensor_sample, sensor_toa_s) in enumerate(zip(snapshot, toa_s)):
+      if not np.isnan(sensor_toa_s) and not np.isnan(sensor_sample).any():
+        worker['joiner'].push(str(i), sensor_toa_s, sensor_sample)
+    return [cls._run_model(worker, np.stack([values[str(i)][-1] for i in range(len(snapshot))]), toa_s, msg['process_time_s'])
+            for (_, values) in worker['joiner'].pop_windows()]
+
+
+  @classmethod
+  def _run_model(cls, worker: dict, snapshot: np.ndarray, toa_s: np.ndarray, process_time_s: float) -> tuple[str, dict]:
+    # Sensors missing from the snapshot (NaN) keep their latest valid sample.
+    preprocessing_start_time_s: float = get_time()
+    norm_snapshot, is_valid = worker['normalizer'](snapshot)
+    worker['buffer'][is_valid] = norm_snapshot[is_valid]
+
+    # Start the model over after a gap in the sensor stream.
+    if worker['last_snapshot_time_s'] is not None and process_time_s - worker['last_snapshot_time_s'] > worker['stream_gap_s']:
+      worker['backend'].reset()
+    worker['last_snapshot_time_s'] = process_time_s
 
     start_time_s: float = get_time()
-    logits, prediction = self._generate_prediction()
+    logits = worker['backend'].step(worker['buffer'].reshape(-1))
+    prediction, worker['smooth_state'] = smooth(int(logits.argmax()), worker['smooth_state'])
     end_time_s: float = get_time()
 
     data = {
       'logits': logits,
       'prediction': prediction,
       'inference_latency_s': end_time_s-start_time_s,
+      'preprocessing_latency_s': start_time_s-preprocessing_start_time_s,
       'delay_since_first_sensor_s': start_time_s-np.min(toa_s),
-      'delay_since_snapshot_ready_s': start_time_s-msg['process_time_s']
+      'delay_since_snapshot_ready_s': start_time_s-process_time_s
     }
+    return ("%s.data" % cls._log_source_tag(), {'process_time_s': end_time_s, 'data': {'pytorch-worker': data}})
 
-    tag: str = "%s.data" % self._log_source_tag()
-    self._publish(tag, process_time_s=end_time_s, data={'pytorch-worker': data})
 
+  def _get_worker_spec(self) -> dict:
+    return self._worker_spec
 
-  def _stop_new_data(self):
-    pass
 
+  # Load the model in the Node's process, unless the workers of the pool load their own.
+  def _initialize(self):
+    if self._num_workers == 1:
+      self._worker = self._create_worker(self._worker_spec)
+    super()._initialize()
 
-  def _cleanup(self) -> None:
-    super()._cleanup()
+
+  def _process_data(self, topic: str, msg: dict) -> None:
+    self._publish_outputs(self._run_worker(self._worker, topic, msg))
@@ -2,8 +2,12 @@ from nodes.pipelines.Pipeline import Pipeline
 
 from nodes.pipelines.DummyPipeline import DummyPipeline
 from nodes.pipelines.PytorchWorker import PytorchWorker
+from nodes.pipelines.FeaturePipeline import FeaturePipeline
+from nodes.pipelines.PipelineChain import PipelineChain
 
 PIPELINES: dict[str, type[Pipeline]] = {
   "PytorchWorker": PytorchWorker,
   "DummyPipeline": DummyPipeline,
+  "FeaturePipeline": FeaturePipeline,
+  "PipelineChain": PipelineChain,
 }
@@ -29,15 +29,21 @@ from nodes.producers.Producer import Producer
 from streams import CameraStream
 
 from handlers.Basler.BaslerHandler import ImageEventHandler
+from handlers.EdgeEncoderHandler import EdgeVideoEncoder
 import pypylon.pylon as pylon
 from utils.print_utils import *
+from utils.types import VIDEO_FORMAT, VideoCodecDict
 from utils.zmq_utils import *
 from collections import OrderedDict
+import queue
+import yaml
 
 
 #######################################################
 #######################################################
 # A class for streaming videos from Basler PoE cameras.
+# Can optionally encode the frames on the edge (JPEG/H.264),
+#   to publish compressed packets instead of raw Bayer frames.
 #######################################################
 #######################################################
 class CameraStreamer(Producer):
@@ -58,6 +64,11 @@ class CameraStreamer(Producer):
                port_killsig: str = PORT_KILL,
                transmit_delay_sample_period_s: float = float('nan'),
                timesteps_before_solidified: int = 0,
+               edge_encoding: str | None = None, # [None, jpeg, h264]
+               edge_codec_config_filepath: str | None = None,
+               edge_gop_size: int = 30,
+               edge_queue_len: int = 60,
+               edge_backlog_policy: str = 'block', # [block, drop]
                **_):
 
     # Initialize general state.
@@ -67,12 +78,27 @@ class CameraStreamer(Producer):
     self._fps = fps
     self._get_frame_fn = self._get_frame
     self._stop_time_s = float('nan')
+    self._resolution = resolution
+    self._edge_encoding = edge_encoding
+    self._edge_gop_size = edge_gop_size
+    self._edge_queue_len = edge_queue_len
+    self._edge_backlog_policy = edge_backlog_policy
+    self._edge_codec: VideoCodecDict | None = None
+    if edge_codec_config_filepath is not None:
+      with open(edge_codec_config_filepath, "r") as f:
+        self._edge_codec = yaml.safe_load(f)
+    self._process_frame_fn = self._process_frame if edge_encoding is None else self._encode_frame
+    # Encoded packets of all cameras, and metadata of frames waiting in the encoders.
+    self._encoded_queue: queue.Queue[tuple[str, bytes, bool, int]] = queue.Queue()
+    self._encoders: OrderedDict[str, EdgeVideoEncoder] = OrderedDict()
+    self._pending_frames: dict[tuple[str, int], tuple[np.uint64, np.uint64, float]] = dict()
 
     stream_info = {
       "camera_mapping": camera_mapping,
       "fps": fps,
       "resolution": resolution,
-      "timesteps_before_solidified": timesteps_before_solidified
+      "timesteps_before_solidified": timesteps_before_solidified,
+      "edge_encoding": edge_encoding
     }
 
     super().__init__(host_ip=host_ip,
@@ -140,6 +166,21 @@ class CameraStreamer(Producer):
       #   cam.PtpDataSetLatch.Execute()
       #   time.sleep(2)
 
+    # Instantiate an encoder per camera, if encoding on the edge.
+    if self._edge_encoding is not None:
+      for camera_id in self._camera_mapping.keys():
+        self._encoders[camera_id] = EdgeVideoEncoder(device_name=camera_id,
+                                                     width=self._resolution[1],
+                                                     height=self._resolution[0],
+                                                     fps=self._fps,
+                                                     input_pix_fmt=VIDEO_FORMAT['bayer_rg8'].ffmpeg_pix_fmt,
+                                                     encoding=self._edge_encoding,
+                                                     output_queue=self._encoded_queue,
+                                                     video_codec=self._edge_codec,
+                                                     gop_size=self._edge_gop_size,
+                                                     max_queue_len=self._edge_queue_len,
+                                                     backlog_policy=self._edge_backlog_policy)
+
     # Instantiate callback handler.
     self._image_handler = ImageEventHandler(cam_array=self._cam_array)
 
@@ -155,14 +196,20 @@ class CameraStreamer(Producer):
 
   def _get_frame(self) -> None:
     if buf := self._image_handler.get_frame():
-      self._process_frame(*buf)
+      self._process_frame_fn(*buf)
+    self._publish_encoded_packets()
 
 
   def _get_frame_stopped(self) -> None:
     is_timeout = (get_time() - self._stop_time_s) > 5
     if buf := self._image_handler.get_frame():
-      self._process_frame(*buf)
+      self._process_frame_fn(*buf)
+      self._publish_encoded_packets()
     elif is_timeout and not self._is_continue_capture:
+      # Flush the frames still in the edge encoders.
+      for encoder in self._encoders.values():
+        encoder.close()
+      self._publish_encoded_packets()
       # If triggered to stop and no more available data, send empty 'END' packet and join.
       self._send_end_packet()
 
@@ -191,6 +238,35 @@ class CameraStreamer(Producer):
     self._publish(tag=tag, process_time_s=process_time_s, data={camera_id: data})
 
 
+  # Hand the raw frame off to the camera's encoder, keeping its metadata until the packet comes out.
+  #   A frame the encoder dropped never comes out, so its metadata is not kept.
+  def _encode_frame(self,
+                    camera_id: str,
+                    frame_buffer: bytes,
+                    is_keyframe: bool,
+                    frame_index: np.uint64,
+                    timestamp: np.uint64,
+                    sequence_id: np.uint64,
+                    toa_s: float) -> None:
+    self._pending_frames[(camera_id, int(frame_index))] = (timestamp, sequence_id, toa_s)
+    if not self._encoders[camera_id].put(frame_buffer, int(frame_index)):
+      del self._pending_frames[(camera_id, int(frame_index))]
+
+
+  # Publish all the packets that the edge encoders produced so far, with the metadata of their source frames.
+  def _publish_encoded_packets(self) -> None:
+    while not self._encoded_queue.empty():
+      camera_id, packet, is_keyframe, frame_index = self._encoded_queue.get()
+      timestamp, sequence_id, toa_s = self._pending_frames.pop((camera_id, frame_index))
+      self._process_frame(camera_id=camera_id,
+                          frame_buffer=packet,
+                          is_keyframe=is_keyframe,
+                          frame_index=np.uint64(frame_index),
+                          timestamp=timestamp,
+                          sequence_id=sequence_id,
+                          toa_s=toa_s)
+
+
   def _stop_new_data(self) -> None:
     # Stop capturing data.
     self._cam_array.StopGrabbing()
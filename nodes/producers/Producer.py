@@ -32,7 +32,7 @@ import zmq
 import threading
 import math
 
-from handlers.LoggingHandler import Logger
+from handlers.LoggingHandler import LoggerHandle, create_logger_handle
 from handlers.TransmissionDelayHandler import DelayEstimator
 from nodes.Node import Node
 from streams import Stream
@@ -70,12 +70,12 @@ class Producer(Node):
     # Data structure for keeping track of data
     self._stream: Stream = self.create_stream(stream_info)
 
-    # Create the DataLogger object
-    self._logger = Logger(self._log_source_tag(), **logging_spec)
-
-    # Launch datalogging thread with reference to the Stream object.
-    self._logger_thread = threading.Thread(target=self._logger, args=(OrderedDict([(self._log_source_tag(), self._stream)]),))
-    self._logger_thread.start()
+    # Launch datalogging thread or process with reference to the Stream object.
+    self._logger: LoggerHandle = create_logger_handle(log_tag=self._log_source_tag(),
+                                                      streams=OrderedDict([(self._log_source_tag(), self._stream)]),
+                                                      stream_factories=[(self._log_source_tag(), type(self), stream_info)],
+                                                      logging_spec=logging_spec,
+                                                      ctx=self._ctx)
 
     # Conditional creation of the transmission delay estimate thread.
     if not math.isnan(self._transmit_delay_sample_period_s):
@@ -157,8 +157,8 @@ class Producer(Node):
     msg = serialize(**kwargs)
     # Send the data packet on the PUB socket.
     self._pub.send_multipart([tag.encode('utf-8'), msg])
-    # Store the captured data into the data structure.
-    self._stream.append_data(**kwargs)
+    # Store the captured data into the data structure for logging.
+    self._logger.log(self._log_source_tag(), msg, kwargs)
 
 
   # Iteration loop logic for the sensor.
@@ -203,7 +203,7 @@ class Producer(Node):
                                        flush=True)
     self._pub.close()
     # Join on the logging background thread last, so that all things can finish in parallel.
-    self._logger_thread.join()
+    self._logger.join()
     if not math.isnan(self._transmit_delay_sample_period_s):
       self._delay_thread.join()
     super()._cleanup()
@@ -43,6 +43,7 @@ class CameraStream(Stream):
                resolution: tuple[int],
                timesteps_before_solidified: int = 0,
                update_interval_ms: int = 100,
+               edge_encoding: str | None = None,
                **_) -> None:
     super().__init__()
 
@@ -50,6 +51,8 @@ class CameraStream(Stream):
     self._camera_mapping: OrderedDict[str, str] = OrderedDict(zip(camera_ids, camera_names))
     self._update_interval_ms = update_interval_ms
     self._timesteps_before_solidified = timesteps_before_solidified
+    # Frames are either raw Bayer images, or JPEG/H.264 packets if encoded on the edge.
+    self._color_format = 'bayer_rg8' if edge_encoding is None else edge_encoding
 
     self._define_data_notes()
 
@@ -58,7 +61,7 @@ class CameraStream(Stream):
       self.add_stream(device_name=camera_id,
                       stream_name='frame',
                       is_video=True,
-                      color_format='bayer_rg8',
+                      color_format=self._color_format,
                       data_type='uint8',
                       sample_size=resolution,
                       sampling_rate_hz=fps,
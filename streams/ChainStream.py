@@ -0,0 +1,79 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+from collections import OrderedDict
+from streams import Stream
+import dash_bootstrap_components as dbc
+
+
+###############################################################
+###############################################################
+# A structure to store the processing time of each stage
+#   of a chain of Pipelines run within one process, per input.
+###############################################################
+###############################################################
+class ChainStream(Stream):
+  def __init__(self,
+               stage_names: list[str],
+               sampling_rate_hz: float = 0.0,
+               **_) -> None:
+    super().__init__()
+
+    self._stage_names = stage_names
+    self._define_data_notes()
+
+    for stream_name in [*['%s_latency_s' % name for name in stage_names], 'total_latency_s']:
+      self.add_stream(device_name='pipeline-chain',
+                      stream_name=stream_name,
+                      data_type='float64',
+                      sample_size=(1,),
+                      sampling_rate_hz=sampling_rate_hz,
+                      is_measure_rate_hz=stream_name == 'total_latency_s' and sampling_rate_hz > 0,
+                      data_notes=self._data_notes['pipeline-chain'][stream_name])
+
+
+  def get_fps(self) -> dict[str, float | None]:
+    return {'pipeline-chain': super()._get_fps('pipeline-chain', 'total_latency_s')}
+
+
+  def build_visulizer(self) -> dbc.Row | None:
+    return super().build_visulizer()
+
+
+  def _define_data_notes(self) -> None:
+    self._data_notes = {}
+    self._data_notes.setdefault('pipeline-chain', {})
+
+    for name in self._stage_names:
+      self._data_notes['pipeline-chain']['%s_latency_s' % name] = OrderedDict([
+        ('Description', 'Amount of time the \'%s\' stage took on the outputs of the previous stage for one input message, '
+                        'passed in memory, without serialization or a Broker round trip' % name),
+        ('Units', 'seconds'),
+      ])
+    self._data_notes['pipeline-chain']['total_latency_s'] = OrderedDict([
+      ('Description', 'Amount of time the whole chain took on one input message'),
+      ('Units', 'seconds'),
+    ])
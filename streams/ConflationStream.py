@@ -0,0 +1,86 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+from collections import OrderedDict
+from streams import Stream
+import dash_bootstrap_components as dbc
+
+
+##########################################################################
+##########################################################################
+# A structure to store how far behind a Pipeline's processing fell,
+#   when it only processes the freshest of the pending input messages.
+# Is its own (factory) type, to be recreated in the Logger of the Pipeline.
+##########################################################################
+##########################################################################
+class ConflationStream(Stream):
+  def __init__(self,
+               sampling_rate_hz: float = 0.0,
+               **_) -> None:
+    super().__init__()
+
+    self._define_data_notes()
+
+    self.add_stream(device_name='conflation',
+                    stream_name='num_skipped',
+                    data_type='uint32',
+                    sample_size=(1,),
+                    sampling_rate_hz=sampling_rate_hz,
+                    data_notes=self._data_notes['conflation']['num_skipped'])
+    self.add_stream(device_name='conflation',
+                    stream_name='staleness_s',
+                    data_type='float64',
+                    sample_size=(1,),
+                    sampling_rate_hz=sampling_rate_hz,
+                    data_notes=self._data_notes['conflation']['staleness_s'])
+
+
+  @classmethod
+  def create_stream(cls, stream_info: dict) -> 'ConflationStream':
+    return cls(**stream_info)
+
+
+  def get_fps(self) -> dict[str, float | None]:
+    return {'conflation': None}
+
+
+  def build_visulizer(self) -> dbc.Row | None:
+    return super().build_visulizer()
+
+
+  def _define_data_notes(self) -> None:
+    self._data_notes = {}
+    self._data_notes.setdefault('conflation', {})
+
+    self._data_notes['conflation']['num_skipped'] = OrderedDict([
+      ('Description', 'Number of input messages logged but not processed since the previous output, '
+                      'because processing fell behind the latency budget and only the freshest message was processed'),
+    ])
+    self._data_notes['conflation']['staleness_s'] = OrderedDict([
+      ('Description', 'Time the input message the output was computed from waited until its processing started, '
+                      'beyond the fastest delivery seen from its producer, on the Pipeline\'s clock'),
+      ('Units', 'seconds'),
+    ])
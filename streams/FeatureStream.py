@@ -0,0 +1,94 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+from collections import OrderedDict
+from streams import Stream
+import dash_bootstrap_components as dbc
+
+
+##########################################################
+##########################################################
+# A structure to store windowed features of input streams,
+#   one device per configured input, one stream per feature.
+##########################################################
+##########################################################
+class FeatureStream(Stream):
+  def __init__(self,
+               input_specs: list[dict],
+               features: list[str],
+               bands_hz: list[tuple[float, float]],
+               window_s: float,
+               hop_s: float,
+               **_) -> None:
+    super().__init__()
+
+    self._input_specs = input_specs
+    self._features = features
+    self._bands_hz = bands_hz
+    self._window_s = window_s
+    self._hop_s = hop_s
+    self._define_data_notes()
+
+    for input_spec in input_specs:
+      for feature in features:
+        self.add_stream(device_name=input_spec['name'],
+                        stream_name=feature,
+                        data_type='uint32' if feature == 'zc' else 'float64',
+                        sample_size=(len(bands_hz), input_spec['num_channels']) if feature == 'band_power' else (input_spec['num_channels'],),
+                        sampling_rate_hz=1.0/hop_s,
+                        is_measure_rate_hz=feature == features[0],
+                        data_notes=self._data_notes[input_spec['name']][feature])
+
+
+  def get_fps(self) -> dict[str, float | None]:
+    return {input_spec['name']: super()._get_fps(input_spec['name'], self._features[0]) for input_spec in self._input_specs}
+
+
+  def build_visulizer(self) -> dbc.Row | None:
+    return super().build_visulizer()
+
+
+  def _define_data_notes(self) -> None:
+    descriptions = {
+      'rms': ('Root mean square of each channel over the window', None),
+      'mav': ('Mean absolute value of each channel over the window', None),
+      'wl': ('Waveform length, the sum of absolute differences of consecutive samples of each channel over the window', None),
+      'zc': ('Number of zero crossings (sign changes between consecutive samples) of each channel over the window', None),
+      'band_power': ('One-sided power of the DFT of the window within each frequency band (rows), of each channel (columns)',
+                     ', '.join('%g-%g Hz' % (low_hz, high_hz) for low_hz, high_hz in self._bands_hz)),
+      'jerk': ('Root mean square of the first derivative of each channel over the window, i.e. jerk of an accelerometer', None),
+    }
+    self._data_notes = {}
+    for input_spec in self._input_specs:
+      self._data_notes.setdefault(input_spec['name'], {})
+      for feature in self._features:
+        description, bands = descriptions[feature]
+        self._data_notes[input_spec['name']][feature] = OrderedDict([
+          ('Description', description),
+          ('Input', '%s/%s' % (input_spec['device'], input_spec['stream'])),
+          ('Window', '%g s, every %g s' % (self._window_s, self._hop_s)),
+          *([('Bands', bands)] if bands is not None else []),
+        ])
@@ -65,6 +65,11 @@ class PytorchStream(Stream):
                     data_type='float64',
                     sample_size=(1,),
                     data_notes=self._data_notes['pytorch-worker']['inference_latency_s'])
+    self.add_stream(device_name='pytorch-worker',
+                    stream_name='preprocessing_latency_s',
+                    data_type='float64',
+                    sample_size=(1,),
+                    data_notes=self._data_notes['pytorch-worker']['preprocessing_latency_s'])
     self.add_stream(device_name='pytorch-worker',
                     stream_name='delay_since_first_sensor_s',
                     data_type='float64',
@@ -101,6 +106,10 @@ class PytorchStream(Stream):
       ('Description', 'Amount of time it took for the forward pass for the new sample w.r.t. system clock'),
       ('Units', 'seconds'),
     ])
+    self._data_notes['pytorch-worker']['preprocessing_latency_s'] = OrderedDict([
+      ('Description', 'Amount of time it took to filter and normalize the new sensor snapshot w.r.t. system clock'),
+      ('Units', 'seconds'),
+    ])
     self._data_notes['pytorch-worker']['delay_since_first_sensor_s'] = OrderedDict([
       ('Description', 'Amount of time between arrival of the 1st sensor packet and inference start'),
       ('Units', 'seconds'),
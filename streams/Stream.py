@@ -266,9 +266,9 @@ class Stream(ABC):
     num_available: int = len(self._data[device_name][stream_name])
     # Can pop all available data, except what must be kept peekable.
     num_poppable: int = num_available - self._streams_info[device_name][stream_name]['timesteps_before_solidified']
-    # If experiment ended, flush all available data from the Stream.
+    # If experiment ended, flush all available data from the Stream (up to the requested number, if any).
     if is_flush:
-      num_oldest_to_pop = num_available
+      num_oldest_to_pop = num_available if num_oldest_to_pop is None else min(num_oldest_to_pop, num_available)
     elif num_oldest_to_pop is None:
       num_oldest_to_pop = num_poppable
     else:
@@ -342,6 +342,11 @@ class Stream(ABC):
         self.clear_data(device_name, stream_name)
 
 
+  # Number of data elements of a stream waiting in the FIFO, O(1).
+  def get_num_available(self, device_name: str, stream_name: str) -> int:
+    return len(self._data[device_name][stream_name])
+
+
   def get_num_devices(self) -> int:
     return len(self._streams_info)
 
@@ -69,3 +69,18 @@ try:
   from .PytorchStream import PytorchStream
 except ImportError:
   pass
+
+try:
+  from .ConflationStream import ConflationStream
+except ImportError:
+  pass
+
+try:
+  from .FeatureStream import FeatureStream
+except ImportError:
+  pass
+
+try:
+  from .ChainStream import ChainStream
+except ImportError:
+  pass
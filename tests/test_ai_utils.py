@@ -0,0 +1,113 @@
+############
+#
+# Copyright (c) 2025 Vayalet Stefanova and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2025 for AidWear, AidFOG, and RevalExo projects of KU Leuven.
+#
+# ############
+
+import numpy as np
+from scipy.signal import butter, sosfilt
+from utils.ai_utils import SnapshotNormalizer
+
+
+FS = 60
+NUM_SENSORS = 5
+NUM_STEPS = 400
+
+
+def create_snapshots(missing_fraction: float, seed: int = 0) -> np.ndarray:
+  rng = np.random.default_rng(seed)
+  snapshots = np.cumsum(rng.standard_normal((NUM_STEPS, NUM_SENSORS, 6)), axis=0) + 9.81
+  snapshots[rng.random((NUM_STEPS, NUM_SENSORS)) < missing_fraction] = np.nan
+  return snapshots
+
+
+# Reference of the snapshot preprocessing, one sensor at a time:
+#   `sosfilt` over the valid samples of each sensor, then the running statistics updated with each valid sample in turn.
+def reference_normalize(snapshots: np.ndarray, eps: float = 1e-3) -> np.ndarray:
+  sos = butter(4, 0.3 / (0.5 * FS), btype='high', analog=False, output='sos')
+  is_valid = ~np.isnan(snapshots).any(axis=2)
+  filtered = snapshots.copy()
+  for j in range(NUM_SENSORS):
+    filtered[is_valid[:, j], j, :3] = sosfilt(sos, snapshots[is_valid[:, j], j, :3], axis=0)
+
+  out = np.full_like(snapshots, np.nan)
+  count, mean, var = 0, np.zeros(6), np.ones(6)
+  for t in range(NUM_STEPS):
+    for sample in filtered[t, is_valid[t]]:
+      count += 1
+      delta = sample - mean
+      mean = mean + delta / count
+      var = var + (delta * (sample - mean) - var) / count
+    centered = filtered[t, is_valid[t]] - np.concatenate((np.zeros(3), mean[3:]))
+    out[t, is_valid[t]] = centered / np.clip(np.sqrt(var), eps, None)
+  return out
+
+
+def run_normalizer(snapshots: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  normalizer = SnapshotNormalizer(num_sensors=NUM_SENSORS, fs=FS)
+  outputs, masks = zip(*(normalizer(snapshot) for snapshot in snapshots))
+  return np.stack(outputs), np.stack(masks)
+
+
+def test_filter_matches_sosfilt_per_sensor():
+  snapshots = create_snapshots(missing_fraction=0.0)
+  out, is_valid = run_normalizer(snapshots)
+  assert is_valid.all()
+  np.testing.assert_allclose(out, reference_normalize(snapshots), rtol=1e-9, atol=1e-9)
+
+
+def test_missing_sensors_hold_their_filter_state():
+  snapshots = create_snapshots(missing_fraction=0.2)
+  # One sensor drops out for a long stretch, to be sure its filter resumes from where it stopped.
+  snapshots[100:250, 2] = np.nan
+  out, is_valid = run_normalizer(snapshots)
+  np.testing.assert_array_equal(is_valid, ~np.isnan(snapshots).any(axis=2))
+  assert np.isnan(out[~is_valid]).all()
+  np.testing.assert_allclose(out[is_valid], reference_normalize(snapshots)[is_valid], rtol=1e-9, atol=1e-9)
+
+
+def test_reset_starts_over():
+  snapshots = create_snapshots(missing_fraction=0.1)
+  normalizer = SnapshotNormalizer(num_sensors=NUM_SENSORS, fs=FS)
+  first = [normalizer(snapshot)[0] for snapshot in snapshots]
+  normalizer.reset()
+  second = [normalizer(snapshot)[0] for snapshot in snapshots]
+  np.testing.assert_array_equal(np.stack(first), np.stack(second))
+
+
+# Snapshots merged one chunk of sensors at a time, down to one sample per update,
+#   match `sosfilt` over each sensor's whole sequence and the mean and std over all the data seen so far.
+def test_chunks_match_batch_statistics():
+  sos = butter(4, 0.3 / (0.5 * FS), btype='high', analog=False, output='sos')
+  for chunk_size in (1, 2, 7):
+    snapshots = np.cumsum(np.random.default_rng(chunk_size).standard_normal((NUM_STEPS, chunk_size, 6)), axis=0) + 9.81
+    normalizer = SnapshotNormalizer(num_sensors=chunk_size, fs=FS)
+    out = np.stack([normalizer(snapshot)[0] for snapshot in snapshots])
+    filtered = snapshots.copy()
+    filtered[:, :, :3] = sosfilt(sos, snapshots[:, :, :3], axis=0)
+    for t in range(NUM_STEPS):
+      seen = filtered[:t+1].reshape(-1, 6)
+      mean = seen.mean(axis=0)
+      std = np.clip(seen.std(axis=0), 1e-3, None)
+      expected = (filtered[t] - np.concatenate((np.zeros(3), mean[3:]))) / std
+      np.testing.assert_allclose(out[t], expected, rtol=1e-9, atol=1e-9)
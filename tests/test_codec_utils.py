@@ -0,0 +1,88 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+
+import av
+import numpy as np
+import pytest
+import yaml
+from benchmarks.common import SyntheticStream, run_logger
+from utils.codec_utils import FALLBACK_VIDEO_CODECS, get_ffmpeg_encoders, load_video_codec_specs, probe_video_codec, select_video_codec
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODEC_OPTIONS = {**load_video_codec_specs(os.path.join(REPO_DIR, 'resources', 'codecs')),
+                 **{'fallback_%s' % spec['codec_name']: spec for spec in FALLBACK_VIDEO_CODECS}}
+WIDTH, HEIGHT, FPS = 64, 48, 30
+
+
+# Moving gradient, smooth enough for lossy codecs to keep close to the original.
+def create_frames(num_frames: int) -> np.ndarray:
+  y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+  return np.stack([np.stack([(2*x + 3*i) % 256, (3*y + i) % 256, np.full_like(x, 128)], axis=2)
+                   for i in range(num_frames)]).astype(np.uint8)
+
+
+# Records the frames through the Logger's video writer with the codec option, and decodes the video back.
+def encode_decode(video_codec: dict, frames: np.ndarray, log_dir: str) -> np.ndarray:
+  stream = SyntheticStream([{'device_name': 'camera', 'stream_name': 'frame', 'data_type': 'uint8', 'sample_size': (HEIGHT, WIDTH, 3),
+                             'sampling_rate_hz': FPS, 'is_video': True, 'color_format': 'bgr'}])
+  for (i, frame) in enumerate(frames):
+    stream.append_data(process_time_s=i/FPS, data={'camera': {'frame': (frame.tobytes(), True, i)}})
+  run_logger(OrderedDict([('cameras', stream)]), log_dir, stream_video=True, video_codec=video_codec)
+  with av.open(os.path.join(log_dir, 'bench_camera.mkv')) as container:
+    return np.stack([frame.to_ndarray(format='bgr24') for frame in container.decode(video=0)])
+
+
+@pytest.mark.parametrize('name', CODEC_OPTIONS.keys())
+def test_codec_round_trip(name, tmp_path):
+  video_codec = CODEC_OPTIONS[name]
+  if video_codec['codec_name'] not in get_ffmpeg_encoders() or not probe_video_codec(video_codec, WIDTH, HEIGHT, 'bgr24', FPS)['fps']:
+    pytest.skip("'%s' is not supported on this host." % name)
+  frames = create_frames(60)
+  decoded = encode_decode(video_codec, frames, str(tmp_path))
+  assert decoded.shape == frames.shape
+  assert np.abs(decoded.astype(np.float64) - frames).mean() < 8
+
+
+# A spec with an option its encoder does not support is never selected, the fallbacks are used instead.
+def test_unsupported_option_is_not_selected(tmp_path):
+  with open(tmp_path / 'broken.yml', 'w') as f:
+    yaml.safe_dump({'codec_name': 'libx264', 'pix_format': 'yuv420p', 'input_options': {},
+                    'output_options': {'preset': 'no-such-preset'}}, f)
+  assert probe_video_codec(CODEC_OPTIONS['fallback_libx264'] | {'output_options': {'preset': 'no-such-preset'}},
+                           WIDTH, HEIGHT, 'bgr24', FPS)['fps'] == 0
+  _, selection = select_video_codec([(WIDTH, HEIGHT, 'bgr24', FPS)], codecs_dir=str(tmp_path))
+  assert selection['name'].startswith('fallback_')
+
+
+# Streams that no candidate can encode raise, instead of selecting a codec that fails during the recording.
+def test_no_usable_codec_raises(tmp_path):
+  with pytest.raises(RuntimeError):
+    select_video_codec([(WIDTH, HEIGHT, 'no-such-pix-fmt', FPS)], codecs_dir=str(tmp_path))
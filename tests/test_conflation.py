@@ -0,0 +1,98 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import os
+
+import h5py
+import numpy as np
+import zmq
+from nodes.pipelines.Pipeline import Pipeline
+from streams.DummyStream import DummyStream
+from utils.msgpack_utils import serialize
+from utils.time_utils import get_time
+
+
+# Pipeline that records which input messages it got to process.
+class RecordingPipeline(Pipeline):
+  @classmethod
+  def _log_source_tag(cls) -> str:
+    return 'recording-pipeline'
+
+
+  def __init__(self, **kwargs) -> None:
+    super().__init__(**kwargs)
+    self.processed: list[float] = []
+
+
+  @classmethod
+  def create_stream(cls, stream_info: dict) -> DummyStream:
+    return DummyStream(**stream_info)
+
+
+  def _process_data(self, topic: str, msg: dict) -> None:
+    self.processed.append(msg['process_time_s'])
+
+
+# Send input messages of the DummyProducer, stamped on a producer clock that is `clock_offset_s` ahead of the local one.
+def send_messages(push: zmq.SyncSocket, delays_s: list[float], clock_offset_s: float) -> list[float]:
+  process_times_s = [get_time() + clock_offset_s - delay_s for delay_s in delays_s]
+  for process_time_s in process_times_s:
+    push.send_multipart([b'dummy-producer.data', serialize(process_time_s=process_time_s, data={'sensor-emulator': {'toa': process_time_s}})])
+  return process_times_s
+
+
+# A backlog on a producer with a skewed clock: all of it is logged, but only the freshest message is processed,
+#   while messages delivered in time are all processed.
+def test_backlog_is_logged_and_conflated(tmp_path):
+  pipeline = RecordingPipeline(host_ip='127.0.0.1',
+                               stream_info={'sampling_rate_hz': 100},
+                               logging_spec={'log_dir': str(tmp_path), 'log_time_s': 0.0, 'experiment': {}, 'stream_hdf5': True},
+                               stream_specs=[{'class': 'DummyProducer', 'sampling_rate_hz': 100}],
+                               latency_budget_s=0.1)
+  pipeline._sub = pipeline._ctx.socket(zmq.PULL)
+  pipeline._sub.bind('inproc://conflation')
+  push: zmq.SyncSocket = pipeline._ctx.socket(zmq.PUSH)
+  push.connect('inproc://conflation')
+  clock_offset_s = 1000.0
+  # Delivered in time.
+  in_time = send_messages(push, [0.0], clock_offset_s)
+  pipeline._poll_conflated_data_packets()
+  in_time += send_messages(push, [0.02, 0.01, 0.0], clock_offset_s)
+  pipeline._poll_conflated_data_packets()
+  # A second's worth of backlog.
+  backlog = send_messages(push, list(np.linspace(1.0, 0.0, 50)), clock_offset_s)
+  pipeline._poll_conflated_data_packets()
+  assert pipeline.processed == in_time + backlog[-1:]
+  assert pipeline._num_skipped == len(backlog) - 1
+  assert 0 <= pipeline._staleness_s < 0.1
+
+  push.close()
+  pipeline._sub.close()
+  pipeline._logger.cleanup()
+  pipeline._logger.join()
+  with h5py.File(os.path.join(tmp_path, 'recording-pipeline.hdf5'), 'r') as hdf5_file:
+    np.testing.assert_array_equal(hdf5_file['dummy-producer/sensor-emulator/process_time_s'][:, 0], in_time + backlog)
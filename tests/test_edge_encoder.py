@@ -0,0 +1,73 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import queue
+
+import numpy as np
+import pytest
+from handlers.EdgeEncoderHandler import EdgeVideoEncoder
+
+
+WIDTH, HEIGHT = 64, 48
+
+
+def encode_frames(backlog_policy: str, num_frames: int) -> tuple[EdgeVideoEncoder, list[bool], list[int]]:
+  output_queue = queue.Queue()
+  encoder = EdgeVideoEncoder(device_name='camera',
+                             width=WIDTH,
+                             height=HEIGHT,
+                             fps=30,
+                             input_pix_fmt='bgr24',
+                             encoding='jpeg',
+                             output_queue=output_queue,
+                             max_queue_len=1,
+                             backlog_policy=backlog_policy)
+  rng = np.random.default_rng(0)
+  is_accepted = [encoder.put(rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8).tobytes(), i) for i in range(num_frames)]
+  encoder.close()
+  frame_indices = []
+  while not output_queue.empty():
+    frame_indices.append(output_queue.get()[3])
+  return encoder, is_accepted, frame_indices
+
+
+def test_block_policy_encodes_every_frame():
+  encoder, is_accepted, frame_indices = encode_frames('block', 100)
+  assert all(is_accepted)
+  assert frame_indices == list(range(100))
+  assert encoder.get_num_frames_dropped() == 0
+
+
+def test_drop_policy_reports_dropped_frames():
+  encoder, is_accepted, frame_indices = encode_frames('drop', 500)
+  assert frame_indices == [i for (i, is_frame_accepted) in enumerate(is_accepted) if is_frame_accepted]
+  assert encoder.get_num_frames_dropped() == is_accepted.count(False)
+
+
+def test_unknown_policy():
+  with pytest.raises(ValueError):
+    encode_frames('skip', 1)
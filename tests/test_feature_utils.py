@@ -0,0 +1,108 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import numpy as np
+import pytest
+from utils.feature_utils import FEATURES, SlidingWindowFeatures
+
+
+BANDS_HZ = ((0.0, 5.0), (5.0, 20.0), (20.0, 150.0), (0.0, 1000.0))
+
+
+# Reference of the features, computed directly on one (window_len, num_channels) window.
+def compute_window_features(window: np.ndarray, fs: float, bands_hz: tuple[tuple[float, float], ...]) -> dict[str, np.ndarray]:
+  diff = np.diff(window, axis=0)
+  freqs = np.fft.rfftfreq(len(window), d=1.0/fs)
+  power = np.abs(np.fft.rfft(window, axis=0))**2 / len(window)**2
+  # One-sided: all the bins but DC (and Nyquist, for even lengths) stand for their negative frequency too.
+  power[1:(len(window)+1)//2] *= 2
+  return {
+    'rms': np.sqrt(np.mean(window**2, axis=0)),
+    'mav': np.mean(np.abs(window), axis=0),
+    'wl': np.sum(np.abs(diff), axis=0),
+    'zc': np.sum(window[1:] * window[:-1] < 0, axis=0),
+    'band_power': np.stack([power[(freqs >= low_hz) & (freqs <= high_hz)].sum(axis=0) for low_hz, high_hz in bands_hz]),
+    'jerk': np.sqrt(np.mean((diff*fs)**2, axis=0)),
+  }
+
+
+# Push the signal in blocks of random lengths, like messages of varying size, and collect all the windows' features.
+def push_in_random_blocks(extractor: SlidingWindowFeatures, x: np.ndarray, max_block_len: int, seed: int = 0) -> list[dict[str, np.ndarray]]:
+  rng = np.random.default_rng(seed)
+  outputs = []
+  i = 0
+  while i < len(x):
+    block_len = int(rng.integers(1, max_block_len + 1))
+    outputs.extend(extractor.push(x[i:i+block_len]))
+    i += block_len
+  return outputs
+
+
+@pytest.mark.parametrize('window_len, hop, fs', [(40, 10, 100.0), (50, 50, 100.0), (33, 7, 60.0), (400, 100, 2000.0), (64, 80, 200.0)])
+def test_incremental_features_match_each_window(window_len, hop, fs):
+  rng = np.random.default_rng(1)
+  num_channels = 3
+  # Long enough for many resyncs, with an offset and a tone so the features are not all of Gaussian noise.
+  num_samples = 20*window_len + 13
+  t = np.arange(num_samples) / fs
+  x = rng.standard_normal((num_samples, num_channels)) + 0.5 + np.sin(2*np.pi*12*t)[:, None]
+  extractor = SlidingWindowFeatures(num_channels=num_channels, window_len=window_len, hop=hop, fs=fs, features=FEATURES, bands_hz=BANDS_HZ)
+  outputs = push_in_random_blocks(extractor, x, max_block_len=2*hop)
+
+  # Windows end every hop samples, once the first window is full.
+  ends = [end for end in range(hop, num_samples+1, hop) if end >= window_len]
+  assert len(outputs) == len(ends)
+  for end, output in zip(ends, outputs):
+    reference = compute_window_features(x[end-window_len:end], fs, BANDS_HZ)
+    assert set(output.keys()) == set(FEATURES)
+    np.testing.assert_array_equal(output['zc'], reference['zc'])
+    for name in ('rms', 'mav', 'wl', 'band_power', 'jerk'):
+      np.testing.assert_allclose(output[name], reference[name], rtol=1e-9, atol=1e-9*np.abs(reference[name]).max(), err_msg=name)
+
+
+def test_only_selected_features_are_computed():
+  extractor = SlidingWindowFeatures(num_channels=2, window_len=10, hop=5, fs=100.0, features=('rms', 'zc'))
+  outputs = extractor.push(np.random.default_rng(0).standard_normal((30, 2)))
+  assert len(outputs) == 5
+  assert all(set(output.keys()) == {'rms', 'zc'} for output in outputs)
+
+
+def test_reset_starts_over():
+  x = np.random.default_rng(0).standard_normal((200, 2))
+  extractor = SlidingWindowFeatures(num_channels=2, window_len=20, hop=5, fs=100.0, bands_hz=BANDS_HZ)
+  first = extractor.push(x)
+  extractor.reset()
+  second = extractor.push(x)
+  assert len(first) == len(second)
+  for (a, b) in zip(first, second):
+    for name in FEATURES:
+      np.testing.assert_allclose(a[name], b[name], rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('kwargs', [{'window_len': 1}, {'features': ('rms', 'entropy')}, {'features': ('band_power',)}])
+def test_invalid_configurations_are_rejected(kwargs):
+  with pytest.raises(ValueError):
+    SlidingWindowFeatures(**{'num_channels': 2, 'window_len': 20, 'hop': 5, 'fs': 100.0, **kwargs})
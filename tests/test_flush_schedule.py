@@ -0,0 +1,121 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+
+import pytest
+from benchmarks.common import SyntheticStream, fill_stream
+from handlers import LoggingHandler
+from handlers.LoggingHandler import Logger
+
+
+KEY_BIG = ('synthetic', 'camera', 'data')
+KEY_SMALL = ('synthetic', 'imu', 'data')
+
+
+# Logger over a 1 KB/sample stream and a 12 B/sample stream, with the schedule driven by a fake clock.
+#   No files are opened, only the schedule is run.
+@pytest.fixture
+def scheduler(monkeypatch, tmp_path):
+  clock = {'time_s': 0.0}
+  monkeypatch.setattr(LoggingHandler, 'get_time', lambda: clock['time_s'])
+  streams = OrderedDict([('synthetic', SyntheticStream([{'device_name': 'camera', 'stream_name': 'data', 'data_type': 'uint8', 'sample_size': (1024,), 'sampling_rate_hz': 30},
+                                                        {'device_name': 'imu', 'stream_name': 'data', 'data_type': 'float32', 'sample_size': (3,), 'sampling_rate_hz': 100}]))])
+  def create_logger(**logging_spec) -> Logger:
+    logger = Logger(log_tag='test', log_dir=str(tmp_path), log_time_s=0.0, experiment={}, stream_hdf5=True, **logging_spec)
+    logger._initialize(streams)
+    logger._is_flush = False
+    logger._init_log_indices()
+    return logger
+  def advance(logger: Logger, period_s: float, num_samples: int = 0) -> set:
+    clock['time_s'] += period_s
+    fill_stream(streams['synthetic'], num_samples)
+    logger._schedule_flush()
+    # Clear what would have been written, to keep the backlogs under control of the test.
+    for key in logger._due_streams:
+      streams['synthetic'].clear_data(*key[1:])
+    return logger._due_streams
+  return create_logger, advance
+
+
+def test_fixed_period_writes_all_streams(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=False)
+  assert advance(logger, 0.1) == set(logger._flush_states.keys())
+
+
+def test_not_due_before_min_period(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=True, stream_period_min_s=1.0, stream_period_max_s=10.0, stream_flush_bytes=10*1024)
+  assert advance(logger, 0.5, num_samples=100) == set()
+
+
+def test_due_on_backlog_bytes(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=True, stream_period_min_s=1.0, stream_period_max_s=10.0, stream_flush_bytes=10*1024)
+  # 20 samples: 20 KB of the big stream, 240 B of the small one.
+  due_streams = advance(logger, 1.0, num_samples=20)
+  assert KEY_BIG in due_streams
+  assert KEY_SMALL not in due_streams
+  # Below the threshold after the write.
+  assert KEY_BIG not in advance(logger, 1.0, num_samples=5)
+
+
+def test_due_on_backlog_samples(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=True, stream_period_min_s=1.0, stream_period_max_s=10.0,
+                         stream_flush_bytes=1024**3, stream_flush_samples=50)
+  assert advance(logger, 1.0, num_samples=49) == set()
+  assert KEY_SMALL in advance(logger, 1.0, num_samples=1)
+
+
+def test_due_on_max_period(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=True, stream_period_min_s=1.0, stream_period_max_s=10.0, stream_flush_bytes=1024**3)
+  assert advance(logger, 9.0, num_samples=1) == set()
+  assert advance(logger, 1.0) == set(logger._flush_states.keys())
+  # The period restarts from the last write of each stream.
+  assert advance(logger, 5.0) == set()
+
+
+def test_flush_writes_all_streams(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=True, stream_period_min_s=1.0, stream_period_max_s=10.0)
+  logger._is_flush = True
+  assert advance(logger, 0.0) == set(logger._flush_states.keys())
+
+
+def test_flush_stats(scheduler):
+  create_logger, advance = scheduler
+  logger = create_logger(is_adaptive_flush=True, stream_period_min_s=1.0, stream_period_max_s=10.0, stream_flush_bytes=10*1024)
+  advance(logger, 2.0, num_samples=20)
+  advance(logger, 3.0, num_samples=30)
+  flush_stats = logger.get_flush_stats()['/'.join(KEY_BIG)]
+  assert flush_stats['num_flushes'] == 2
+  assert flush_stats['write_samples_mean'] == 25
+  assert flush_stats['write_bytes_mean'] == 25*1024
+  assert flush_stats['write_period_mean_s'] == 2.5
@@ -0,0 +1,88 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import asyncio
+from collections import OrderedDict
+import os
+
+import h5py
+import numpy as np
+import pytest
+from benchmarks.common import SyntheticStream, fill_stream
+from handlers.HDF5ShardHandler import HDF5Shard, HDF5ShardError
+from handlers.LoggingHandler import Logger
+
+
+DATASET_SPECS = [('imu/imu-0/data', {'shape': (10, 3), 'maxshape': (None, 3), 'dtype': 'float32'})]
+
+
+def test_shard_writes_and_trims(tmp_path):
+  hdf5_shard = HDF5Shard(os.path.join(tmp_path, 'shard.hdf5'), DATASET_SPECS, max_queue_len=1)
+  arr = np.arange(75, dtype='float32').reshape(-1, 3)
+  for block in np.array_split(arr, 5):
+    hdf5_shard.write('imu/imu-0/data', block)
+  hdf5_shard.close()
+  with h5py.File(hdf5_shard.filepath, 'r') as hdf5_file:
+    np.testing.assert_array_equal(hdf5_file['imu/imu-0/data'][:], arr)
+
+
+# A write the shard process can't execute kills it, the Logger side then raises with its error instead of blocking.
+def test_crashed_shard_raises_its_error(tmp_path):
+  hdf5_shard = HDF5Shard(os.path.join(tmp_path, 'shard.hdf5'), DATASET_SPECS, max_queue_len=1, poll_period_s=0.1)
+  hdf5_shard.write('imu/imu-0/data', np.zeros((5, 4), dtype='float32'))
+  with pytest.raises(HDF5ShardError, match='TypeError'):
+    for _ in range(100):
+      hdf5_shard.write('imu/imu-0/data', np.zeros((5, 3), dtype='float32'))
+  with pytest.raises(HDF5ShardError, match='TypeError'):
+    hdf5_shard.close()
+
+
+def test_logger_keeps_other_shards_after_a_crash(tmp_path):
+  streams = OrderedDict([(streamer_name, SyntheticStream([{'device_name': '%s-0' % streamer_name,
+                                                           'stream_name': 'data',
+                                                           'data_type': 'float32',
+                                                           'sample_size': (3,),
+                                                           'sampling_rate_hz': 100}]))
+                         for streamer_name in ('imu', 'emg')])
+  logger = Logger(log_tag='test', log_dir=str(tmp_path), log_time_s=0.0, experiment={}, stream_hdf5=True, hdf5_sharded=True)
+  logger._initialize(streams)
+  logger._start_stream_logging()
+  logger._hdf5_shards['imu']._process.kill()
+  logger._hdf5_shards['imu']._process.join()
+  for stream in streams.values():
+    fill_stream(stream, 100)
+  logger._schedule_flush()
+  asyncio.run(logger._write_files())
+  logger._stop_stream_logging()
+  logger._close_files()
+  logger._release_thread_pool()
+  assert list(logger.get_hdf5_shard_errors().keys()) == ['imu']
+  # The Streams of the failed shard are still drained.
+  assert streams['imu'].get_num_available('imu-0', 'data') == 0
+  with h5py.File(os.path.join(tmp_path, 'test.hdf5'), 'r') as hdf5_file:
+    assert 'imu' not in hdf5_file
+    assert hdf5_file['emg/emg-0/data'].shape == (100, 3)
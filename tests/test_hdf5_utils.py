@@ -0,0 +1,49 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import os
+
+import h5py
+import numpy as np
+from utils.hdf5_utils import get_hdf5_compression_kwargs, get_hdf5_storage_policy
+
+
+def test_default_policy_is_uncompressed():
+  storage_policy = get_hdf5_storage_policy(sampling_rate_hz=100, sample_size=(3,), data_type='float32', stream_period_s=1.0)
+  assert set(storage_policy.keys()) == {'chunks'}
+
+
+def test_auto_compression_is_readable_without_plugins(tmp_path):
+  compression_kwargs = get_hdf5_compression_kwargs('auto')
+  assert compression_kwargs['compression'] == 'gzip'
+  filepath = os.path.join(tmp_path, 'auto.hdf5')
+  arr = np.arange(3000, dtype='float32').reshape(-1, 3)
+  with h5py.File(filepath, 'w') as hdf5_file:
+    hdf5_file.create_dataset('data', data=arr, chunks=(100, 3), **compression_kwargs)
+  with h5py.File(filepath, 'r') as hdf5_file:
+    assert hdf5_file['data'].compression == 'gzip'
+    np.testing.assert_array_equal(hdf5_file['data'][:], arr)
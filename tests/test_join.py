@@ -0,0 +1,137 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import numpy as np
+from utils.datastructures.join import StreamJoiner, TimeSeriesRing
+
+
+# All the windows ready so far, concatenated: (times, {stream key: values}).
+def pop_all(joiner: StreamJoiner) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+  windows = joiner.pop_windows()
+  return (np.concatenate([times for (times, _) in windows]),
+          {key: np.concatenate([values[key] for (_, values) in windows]) for key in windows[0][1].keys()})
+
+
+def test_ring_keeps_newest_samples_in_order():
+  ring = TimeSeriesRing(capacity=4)
+  for i in range(10):
+    ring.append(np.array([i], dtype=float), np.array([10*i], dtype=float))
+  assert 4 <= len(ring) <= 8
+  np.testing.assert_array_equal(ring.times, np.arange(10-len(ring), 10))
+  np.testing.assert_array_equal(ring.values, 10*ring.times)
+
+
+def test_ring_merges_out_of_order_samples():
+  ring = TimeSeriesRing(capacity=8)
+  ring.append(np.array([0., 1., 2., 3.]), np.array([0., 10., 20., 30.]))
+  ring.append(np.array([1.5, 4.]), np.array([15., 40.]))
+  np.testing.assert_array_equal(ring.times, [0, 1, 1.5, 2, 3, 4])
+  np.testing.assert_array_equal(ring.values, [0, 10, 15, 20, 30, 40])
+
+
+def test_nearest_interpolation():
+  joiner = StreamJoiner({'a': {'interpolation': 'nearest'}}, rate_hz=10, start_time_s=0.0)
+  times = np.arange(0, 2, 0.03)
+  joiner.push('a', times, times)
+  ticks, values = pop_all(joiner)
+  np.testing.assert_allclose(ticks, 0.1*np.arange(len(ticks)))
+  nearest = times[np.abs(times[None, :] - ticks[:, None]).argmin(axis=1)]
+  np.testing.assert_allclose(values['a'], nearest)
+
+
+def test_linear_interpolation():
+  joiner = StreamJoiner({'a': {'interpolation': 'linear', 'sample_shape': (2,)}}, rate_hz=60, start_time_s=0.005)
+  times = np.arange(0, 2, 0.01)
+  joiner.push('a', times, np.stack((2*times + 1, -times), axis=1))
+  ticks, values = pop_all(joiner)
+  assert len(ticks) > 100
+  np.testing.assert_allclose(values['a'], np.stack((2*ticks + 1, -ticks), axis=1), atol=1e-12)
+
+
+# Nearest needs one sample within the tolerance, linear needs one on each side of the tick.
+def test_ticks_outside_tolerance_are_nan():
+  for (interpolation, gap_margin_s) in [('nearest', 0.02), ('linear', 0.0)]:
+    joiner = StreamJoiner({'a': {'interpolation': interpolation, 'tolerance_s': 0.02}}, rate_hz=100, start_time_s=0.0)
+    times = np.concatenate((np.arange(0, 100), np.arange(150, 200))) / 100
+    joiner.push('a', times, np.ones(len(times)))
+    ticks, values = pop_all(joiner)
+    is_in_gap = (ticks > 0.99 + gap_margin_s + 1e-6) & (ticks < 1.5 - gap_margin_s - 1e-6)
+    assert is_in_gap.sum() > 10
+    assert np.isnan(values['a'][is_in_gap]).all()
+    assert not np.isnan(values['a'][~is_in_gap]).any()
+
+
+# Samples and ticks on the same grid, computed differently, still match with zero tolerance.
+def test_ticks_on_samples_survive_rounding():
+  for interpolation in ['nearest', 'linear']:
+    joiner = StreamJoiner({'a': {'interpolation': interpolation, 'tolerance_s': 0.0}}, rate_hz=60, start_time_s=0.0)
+    times = np.arange(6000) / 60
+    values = []
+    for i in range(0, 6000, 100):
+      joiner.push('a', times[i:i+100], np.arange(i, i+100, dtype=float))
+      values.append(pop_all(joiner)[1]['a'])
+    np.testing.assert_array_equal(np.concatenate(values), np.arange(6000))
+
+
+def test_lagging_stream_is_joined_at_the_watermark_and_late_samples_dropped():
+  joiner = StreamJoiner({'fast': {}, 'slow': {'tolerance_s': 0.05}}, rate_hz=10, max_lateness_s=0.5, start_time_s=0.0)
+  fast_times = np.arange(0, 2.01, 0.1)
+  joiner.push('fast', fast_times, fast_times)
+  # Nothing from the slow stream yet: ticks wait for it until the watermark, 0.5 s behind the fast stream.
+  ticks, values = pop_all(joiner)
+  np.testing.assert_allclose(ticks[-1], 1.5)
+  assert np.isnan(values['slow']).all()
+  assert joiner.get_num_late() == {'fast': 0, 'slow': 0}
+  # Only the samples older than the last emitted tick minus the tolerance are late.
+  joiner.push('slow', np.array([1.3, 1.44, 1.46, 1.6]), np.array([1.3, 1.44, 1.46, 1.6]))
+  assert joiner.get_num_late() == {'fast': 0, 'slow': 2}
+  ticks, values = pop_all(joiner)
+  np.testing.assert_allclose(ticks, [1.6])
+  np.testing.assert_allclose(values['slow'], [1.6])
+
+
+def test_out_of_order_samples_are_used():
+  joiner = StreamJoiner({'a': {}, 'b': {'tolerance_s': 0.01}}, rate_hz=10, start_time_s=0.0)
+  joiner.push('a', np.array([0., 0.1, 0.2, 0.3]), np.zeros(4))
+  joiner.push('b', np.array([0., 0.3]), np.array([0., 3.]))
+  joiner.push('b', np.array([0.1, 0.2]), np.array([1., 2.]))
+  ticks, values = pop_all(joiner)
+  np.testing.assert_allclose(ticks, [0., 0.1, 0.2, 0.3])
+  np.testing.assert_allclose(values['b'], [0., 1., 2., 3.])
+  assert joiner.get_num_late() == {'a': 0, 'b': 0}
+
+
+def test_windows_and_hops():
+  joiner = StreamJoiner({'a': {}}, rate_hz=10, window_len=4, hop=2, start_time_s=0.0)
+  windows = []
+  for i in range(20):
+    joiner.push('a', np.array([0.1*i]), np.array([float(i)]))
+    windows += joiner.pop_windows()
+  # The first window is complete at the 4th tick, then one every 2 ticks.
+  assert len(windows) == 9
+  for (j, (times, values)) in enumerate(windows):
+    np.testing.assert_allclose(times, 0.1*np.arange(2*j, 2*j+4))
+    np.testing.assert_array_equal(values['a'], np.arange(2*j, 2*j+4))
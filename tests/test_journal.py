@@ -0,0 +1,122 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+
+import h5py
+import numpy as np
+from benchmarks.common import SyntheticStream
+from handlers.JournalHandler import JOURNAL_RECORD_HEADER, JournalWriter, get_journal_filepath, load_journal_index, read_journal
+from handlers.LoggingHandler import JournalLoggerHandle, ThreadLoggerHandle, convert_journal
+from utils.msgpack_utils import serialize
+
+
+STREAM_FACTORIES = [('left', SyntheticStream, {'stream_specs': [{'device_name': 'sensor', 'stream_name': 'data', 'data_type': 'float32',
+                                                                 'sample_size': (4,), 'sampling_rate_hz': 100}]}),
+                    ('right', SyntheticStream, {'stream_specs': [{'device_name': 'sensor', 'stream_name': 'data', 'data_type': 'int32',
+                                                                  'sample_size': (2,), 'sampling_rate_hz': 50}]})]
+
+
+def get_messages(num_messages: int) -> list[tuple[str, bytes]]:
+  rng = np.random.default_rng(0)
+  messages = []
+  for i in range(num_messages):
+    messages.append(('left', serialize(process_time_s=float(i), data={'sensor': {'data': rng.standard_normal(4).astype('float32').tolist()}})))
+    if i % 2:
+      messages.append(('right', serialize(process_time_s=float(i), data={'sensor': {'data': rng.integers(0, 100, 2).tolist()}})))
+  return messages
+
+
+# Append the start of a record, as left behind by a crash in the middle of a write.
+def append_truncated_record(filepath: str, topic: str, payload: bytes) -> None:
+  topic_bytes = topic.encode('utf-8')
+  with open(filepath, 'ab') as f:
+    f.write(JOURNAL_RECORD_HEADER.pack(1e9, len(topic_bytes), len(payload)) + topic_bytes + payload[:len(payload)//2])
+
+
+def read_datasets(filepath: str) -> dict[str, np.ndarray]:
+  datasets = {}
+  with h5py.File(filepath, 'r') as hdf5_file:
+    hdf5_file.visititems(lambda name, obj: datasets.update({name: obj[:]}) if isinstance(obj, h5py.Dataset) else None)
+  return datasets
+
+
+# The journal of a session, rolled over into several files and cut off in the middle of the last record,
+#   converts into the same HDF5 data as the Logger writes directly.
+def test_convert_journal_matches_logger(tmp_path):
+  messages = get_messages(300)
+  logging_spec = {'log_time_s': 0.0, 'experiment': {}, 'stream_hdf5': True}
+  direct_handle = ThreadLoggerHandle(log_tag='test',
+                                     streams=OrderedDict([(stream_key, class_type.create_stream(stream_info))
+                                                          for (stream_key, class_type, stream_info) in STREAM_FACTORIES]),
+                                     logging_spec={**logging_spec, 'log_dir': str(tmp_path / 'direct')})
+  # Flushed by the test only, in a few writes that each overflow the file size.
+  journal_handle = JournalLoggerHandle(log_tag='test',
+                                       stream_factories=STREAM_FACTORIES,
+                                       logging_spec={**logging_spec, 'log_dir': str(tmp_path / 'journal'), 'is_journal': True,
+                                                     'journal_flush_period_s': 3600.0, 'journal_file_size_gb': 4096/1024**3})
+  for (i, (stream_key, payload)) in enumerate(messages):
+    direct_handle.log(stream_key, payload)
+    journal_handle.log(stream_key, payload)
+    if i % 100 == 99:
+      journal_handle._journal._write_buffer()
+  for logger_handle in (direct_handle, journal_handle):
+    logger_handle.cleanup()
+    logger_handle.join()
+  num_files = len(set(file_index for (_, file_index, _) in load_journal_index(str(tmp_path / 'journal'), 'test')))
+  assert num_files > 1
+  append_truncated_record(get_journal_filepath(str(tmp_path / 'journal'), 'test', num_files-1), *messages[0])
+
+  convert_journal(str(tmp_path / 'journal'), 'test', num_workers=1)
+  expected = read_datasets(str(tmp_path / 'direct' / 'test.hdf5'))
+  converted = read_datasets(str(tmp_path / 'journal' / 'test.hdf5'))
+  assert converted.keys() == expected.keys()
+  for (name, data) in expected.items():
+    np.testing.assert_array_equal(converted[name], data)
+
+
+# Reading from a time in the middle of the session seeks through the index into a later file,
+#   and yields exactly the records received from then on.
+def test_read_journal_from_start_time(tmp_path):
+  journal = JournalWriter(log_dir=str(tmp_path), log_tag='test', journal_spec={}, flush_period_s=3600.0, max_file_size_bytes=1000)
+  records = [('left' if i % 3 else 'right', i*0.01, b'%04d' % i * (1 + i % 5)) for i in range(200)]
+  for (i, (topic, toa_s, payload)) in enumerate(records):
+    journal.append(topic, payload, toa_s)
+    if i % 10 == 9:
+      journal._write_buffer()
+  journal.close()
+  append_truncated_record(get_journal_filepath(str(tmp_path), 'test', load_journal_index(str(tmp_path), 'test')[-1][1]), 'left', b'x'*100)
+
+  assert list(read_journal(str(tmp_path), 'test')) == records
+  start_time_s = 1.234
+  assert list(read_journal(str(tmp_path), 'test', start_time_s=start_time_s)) == [record for record in records if record[1] >= start_time_s]
+  assert list(read_journal(str(tmp_path), 'test', start_time_s=start_time_s, topics={'right'})) == \
+    [record for record in records if record[1] >= start_time_s and record[0] == 'right']
+  # The seek starts past the first file.
+  index = load_journal_index(str(tmp_path), 'test')
+  assert [file_index for (time_s, file_index, _) in index if time_s <= start_time_s][-1] > 0
@@ -0,0 +1,55 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+
+import numpy as np
+from benchmarks.common import SyntheticStream, run_logger
+
+
+def test_csv_values(tmp_path):
+  stream = SyntheticStream([{'device_name': 'sensor', 'stream_name': 'flags', 'data_type': 'bool', 'sample_size': (2,), 'sampling_rate_hz': 100},
+                            {'device_name': 'sensor', 'stream_name': 'counts', 'data_type': 'int64', 'sample_size': (1,), 'sampling_rate_hz': 100},
+                            {'device_name': 'sensor', 'stream_name': 'values', 'data_type': 'float32', 'sample_size': (3,), 'sampling_rate_hz': 100}])
+  num_samples = 200
+  rng = np.random.default_rng(0)
+  flags = rng.random((num_samples, 2)) > 0.5
+  values = rng.standard_normal((num_samples, 3)).astype('float32')
+  for i in range(num_samples):
+    stream.append_data(process_time_s=float(i), data={'sensor': {'flags': flags[i], 'counts': i, 'values': values[i]}})
+  run_logger(OrderedDict([('synthetic', stream)]), str(tmp_path), stream_csv=True)
+
+  with open(os.path.join(tmp_path, 'bench_sensor_flags.csv')) as f:
+    lines = f.read().split('\n')
+  assert lines[0] == ',Data Entry 0,Data Entry 1'
+  assert lines[1:] == ['%s,%s' % tuple(row) for row in flags.tolist()]
+  counts = np.loadtxt(os.path.join(tmp_path, 'bench_sensor_counts.csv'), delimiter=',', skiprows=1, dtype='int64')
+  np.testing.assert_array_equal(counts, np.arange(num_samples))
+  # Floats are written with enough digits to read back the exact float32 value.
+  read_values = np.loadtxt(os.path.join(tmp_path, 'bench_sensor_values.csv'), delimiter=',', skiprows=1, dtype='float32')
+  np.testing.assert_array_equal(read_values, values)
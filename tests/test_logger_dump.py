@@ -0,0 +1,61 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+import threading
+
+import h5py
+import numpy as np
+from benchmarks.common import SyntheticStream, run_logger
+
+
+def create_camera_stream(num_frames: int) -> SyntheticStream:
+  stream = SyntheticStream([{'device_name': 'camera', 'stream_name': 'frame', 'data_type': 'uint8', 'sample_size': (48, 64, 3),
+                             'sampling_rate_hz': 30, 'is_video': True, 'color_format': 'bgr'},
+                            {'device_name': 'camera', 'stream_name': 'frame_index', 'data_type': 'uint64', 'sample_size': (1,),
+                             'sampling_rate_hz': 30}])
+  for i in range(num_frames):
+    stream.append_data(process_time_s=float(i), data={'camera': {'frame': (bytes(48*64*3), True, i), 'frame_index': i}})
+  return stream
+
+
+# The video frames have no enabled writer, the dump must still finish once all the HDF5 data is written.
+def test_dump_hdf5_only_with_video_streams(tmp_path):
+  stream = create_camera_stream(200)
+  logger_thread = threading.Thread(target=run_logger,
+                                   args=(OrderedDict([('cameras', stream)]), str(tmp_path)),
+                                   kwargs={'dump_hdf5': True, 'dump_chunk_bytes': 256})
+  logger_thread.start()
+  logger_thread.join(timeout=60)
+  assert not logger_thread.is_alive(), 'dump did not finish'
+  with h5py.File(os.path.join(tmp_path, 'bench.hdf5'), 'r') as hdf5_file:
+    assert 'frame' not in hdf5_file['cameras/camera']
+    np.testing.assert_array_equal(hdf5_file['cameras/camera/frame_index'][:, 0], np.arange(200))
+    np.testing.assert_array_equal(hdf5_file['cameras/camera/process_time_s'][:, 0], np.arange(200))
+  # The frames were never written, so never popped either.
+  assert stream.get_num_available('camera', 'frame') == 200
@@ -0,0 +1,72 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+
+import h5py
+import numpy as np
+import zmq
+from benchmarks.common import SyntheticStream
+from handlers.LoggingHandler import ProcessLoggerHandle, ThreadLoggerHandle
+from utils.msgpack_utils import serialize
+
+
+STREAM_INFO = {'stream_specs': [{'device_name': 'sensor', 'stream_name': 'data', 'data_type': 'float32', 'sample_size': (4,), 'sampling_rate_hz': 100}]}
+
+
+def log_messages(logger_handle, num_messages: int) -> np.ndarray:
+  values = np.arange(num_messages*4, dtype='float32').reshape(num_messages, 4)
+  for i in range(num_messages):
+    logger_handle.log('synthetic', serialize(process_time_s=float(i), data={'sensor': {'data': values[i].tolist()}}))
+  logger_handle.cleanup()
+  logger_handle.join()
+  return values
+
+
+def test_thread_handle_exposes_hdf5_filepath(tmp_path):
+  logger_handle = ThreadLoggerHandle(log_tag='test',
+                                     streams=OrderedDict([('synthetic', SyntheticStream.create_stream(STREAM_INFO))]),
+                                     logging_spec={'log_dir': str(tmp_path), 'log_time_s': 0.0, 'experiment': {}, 'stream_hdf5': True})
+  values = log_messages(logger_handle, 100)
+  assert logger_handle.get_hdf5_filepath() == os.path.join(tmp_path, 'test.hdf5')
+  with h5py.File(logger_handle.get_hdf5_filepath(), 'r') as hdf5_file:
+    np.testing.assert_array_equal(hdf5_file['synthetic/sensor/data'][:], values)
+
+
+# The Logger process is spawned after the ZeroMQ context of the Node exists.
+def test_process_handle_writes_all_messages(tmp_path):
+  ctx = zmq.Context()
+  logger_handle = ProcessLoggerHandle(log_tag='test',
+                                      stream_factories=[('synthetic', SyntheticStream, STREAM_INFO)],
+                                      logging_spec={'log_dir': str(tmp_path), 'log_time_s': 0.0, 'experiment': {}, 'stream_hdf5': True},
+                                      ctx=ctx)
+  values = log_messages(logger_handle, 1000)
+  ctx.term()
+  assert logger_handle._logger_process.exitcode == 0
+  with h5py.File(os.path.join(tmp_path, 'test.hdf5'), 'r') as hdf5_file:
+    np.testing.assert_array_equal(hdf5_file['synthetic/sensor/data'][:], values)
@@ -0,0 +1,144 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+import subprocess
+import sys
+
+import h5py
+import numpy as np
+from benchmarks.common import SyntheticStream, fill_stream
+from handlers.LoggingHandler import Logger
+from utils.hdf5_utils import HDF5_VALID_LENGTH_INDEX_KEY, HDF5_VALID_LENGTHS_PATH
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_imu_streams() -> OrderedDict:
+  return OrderedDict([('imu', SyntheticStream([{'device_name': 'imu-0',
+                                                'stream_name': 'acceleration',
+                                                'data_type': 'float32',
+                                                'sample_size': (3,),
+                                                'sampling_rate_hz': 100}]))])
+
+
+# Valid length of a dataset as seen by a SWMR reader in another process, while the Logger still writes the file.
+def read_valid_length_swmr(filepath: str, dataset_path: str) -> int:
+  code = ("from utils.hdf5_utils import open_hdf5_swmr_reader, get_hdf5_valid_length\n"
+          "with open_hdf5_swmr_reader(%r) as f: print(get_hdf5_valid_length(f[%r]))" % (filepath, dataset_path))
+  return int(subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, check=True, text=True).stdout)
+
+
+def test_swmr_reader_sees_valid_length(tmp_path):
+  streams = create_imu_streams()
+  logger = Logger(log_tag='test', log_dir=str(tmp_path), log_time_s=0.0, experiment={}, stream_hdf5=True, hdf5_swmr=True)
+  logger._initialize(streams)
+  logger._start_stream_logging()
+  num_samples_total = 0
+  for num_samples in (100, 150):
+    fill_stream(streams['imu'], num_samples)
+    logger._schedule_flush()
+    logger._write_hdf5()
+    num_samples_total += num_samples
+    assert read_valid_length_swmr(logger._hdf5_filepath, 'imu/imu-0/acceleration') == num_samples_total
+  logger._stop_stream_logging()
+  logger._close_files()
+  with h5py.File(logger._hdf5_filepath, 'r') as hdf5_file:
+    assert hdf5_file['imu/imu-0/acceleration'].shape == (250, 3)
+    assert hdf5_file['imu/imu-0/process_time_s'].shape == (250, 1)
+    assert np.all(np.diff(hdf5_file['imu/imu-0/process_time_s'][:, 0]) >= 0)
+    assert 'Logger I/O statistics' in hdf5_file.attrs
+    # The datasets are trimmed to their valid length, which is no longer published separately.
+    assert HDF5_VALID_LENGTHS_PATH not in hdf5_file
+    assert HDF5_VALID_LENGTH_INDEX_KEY not in hdf5_file['imu/imu-0/acceleration'].attrs
+
+
+# Non-SWMR bulk writes of `Logger._sync_write_hdf5`, of Streams receiving a mix of single samples and batches,
+#   in a small initial dataset, so that the blocks also grow it.
+def test_bulk_write_mixed_batches(tmp_path):
+  streams = OrderedDict([('imu', SyntheticStream([{'device_name': 'imu-0', 'stream_name': 'acceleration',
+                                                   'data_type': 'float32', 'sample_size': (3,), 'sampling_rate_hz': 100},
+                                                  {'device_name': 'imu-0', 'stream_name': 'label',
+                                                   'data_type': 'S8', 'sample_size': (1,), 'sampling_rate_hz': 100}]))])
+  logger = Logger(log_tag='test', log_dir=str(tmp_path), log_time_s=0.0, experiment={}, stream_hdf5=True)
+  logger._initialize(streams)
+  logger._hdf5_log_length_increment = 4
+  logger._start_stream_logging()
+  rng = np.random.default_rng(0)
+  acceleration = []
+  labels = []
+  for (num_flush, batch_sizes) in enumerate([(None, 3, None), (5, None, 2, None), (None,)]):
+    for batch_size in batch_sizes:
+      if batch_size is None:
+        sample = rng.standard_normal(3).astype(np.float32)
+        label = 'walk'
+        acceleration.append(sample[None])
+        labels.append(b'walk')
+      else:
+        sample = rng.standard_normal((batch_size, 3)).astype(np.float32)
+        label = [b'turn-%d' % i for i in range(batch_size)]
+        acceleration.append(sample)
+        labels.extend(label)
+      streams['imu'].append_data(process_time_s=float(num_flush), data={'imu-0': {'acceleration': sample, 'label': label}})
+    logger._schedule_flush()
+    logger._write_hdf5()
+  logger._stop_stream_logging()
+  logger._close_files()
+  acceleration = np.concatenate(acceleration)
+  with h5py.File(logger._hdf5_filepath, 'r') as hdf5_file:
+    np.testing.assert_array_equal(hdf5_file['imu/imu-0/acceleration'][:], acceleration)
+    assert hdf5_file['imu/imu-0/label'].dtype == np.dtype('S8')
+    assert hdf5_file['imu/imu-0/label'][:, 0].tolist() == labels
+    assert hdf5_file['imu/imu-0/process_time_s'][:, 0].tolist() == [0.0]*3 + [1.0]*4 + [2.0]
+
+
+# Rotation of SWMR segments, read back as one continuous recording through the VDS master file.
+def test_segments_vds_master(tmp_path):
+  streams = create_imu_streams()
+  logger = Logger(log_tag='test', log_dir=str(tmp_path), log_time_s=0.0, experiment={},
+                  stream_hdf5=True, hdf5_swmr=True, segment_duration_s=3600.0, hdf5_segment_vds=True)
+  logger._initialize(streams)
+  logger._start_stream_logging()
+  expected = []
+  for (segment_index, num_samples) in enumerate((100, 150, 70)):
+    if segment_index:
+      logger._rotate_segments()
+    fill_stream(streams['imu'], num_samples, seed=segment_index)
+    expected.extend(list(streams['imu']._data['imu-0']['acceleration']))
+    logger._schedule_flush()
+    logger._write_hdf5()
+  logger._stop_stream_logging()
+  logger._close_files()
+  filepaths = sorted(os.listdir(tmp_path))
+  assert filepaths == ['test__segments.csv', 'test_master.hdf5', 'test_seg000.hdf5', 'test_seg001.hdf5', 'test_seg002.hdf5']
+  with h5py.File(tmp_path / 'test_master.hdf5', 'r') as hdf5_file:
+    np.testing.assert_array_equal(hdf5_file['imu/imu-0/acceleration'][:], np.stack(expected))
+    assert hdf5_file['imu/imu-0/process_time_s'].shape == (320, 1)
+    assert np.all(np.diff(hdf5_file['imu/imu-0/process_time_s'][:, 0]) >= 0)
+    assert HDF5_VALID_LENGTHS_PATH not in hdf5_file
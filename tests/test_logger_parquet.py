@@ -0,0 +1,56 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from collections import OrderedDict
+import os
+
+import numpy as np
+import pyarrow.parquet as pq
+from benchmarks.common import SyntheticStream, run_logger
+
+
+def test_parquet_round_trip(tmp_path):
+  stream = SyntheticStream([{'device_name': 'sensor', 'stream_name': 'scalar', 'data_type': 'float64', 'sample_size': (1,), 'sampling_rate_hz': 100},
+                            {'device_name': 'sensor', 'stream_name': 'matrix', 'data_type': 'int32', 'sample_size': (2, 3), 'sampling_rate_hz': 100},
+                            {'device_name': 'sensor', 'stream_name': 'label', 'data_type': 'S16', 'sample_size': (1,), 'sampling_rate_hz': 100}])
+  num_samples = 500
+  scalars = np.linspace(-1, 1, num_samples)
+  matrices = np.arange(num_samples*6, dtype='int32').reshape(num_samples, 2, 3)
+  labels = ['label-%d' % i for i in range(num_samples)]
+  for i in range(num_samples):
+    stream.append_data(process_time_s=float(i), data={'sensor': {'scalar': scalars[i], 'matrix': matrices[i], 'label': labels[i]}})
+  run_logger(OrderedDict([('synthetic', stream)]), str(tmp_path), stream_parquet=True)
+
+  table = pq.read_table(os.path.join(tmp_path, 'bench_sensor_scalar.parquet'))
+  np.testing.assert_array_equal(table.column('scalar').to_numpy(), scalars)
+  table = pq.read_table(os.path.join(tmp_path, 'bench_sensor_matrix.parquet'))
+  np.testing.assert_array_equal(np.stack(table.column('matrix').to_numpy(zero_copy_only=False)).reshape(-1, 2, 3), matrices)
+  assert table.schema.metadata[b'Sample size'] == b'[2, 3]'
+  table = pq.read_table(os.path.join(tmp_path, 'bench_sensor_label.parquet'))
+  assert table.column('label').to_pylist() == labels
+  table = pq.read_table(os.path.join(tmp_path, 'bench_sensor_process_time_s.parquet'))
+  np.testing.assert_array_equal(table.column('process_time_s').to_numpy(), np.arange(num_samples, dtype='float64'))
@@ -0,0 +1,123 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import os
+
+import numpy as np
+import pytest
+import torch
+import yaml
+from pytorch_tcn import TCN
+from nodes.pipelines.DummyPipeline import DummyPipeline
+from nodes.pipelines.FeaturePipeline import FeaturePipeline
+from nodes.pipelines.PipelineChain import PipelineChain
+from nodes.pipelines.PytorchWorker import PytorchWorker
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Stages of the example chain: EMG envelope, features of the envelope and a classifier on them,
+#   with a random model of the configured architecture.
+def get_example_stages(tmp_path) -> list[dict]:
+  with open(os.path.join(REPO_DIR, 'configs', 'test', 'local_chain.yml'), 'r') as f:
+    stages: list[dict] = yaml.safe_load(f)['pipeline_specs'][0]['stages']
+  classifier = stages[-1]
+  torch.manual_seed(0)
+  classifier['model_path'] = os.path.join(tmp_path, 'tcn.pt')
+  torch.save(TCN(**classifier['model_kwargs']).state_dict(), classifier['model_path'])
+  classifier.update({'num_inter_op_threads': torch.get_num_interop_threads(), 'num_warmup_steps': 5})
+  return stages
+
+
+def create_chain(stages: list[dict], tmp_path) -> PipelineChain:
+  return PipelineChain(host_ip='127.0.0.1',
+                       stages=stages,
+                       logging_spec={'log_dir': str(tmp_path), 'log_time_s': 0.0, 'experiment': {}},
+                       stream_specs=[])
+
+
+def create_emg_messages(num_messages: int, block_len: int = 100) -> list[dict]:
+  rng = np.random.default_rng(0)
+  return [{'process_time_s': i*block_len/2000, 'data': {'cometa-emg': {'emg': rng.standard_normal((block_len, 8))}}}
+          for i in range(num_messages)]
+
+
+def close_chain(chain: PipelineChain) -> None:
+  chain._logger.cleanup()
+  chain._logger.join()
+
+
+# The chain gives the same outputs as its stages run one after the other,
+#   publishes the output stages under their stage names and times every stage.
+def test_example_chain_matches_separate_stages(tmp_path):
+  stages = get_example_stages(tmp_path)
+  chain = create_chain(stages, tmp_path)
+  assert [stage['name'] for stage in chain._get_worker_spec()['stages']] == ['preprocessing', 'features', 'classifier']
+  assert [key for (key, *_) in chain._get_extra_stream_factories()] == ['features', 'classifier']
+
+  stage_types = [FeaturePipeline, FeaturePipeline, PytorchWorker]
+  workers = [stage_type._create_worker(stage_type._get_stage_specs(**stage)[0]) for (stage_type, stage) in zip(stage_types, stages)]
+  outputs = {'features': [], 'classifier': []}
+  chain_outputs = {'features': [], 'classifier': [], 'chain': []}
+  for msg in create_emg_messages(200):
+    stage_msgs = [('cometa-emg', msg)]
+    for (name, stage_type, worker) in zip(['preprocessing', 'features', 'classifier'], stage_types, workers):
+      stage_msgs = [(name, kwargs) for (topic, stage_msg) in stage_msgs for (_, kwargs) in stage_type._run_worker(worker, topic, stage_msg)]
+      if name in outputs:
+        outputs[name] += [kwargs for (_, kwargs) in stage_msgs]
+    for (tag, kwargs) in PipelineChain._run_worker(chain._worker, 'cometa-emg', msg):
+      assert tag.endswith('.data')
+      chain_outputs[tag.split('.')[0]].append(kwargs)
+  close_chain(chain)
+
+  assert len(chain_outputs['chain']) == 200
+  assert set(chain_outputs['chain'][0]['data']['pipeline-chain'].keys()) == \
+    {'preprocessing_latency_s', 'features_latency_s', 'classifier_latency_s', 'total_latency_s'}
+  assert len(outputs['classifier']) > 0
+  for name in ('features', 'classifier'):
+    assert len(chain_outputs[name]) == len(outputs[name])
+  for (chained, separate) in zip(chain_outputs['features'], outputs['features']):
+    np.testing.assert_allclose(chained['data']['emg-features']['wl'], separate['data']['emg-features']['wl'])
+  for (chained, separate) in zip(chain_outputs['classifier'], outputs['classifier']):
+    np.testing.assert_allclose(chained['data']['pytorch-worker']['logits'], separate['data']['pytorch-worker']['logits'], rtol=1e-5, atol=1e-6)
+
+
+# Stages without a name are named by their type and position, so the same type can be chained several times.
+def test_repeated_stage_types_are_named_by_position(tmp_path):
+  chain = create_chain([{'class': 'DummyPipeline', 'stream_info': {'sampling_rate_hz': 10}},
+                        {'class': 'DummyPipeline', 'stream_info': {'sampling_rate_hz': 10}, 'is_output': True},
+                        {'class': 'DummyPipeline', 'stream_info': {'sampling_rate_hz': 10}}], tmp_path)
+  outputs = PipelineChain._run_worker(chain._worker, 'dummy-producer', {'process_time_s': 0.0, 'data': {}})
+  close_chain(chain)
+  assert [tag for (tag, _) in outputs] == ['dummy-pipeline-1.data', 'dummy-pipeline-2.data', 'chain.data']
+  assert [key for (key, *_) in chain._get_extra_stream_factories()] == ['dummy-pipeline-1', 'dummy-pipeline-2']
+
+
+def test_duplicate_stage_names_are_rejected(tmp_path):
+  with pytest.raises(ValueError):
+    create_chain([{'class': 'DummyPipeline', 'name': 'stage'}, {'class': 'DummyPipeline', 'name': 'stage'}], tmp_path)
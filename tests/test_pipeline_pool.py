@@ -0,0 +1,153 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import os
+import time
+
+import pytest
+import zmq
+from handlers.PipelinePoolHandler import PipelineWorkerError, PipelineWorkerPool
+
+
+# Worker side of a Pipeline, as the pool uses it: counts the messages of each device it gets,
+#   sleeps a little differently per message so the workers finish out of order, and crashes on request.
+class CountingStage:
+  @classmethod
+  def _create_worker(cls, worker_spec: dict) -> dict:
+    return {'counts': {}, 'pid': os.getpid()}
+
+
+  @classmethod
+  def _run_worker(cls, worker: dict, topic: str, msg: dict) -> list[tuple[str, dict]]:
+    if msg['data'].get('crash'):
+      os._exit(3)
+    time.sleep(0.001 * (msg['process_time_s'] % 3))
+    outputs = []
+    for device in msg['data'].keys():
+      worker['counts'][device] = worker['counts'].get(device, 0) + 1
+      outputs.append(('%s.data' % topic, {'seq': msg['process_time_s'], 'device': device, 'count': worker['counts'][device], 'pid': worker['pid']}))
+    return outputs
+
+
+@pytest.fixture
+def ctx():
+  ctx = zmq.Context()
+  yield ctx
+  ctx.term()
+
+
+def run_pool(pool: PipelineWorkerPool, msgs: list[dict]) -> list[tuple[str, dict]]:
+  outputs = []
+  for msg in msgs:
+    outputs += pool.submit('stage', msg)
+    outputs += pool.collect()
+  return outputs + pool.drain()
+
+
+def test_outputs_follow_input_order(ctx):
+  pool = PipelineWorkerPool(CountingStage, {}, num_workers=3, ctx=ctx, routing='round_robin', max_reorder_len=8)
+  outputs = run_pool(pool, [{'process_time_s': i, 'data': {'dev': 0}} for i in range(100)])
+  pool.close()
+  assert [kwargs['seq'] for (_, kwargs) in outputs] == list(range(100))
+  assert len({kwargs['pid'] for (_, kwargs) in outputs}) == 3
+
+
+def test_device_routing_keeps_each_device_in_one_worker(ctx):
+  pool = PipelineWorkerPool(CountingStage, {}, num_workers=3, ctx=ctx, routing='device')
+  devices = ['imu', 'emg', 'insoles', 'gaze']
+  outputs = run_pool(pool, [{'process_time_s': i, 'data': {devices[i % 4]: 0}} for i in range(40)])
+  pool.close()
+  for device in devices:
+    device_outputs = [kwargs for (_, kwargs) in outputs if kwargs['device'] == device]
+    assert [kwargs['count'] for kwargs in device_outputs] == list(range(1, 11))
+    assert len({kwargs['pid'] for kwargs in device_outputs}) == 1
+
+
+def test_dead_worker_raises_instead_of_blocking(ctx):
+  pool = PipelineWorkerPool(CountingStage, {}, num_workers=2, ctx=ctx, routing='round_robin', poll_period_s=0.1)
+  pool.submit('stage', {'process_time_s': 0, 'data': {'crash': True}})
+  with pytest.raises(PipelineWorkerError):
+    pool.drain()
+  pool.close()
+
+
+def test_pipelines_without_workers_reject_a_pool():
+  from nodes.pipelines.Pipeline import Pipeline
+
+  class SerialPipeline(Pipeline):
+    @classmethod
+    def _log_source_tag(cls) -> str:
+      return 'serial'
+
+    @classmethod
+    def create_stream(cls, stream_info: dict):
+      return None
+
+    def _process_data(self, topic: str, msg: dict) -> None:
+      pass
+
+  with pytest.raises(ValueError):
+    SerialPipeline(host_ip='127.0.0.1', stream_info={}, logging_spec={}, stream_specs=[], num_workers=2)
+
+
+# The model and normalization state of a device is sequential, so its snapshots must all go to one worker.
+def test_pytorch_worker_rejects_round_robin():
+  from nodes.pipelines.PytorchWorker import PytorchWorker
+  with pytest.raises(ValueError):
+    PytorchWorker(host_ip='127.0.0.1', model_path='', input_size=(5, 6), output_classes=['none', 'freezing'],
+                  sampling_rate_hz=60, logging_spec={}, stream_specs=[], num_workers=2, worker_routing='round_robin')
+
+
+# PytorchWorker in a pool gives the same predictions as in its own process.
+def test_pytorch_worker_in_pool(ctx, tmp_path):
+  import numpy as np
+  import torch
+  from pytorch_tcn import TCN
+  from nodes.pipelines.PytorchWorker import PytorchWorker
+  from utils.inference_utils import DEFAULT_TCN_KWARGS
+
+  model_path = os.path.join(tmp_path, 'tcn.pt')
+  torch.manual_seed(0)
+  torch.save(TCN(**DEFAULT_TCN_KWARGS).state_dict(), model_path)
+  worker_spec, _ = PytorchWorker._get_stage_specs(model_path=model_path, input_size=(5, 6), output_classes=['none', 'freezing'],
+                                                  sampling_rate_hz=60, num_inter_op_threads=torch.get_num_interop_threads(),
+                                                  num_warmup_steps=5)
+  rng = np.random.default_rng(0)
+  msgs = [{'process_time_s': i/60, 'data': {'dots-imu': {'acceleration': rng.standard_normal((5, 3)).tolist(),
+                                                         'gyroscope': rng.standard_normal((5, 3)).tolist(),
+                                                         'toa_s': [i/60]*5}}} for i in range(100)]
+  worker = PytorchWorker._create_worker(worker_spec)
+  expected = [output for msg in msgs for output in PytorchWorker._run_worker(worker, 'dots-imu', msg)]
+  pool = PipelineWorkerPool(PytorchWorker, worker_spec, num_workers=2, ctx=ctx, routing='device')
+  outputs = []
+  for msg in msgs:
+    outputs += pool.submit('dots-imu', msg)
+    outputs += pool.collect()
+  outputs += pool.drain()
+  pool.close()
+  assert [tag for (tag, _) in outputs] == [tag for (tag, _) in expected]
+  np.testing.assert_allclose(np.stack([kwargs['data']['pytorch-worker']['logits'] for (_, kwargs) in outputs]),
+                             np.stack([kwargs['data']['pytorch-worker']['logits'] for (_, kwargs) in expected]), rtol=1e-5, atol=1e-6)
@@ -0,0 +1,130 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import os
+
+import numpy as np
+import pytest
+import torch
+from pytorch_tcn import TCN
+from utils.inference_utils import EagerBackend, compare_streaming_models
+from utils.tcn_utils import StreamingTCN, quantize_streaming_tcn
+
+
+NUM_INPUTS = 4
+TCN_KWARGS = {
+  'num_inputs': NUM_INPUTS,
+  'num_channels': [8, 8, 6],
+  'kernel_size': 3,
+  'dropout': 0.1,
+  'output_projection': 2,
+  'output_activation': None,
+  'causal': True,
+}
+
+
+def create_model(**kwargs) -> TCN:
+  torch.manual_seed(0)
+  return TCN(**{**TCN_KWARGS, **kwargs}).eval()
+
+
+def stream(engine: StreamingTCN, x: torch.Tensor) -> torch.Tensor:
+  with torch.no_grad():
+    return torch.stack([engine.step(x[0, :, t]) for t in range(x.shape[2])], dim=1)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'use_norm': None}, {'kernel_size': 2}, {'kernel_size': 5, 'num_channels': [8, 6]}])
+def test_streaming_matches_full_window(kwargs):
+  model = create_model(**kwargs)
+  engine = StreamingTCN(model)
+  x = torch.randn(1, NUM_INPUTS, 2*engine.receptive_field)
+  with torch.no_grad():
+    full_window = model(x)[0]
+  torch.testing.assert_close(stream(engine, x), full_window, rtol=1e-5, atol=1e-5)
+
+
+def test_receptive_field():
+  model = create_model()
+  engine = StreamingTCN(model)
+  num_steps = 2*engine.receptive_field
+  x = torch.randn(1, NUM_INPUTS, num_steps)
+  reference = stream(engine, x)[:, -1]
+  # The newest output depends on exactly the last `receptive_field` inputs.
+  for (t, is_dependent) in [(num_steps-engine.receptive_field, True), (num_steps-engine.receptive_field-1, False)]:
+    x_changed = x.clone()
+    x_changed[0, :, t] += 10
+    engine.reset()
+    assert (stream(engine, x_changed)[:, -1] != reference).any().item() == is_dependent
+
+
+def test_reset_starts_over_after_gap():
+  model = create_model()
+  engine = StreamingTCN(model)
+  before_gap = torch.randn(1, NUM_INPUTS, engine.receptive_field)
+  after_gap = torch.randn(1, NUM_INPUTS, engine.receptive_field)
+  stream(engine, before_gap)
+  engine.reset()
+  with torch.no_grad():
+    full_window = model(after_gap)[0]
+  torch.testing.assert_close(stream(engine, after_gap), full_window, rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize('kwargs', [{'causal': False}, {'use_norm': 'batch_norm'}, {'use_skip_connections': True}, {'use_gate': True}])
+def test_unsupported_models_are_rejected(kwargs):
+  with pytest.raises(ValueError):
+    StreamingTCN(create_model(**kwargs))
+
+
+# The backend's streaming engine and the library's own inference mode give the same logits, also across a reset.
+def test_eager_backend_streaming_matches_inference_mode(tmp_path):
+  model_path = os.path.join(tmp_path, 'tcn.pt')
+  torch.save(create_model().state_dict(), model_path)
+  inputs = np.random.default_rng(0).standard_normal((60, NUM_INPUTS)).astype(np.float32)
+  outputs = {}
+  for is_streaming_inference in (True, False):
+    backend = EagerBackend(model_path=model_path, num_inputs=NUM_INPUTS, model_kwargs=TCN_KWARGS,
+                           num_inter_op_threads=torch.get_num_interop_threads(), is_streaming_inference=is_streaming_inference)
+    logits = []
+    for (t, x) in enumerate(inputs):
+      if t == len(inputs)//2:
+        backend.reset()
+      logits.append(backend.step(x))
+    outputs[is_streaming_inference] = np.stack(logits)
+  np.testing.assert_allclose(outputs[True], outputs[False], rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize('mode', ['dynamic', 'static'])
+def test_quantized_engine_follows_float_engine(mode):
+  engine = StreamingTCN(create_model())
+  inputs = torch.randn(400, NUM_INPUTS)
+  quantized = quantize_streaming_tcn(engine, mode, calibration_inputs=inputs[:200])
+  report = compare_streaming_models(engine, quantized, inputs[200:])
+  assert report['agreement'] > 0.9
+
+
+def test_static_quantization_needs_calibration_inputs():
+  with pytest.raises(ValueError):
+    quantize_streaming_tcn(StreamingTCN(create_model()), 'static')
@@ -0,0 +1,86 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import subprocess
+import sys
+import threading
+
+import av
+import cv2
+import numpy as np
+from handlers.VideoFeederHandler import PassthroughVideoFeeder, VideoFeeder
+
+
+# Encoder that exits after reading a few bytes, so the feeder's pipe writes break.
+def create_dead_encoder() -> subprocess.Popen:
+  return subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.buffer.read(10)'], stdin=subprocess.PIPE)
+
+
+def put_frames(video_feeder: VideoFeeder, num_frames: int) -> list[bool]:
+  is_accepted = []
+  put_thread = threading.Thread(target=lambda: is_accepted.extend(video_feeder.put(b'\x00' * 2**16, i) for i in range(num_frames)))
+  put_thread.start()
+  put_thread.join(timeout=30)
+  assert not put_thread.is_alive(), 'put() blocked on a dead encoder'
+  return is_accepted
+
+
+def test_block_policy_does_not_block_on_dead_encoder():
+  video_feeder = VideoFeeder(create_dead_encoder(), name='dead', sampling_rate_hz=30, max_queue_len=2, backlog_policy='block')
+  is_accepted = put_frames(video_feeder, 200)
+  video_feeder.close()
+  stats = video_feeder.get_stats()
+  assert isinstance(video_feeder.get_error(), BrokenPipeError)
+  assert not is_accepted[-1]
+  assert stats['frames_written'] + stats['frames_dropped'] == 200
+  assert 'BrokenPipeError' in video_feeder.get_stats_str()
+
+
+def test_drop_policy_on_dead_encoder():
+  video_feeder = VideoFeeder(create_dead_encoder(), name='dead', sampling_rate_hz=30, max_queue_len=2, backlog_policy='drop')
+  put_frames(video_feeder, 200)
+  video_feeder.close()
+  stats = video_feeder.get_stats()
+  assert video_feeder.get_error() is not None
+  assert stats['frames_written'] + stats['frames_dropped'] == 200
+
+
+# Frames lost upstream leave gaps in the timeline of a passthrough recording, instead of shifting the later frames.
+def test_passthrough_pts_follow_frame_indices(tmp_path):
+  filepath = str(tmp_path / 'world.mkv')
+  frame_indices = [100, 101, 102, 105, 106, 110, 111, 120]
+  video_feeder = PassthroughVideoFeeder(filepath=filepath, codec_name='mjpeg', width=64, height=48, name='world', sampling_rate_hz=30)
+  for frame_index in frame_indices:
+    frame = np.full((48, 64, 3), frame_index % 256, dtype=np.uint8)
+    video_feeder.put(cv2.imencode('.jpg', frame)[1].tobytes(), frame_index)
+  video_feeder.close()
+  assert video_feeder.get_error() is None
+  with av.open(filepath) as container:
+    stream = container.streams.video[0]
+    pts = [packet.pts for packet in container.demux(stream) if packet.pts is not None]
+    frame_offsets = [round(float(x * stream.time_base) * 30) for x in pts]
+  assert frame_offsets == [frame_index - frame_indices[0] for frame_index in frame_indices]
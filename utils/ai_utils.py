@@ -24,6 +24,7 @@
 #
 # ############
 
+import h5py
 import numpy as np
 from scipy.signal import butter, lfilter, lfilter_zi 
 
@@ -74,3 +75,92 @@ def normalize(sensor_sample, b, a, zi, count, mean, var, eps=1e-3):
   norm_sample = sensor_sample / std
 
   return norm_sample, zi, count, mean, var
+
+
+# Stateful preprocessing of whole sensor snapshots at once: (num_sensors, num_channels) arrays, one row per sensor.
+# High-pass filters the selected channels of all sensors with a Butterworth filter in second-order sections,
+#   keeping the filter state of every sensor and channel in one (num_sections, num_sensors, num_filtered, 2) matrix,
+#   then updates the running mean and variance, pooled over the sensors, with the batch form of Welford's algorithm
+#   (Chan et al.), equivalent to updating them with each sensor's sample in turn.
+# Missing sensors are rows with NaNs: they are masked out of the filter state and the statistics update,
+#   and their filter state is kept as is, until the sensor comes back.
+class SnapshotNormalizer:
+  def __init__(self,
+               num_sensors: int,
+               fs: float,
+               cutoff_hz: float = 0.3,
+               order: int = 4,
+               filtered_channels: tuple[int, ...] = (0, 1, 2),
+               centered_channels: tuple[int, ...] = (3, 4, 5),
+               num_channels: int = 6,
+               eps: float = 1e-3) -> None:
+    self._sos: np.ndarray = butter(order, cutoff_hz / (0.5 * fs), btype='high', analog=False, output='sos') # type: ignore
+    self._filtered_channels = np.array(filtered_channels, dtype=int)
+    self._centered_channels = np.array(centered_channels, dtype=int)
+    self._num_sensors = num_sensors
+    self._num_channels = num_channels
+    self._eps = eps
+    self.reset()
+
+
+  def reset(self) -> None:
+    self._zi = np.zeros((self._sos.shape[0], self._num_sensors, len(self._filtered_channels), 2))
+    self._count = 0
+    self._mean = np.zeros(self._num_channels)
+    self._var = np.ones(self._num_channels)
+
+
+  # Returns the normalized snapshot (missing sensors stay NaN) and the mask of the sensors that were present.
+  def __call__(self, snapshot: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    x = np.array(snapshot, dtype=np.float64)
+    is_valid = ~np.isnan(x).any(axis=1)
+
+    # Transposed direct form II, one section after the other, for all sensors and channels at once.
+    y = x[:, self._filtered_channels]
+    zi = self._zi.copy()
+    for i, (b0, b1, b2, _, a1, a2) in enumerate(self._sos):
+      y_in = y
+      y = b0 * y_in + zi[i, :, :, 0]
+      zi[i, :, :, 0] = b1 * y_in - a1 * y + zi[i, :, :, 1]
+      zi[i, :, :, 1] = b2 * y_in - a2 * y
+    self._zi[:, is_valid] = zi[:, is_valid]
+    x[:, self._filtered_channels] = y
+
+    # Merge the statistics of the valid samples of this snapshot into the running ones.
+    if (num_valid := int(is_valid.sum())):
+      batch = x[is_valid]
+      batch_mean = batch.mean(axis=0)
+      batch_var = batch.var(axis=0)
+      count = self._count + num_valid
+      delta = batch_mean - self._mean
+      self._mean = self._mean + delta * num_valid / count
+      self._var = (self._count * self._var + num_valid * batch_var + delta**2 * self._count * num_valid / count) / count
+      self._count = count
+
+    # Normalize: only center the selected channels, scale all of them.
+    x[:, self._centered_channels] -= self._mean[self._centered_channels]
+    x /= np.clip(np.sqrt(self._var), self._eps, None)
+    return x, is_valid
+
+
+# Replay the DOTs IMU data of a recorded session through the same preprocessing as live data in the PytorchWorker,
+#   into (num_steps, num_sensors*num_channels) model inputs, i.e. to calibrate or evaluate a quantized model on.
+def load_session_inputs(hdf5_path: str,
+                        input_size: tuple[int, int],
+                        sampling_rate_hz: float,
+                        num_steps: int | None = None) -> np.ndarray:
+  with h5py.File(hdf5_path, 'r') as hdf5_file:
+    acc = hdf5_file['dots']['dots-imu']['acceleration'][:num_steps]
+    gyr = hdf5_file['dots']['dots-imu']['gyroscope'][:num_steps]
+  normalizer = SnapshotNormalizer(num_sensors=input_size[0],
+                                  fs=sampling_rate_hz,
+                                  cutoff_hz=0.3,
+                                  order=4,
+                                  num_channels=input_size[1])
+  buffer = np.zeros(input_size, dtype=np.float32)
+  inputs = np.empty((len(acc), input_size[0]*input_size[1]), dtype=np.float32)
+  for i, snapshot in enumerate(np.concatenate((acc, gyr), axis=2)):
+    norm_snapshot, is_valid = normalizer(snapshot)
+    buffer[is_valid] = norm_snapshot[is_valid]
+    inputs[i] = buffer.reshape(-1)
+  return inputs
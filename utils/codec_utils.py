@@ -0,0 +1,201 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import glob
+import os
+import re
+import socket
+import subprocess
+from typing import Any
+import numpy as np
+import yaml
+
+try:
+  import ffmpeg
+except ImportError as e:
+  print(e, "\nFFmpeg not installed, will crash if you configure automatic video codec selection.", flush=True)
+
+from utils.types import VideoCodecDict
+
+
+# Codec specs to fall back to on hosts without any of the hardware encoders in `resources/codecs`, i.e. plain Linux.
+#   Ordered from the preferred to the last resort.
+FALLBACK_VIDEO_CODECS: list[VideoCodecDict] = [
+  {'codec_name': 'libx264',
+   'pix_format': 'yuv420p',
+   'input_options': {},
+   'output_options': {'preset': 'ultrafast', 'tune': 'zerolatency', 'crf': '23'}},
+  {'codec_name': 'mpeg4',
+   'pix_format': 'yuv420p',
+   'input_options': {},
+   'output_options': {'qscale:v': '3'}},
+]
+
+# Fraction of the encoding capacity the selected codec may use, to leave headroom for bursts and the rest of the Logger.
+VIDEO_CODEC_MAX_LOAD = 0.8
+
+# Folder with the cached probe results, one file per host.
+VIDEO_CODEC_PROBE_DIRNAME = 'probes'
+
+
+# Names of all the video encoders in the local FFmpeg build.
+def get_ffmpeg_encoders() -> set[str]:
+  try:
+    output = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True, check=True).stdout
+  except (OSError, subprocess.CalledProcessError):
+    return set()
+  # Lines of the list look like ' V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC ...'.
+  return set(m.group(1) for m in re.finditer(r'^\s*V[\w.]{5}\s+(\S+)', output, flags=re.MULTILINE))
+
+
+def get_ffmpeg_version() -> str:
+  try:
+    return subprocess.run(['ffmpeg', '-hide_banner', '-version'], capture_output=True, text=True, check=True).stdout.splitlines()[0]
+  except (OSError, subprocess.CalledProcessError, IndexError):
+    return 'unknown'
+
+
+# All hand-tuned codec specs in the folder, by their file name.
+def load_video_codec_specs(codecs_dir: str) -> dict[str, VideoCodecDict]:
+  specs: dict[str, VideoCodecDict] = {}
+  for filepath in sorted(glob.glob(os.path.join(codecs_dir, '*.yml'))):
+    with open(filepath, 'r') as f:
+      specs[os.path.splitext(os.path.basename(filepath))[0]] = yaml.safe_load(f)
+  return specs
+
+
+# Encode a short synthetic clip with the codec spec, as the Logger would for a video stream,
+#   and measure the throughput and the CPU cost of the whole FFmpeg process.
+# Frames are a moving gradient with some noise, so that inter-frame coding has work to do, but not an unrealistic amount.
+# Returns the frames encoded per second of wall time and CPU seconds used per frame,
+#   or zeros if the encoder does not work on this host (i.e. the hardware it needs is missing).
+def probe_video_codec(video_codec: VideoCodecDict,
+                      width: int,
+                      height: int,
+                      input_pix_fmt: str,
+                      fps: float,
+                      duration_s: float = 2.0,
+                      num_cpu: int = 1) -> dict[str, float]:
+  num_frames = max(30, int(duration_s * fps))
+  # Raw frame bytes of the input pixel format, as piped from the Streams.
+  #   Packed formats (bayer, gray) have one byte per pixel, bgr24 three, 4:2:0 planar one and a half.
+  bytes_per_pixel = {'bgr24': 3.0, 'rgb24': 3.0, 'yuv420p': 1.5, 'nv12': 1.5}.get(input_pix_fmt, 1.0)
+  frame_size = int(width * height * bytes_per_pixel)
+  rng = np.random.default_rng(0)
+  base = (np.arange(frame_size, dtype=np.uint32) % (width*3)).astype(np.uint8)
+  frames = [(base + 4*i + rng.integers(0, 8, frame_size, dtype=np.uint8)).tobytes() for i in range(8)]
+
+  stream = ffmpeg.input('pipe:', # type: ignore
+                        format='rawvideo',
+                        pix_fmt=input_pix_fmt,
+                        s='{}x{}'.format(width, height),
+                        framerate=fps,
+                        cpucount=num_cpu,
+                        **video_codec['input_options'])
+  stream = ffmpeg.output(stream, # type: ignore
+                         '-',
+                         format='null',
+                         vcodec=video_codec['codec_name'],
+                         pix_fmt=video_codec['pix_format'],
+                         cpucount=num_cpu,
+                         **video_codec['output_options'])
+  stream = stream.global_args('-hide_banner', '-benchmark')
+  try:
+    process: subprocess.Popen = ffmpeg.run_async(stream, pipe_stdin=True, pipe_stderr=True) # type: ignore
+    for i in range(num_frames):
+      process.stdin.write(frames[i % len(frames)]) # type: ignore
+    _, stderr = process.communicate()
+  except OSError:
+    return {'fps': 0.0, 'cpu_s_per_frame': 0.0}
+  # FFmpeg prints the resources of the whole run as 'bench: utime=1.234s stime=0.123s rtime=0.789s'.
+  match = re.search(r'bench: utime=([\d.]+)s stime=([\d.]+)s rtime=([\d.]+)s', stderr.decode('utf-8', errors='ignore'))
+  if process.returncode != 0 or match is None or float(match.group(3)) <= 0:
+    return {'fps': 0.0, 'cpu_s_per_frame': 0.0}
+  utime_s, stime_s, rtime_s = map(float, match.groups())
+  return {'fps': num_frames / rtime_s, 'cpu_s_per_frame': (utime_s + stime_s) / num_frames}
+
+
+# Pick the codec spec that keeps up with all the video streams of the host for the least CPU.
+# Each stream config is a (width, height, input pixel format, fps) tuple, repeated once per stream with it.
+# Candidates that fail to encode any of the streams are skipped, if none is left, raises a RuntimeError.
+# A candidate sustains the streams if the fractions of its measured throughput they need add up to at most `max_load`:
+#   streams share the encoding hardware/cores, so this is the conservative estimate.
+# Candidates are the specs in `codecs_dir` whose encoder is in the local FFmpeg build, then the software fallbacks.
+# Probe results are cached in `<codecs_dir>/probes/<hostname>.yml`, keyed by the FFmpeg build, spec and stream config,
+#   so later runs on the same host select instantly.
+def select_video_codec(stream_configs: list[tuple[int, int, str, float]],
+                       codecs_dir: str,
+                       max_load: float = VIDEO_CODEC_MAX_LOAD,
+                       num_cpu: int = 1) -> tuple[VideoCodecDict, dict[str, Any]]:
+  available_encoders = get_ffmpeg_encoders()
+  candidates: dict[str, VideoCodecDict] = {name: spec for name, spec in load_video_codec_specs(codecs_dir).items()
+                                           if spec['codec_name'] in available_encoders}
+  for spec in FALLBACK_VIDEO_CODECS:
+    if spec['codec_name'] in available_encoders or not available_encoders:
+      candidates['fallback_%s' % spec['codec_name']] = spec
+
+  cache_filepath = os.path.join(codecs_dir, VIDEO_CODEC_PROBE_DIRNAME, '%s.yml' % socket.gethostname())
+  cache: dict[str, dict[str, float]] = {}
+  if os.path.exists(cache_filepath):
+    with open(cache_filepath, 'r') as f:
+      cache = yaml.safe_load(f) or {}
+  is_cache_updated = False
+  ffmpeg_version = get_ffmpeg_version()
+
+  results: dict[str, dict[str, float]] = {}
+  for name, spec in candidates.items():
+    load = 0.0
+    cpu_s_per_s = 0.0
+    for (width, height, input_pix_fmt, fps) in stream_configs:
+      key = '%s | %s | %dx%d %s %.3f fps' % (ffmpeg_version,
+                                             yaml.safe_dump(spec, default_flow_style=True, sort_keys=True).strip(),
+                                             width, height, input_pix_fmt, fps)
+      if key not in cache:
+        cache[key] = probe_video_codec(spec, width, height, input_pix_fmt, fps, num_cpu=num_cpu)
+        is_cache_updated = True
+      probe = cache[key]
+      load += fps / probe['fps'] if probe['fps'] > 0 else float('inf')
+      cpu_s_per_s += fps * probe['cpu_s_per_frame']
+    results[name] = {'load': load, 'cpu_s_per_s': cpu_s_per_s}
+
+  if is_cache_updated:
+    os.makedirs(os.path.dirname(cache_filepath), exist_ok=True)
+    with open(cache_filepath, 'w') as f:
+      yaml.safe_dump(cache, f)
+
+  # Candidates that failed to encode any of the streams (i.e. missing hardware, unsupported options) are unusable.
+  results = {name: result for name, result in results.items() if result['load'] != float('inf')}
+  if not results:
+    raise RuntimeError('No usable video encoder found in the local FFmpeg build.')
+  sustaining = [name for name, result in results.items() if result['load'] <= max_load]
+  if sustaining:
+    selected = min(sustaining, key=lambda name: results[name]['cpu_s_per_s'])
+  else:
+    selected = min(results.keys(), key=lambda name: results[name]['load'])
+    print("No video codec sustains the required frame rate with headroom, using '%s' at %.0f%% of its capacity."
+          % (selected, 100*results[selected]['load']), flush=True)
+  return candidates[selected], {'name': selected, **results[selected]}
@@ -0,0 +1,240 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+from collections import OrderedDict
+from typing import Any
+import numpy as np
+
+
+# Slack on time comparisons, well below any sampling period, so samples exactly on a tick or on the tolerance
+#   are not lost to floating point rounding of the tick times.
+_TIME_EPS_S = 1e-9
+
+
+# Growable ring buffer of the timestamped samples of one stream.
+# Samples live in one contiguous array twice the capacity, appended at the end in batches,
+#   and the newest `capacity` samples are moved back to the front when it fills up,
+#   so the buffered times and values are always plain (searchable, sliceable) array views, at O(1) amortized cost per sample.
+class TimeSeriesRing:
+  def __init__(self,
+               capacity: int,
+               sample_shape: tuple[int, ...] = (),
+               dtype: Any = np.float64) -> None:
+    self._capacity = capacity
+    self._times = np.empty(2*capacity, dtype=np.float64)
+    self._values = np.empty((2*capacity, *sample_shape), dtype=dtype)
+    self._start = 0
+    self._end = 0
+
+
+  def __len__(self) -> int:
+    return self._end - self._start
+
+
+  @property
+  def times(self) -> np.ndarray:
+    return self._times[self._start:self._end]
+
+
+  @property
+  def values(self) -> np.ndarray:
+    return self._values[self._start:self._end]
+
+
+  # Append a batch of samples, in time order, dropping the oldest ones beyond the capacity.
+  # Samples of the batch older than buffered ones (out of order arrival) are merged in order with them.
+  def append(self, times: np.ndarray, values: np.ndarray) -> None:
+    if not len(times):
+      return
+    num_newer = len(self) - int(np.searchsorted(self.times, times[0], side='right'))
+    if num_newer > 0:
+      times = np.concatenate((self.times[-num_newer:], times))
+      values = np.concatenate((self.values[-num_newer:], values))
+      order = np.argsort(times, kind='stable')
+      times, values = times[order], values[order]
+      self._end -= num_newer
+    if len(times) > self._capacity:
+      times, values = times[-self._capacity:], values[-self._capacity:]
+    if self._end + len(times) > 2*self._capacity:
+      num_kept = min(len(self), self._capacity - len(times))
+      self._times[:num_kept] = self._times[self._end-num_kept:self._end]
+      self._values[:num_kept] = self._values[self._end-num_kept:self._end]
+      self._start, self._end = 0, num_kept
+    self._times[self._end:self._end+len(times)] = times
+    self._values[self._end:self._end+len(times)] = values
+    self._end += len(times)
+
+
+  # Drop all samples older than the last one at or before `time_s`, which is kept for interpolation.
+  def discard_before(self, time_s: float) -> None:
+    self._start += max(0, int(np.searchsorted(self.times, time_s, side='right')) - 1)
+
+
+# Resamples several asynchronous streams (i.e. DOTs at 60 Hz, insoles at 100 Hz, EMG at 2 kHz, gaze at 200 Hz)
+#   onto one common clock at `rate_hz`, and emits aligned windows of `window_len` ticks every `hop` new ticks.
+# Each stream is configured by its key in `stream_specs` with:
+#   'sample_shape': shape of one sample (default scalar),
+#   'interpolation': 'nearest' sample, or 'linear' between the samples around the tick (default 'nearest'),
+#   'tolerance_s': how far from a tick the sample(s) used for it may be, otherwise the tick is NaN for the stream,
+#   'capacity': max number of buffered samples (default 4 s worth of ticks at 2 kHz).
+# A tick is emitted once every stream has a sample at or after it,
+#   or once the watermark passed it: the newest time seen on any stream minus `max_lateness_s`,
+#   so a stalled or dead stream delays the output by at most that long (and its values are NaN).
+# Samples that arrive older than the last emitted tick, minus their tolerance, could only have been used for ticks
+#   already emitted: they are late, and dropped (and counted). Other samples arriving out of order are merged in.
+# All the alignment is done with array operations over the batch of ticks that became ready, not per sample.
+# A Pipeline pushes the samples of each topic in its `_process_data` (i.e. with the 'toa_s' of the device as times),
+#   and runs its model/features on every window `pop_windows` returns.
+class StreamJoiner:
+  def __init__(self,
+               stream_specs: dict[str, dict[str, Any]],
+               rate_hz: float,
+               window_len: int = 1,
+               hop: int = 1,
+               max_lateness_s: float = 0.1,
+               start_time_s: float | None = None) -> None:
+    self._specs = OrderedDict()
+    self._buffers: OrderedDict[str, TimeSeriesRing] = OrderedDict()
+    for key, spec in stream_specs.items():
+      self._specs[key] = {
+        'sample_shape': tuple(spec.get('sample_shape', ())),
+        'interpolation': spec.get('interpolation', 'nearest'),
+        'tolerance_s': spec.get('tolerance_s', 1.0/rate_hz),
+      }
+      if self._specs[key]['interpolation'] not in ('nearest', 'linear'):
+        raise ValueError("Unsupported interpolation '%s' of stream '%s', must be 'nearest' or 'linear'." % (self._specs[key]['interpolation'], key))
+      self._buffers[key] = TimeSeriesRing(capacity=spec.get('capacity', 8000), sample_shape=self._specs[key]['sample_shape'])
+    self._period_s = 1.0 / rate_hz
+    self._window_len = window_len
+    self._hop = hop
+    self._max_lateness_s = max_lateness_s
+    # Ticks are computed from their index since the start, so they do not drift with accumulated rounding.
+    self._start_time_s = start_time_s
+    self._next_tick_index = 0
+    self._last_tick_time_s: float | None = None
+    self._latest_time_s = -np.inf
+    self._num_late: OrderedDict[str, int] = OrderedDict([(key, 0) for key in stream_specs.keys()])
+    # Aligned ticks, kept for the windows.
+    self._aligned_times = TimeSeriesRing(capacity=max(window_len, hop) + 1024)
+    self._aligned: OrderedDict[str, TimeSeriesRing] = OrderedDict([(key, TimeSeriesRing(capacity=max(window_len, hop) + 1024, sample_shape=spec['sample_shape']))
+                                                                   for key, spec in self._specs.items()])
+    self._num_new_ticks = 0
+
+
+  # Add a batch of samples of one stream, (num_samples,) times and (num_samples, *sample_shape) values, in time order.
+  def push(self, key: str, times: np.ndarray, values: np.ndarray) -> None:
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    values = np.asarray(values, dtype=np.float64).reshape(len(times), *self._specs[key]['sample_shape'])
+    if self._start_time_s is None:
+      self._start_time_s = float(times[0])
+    # Drop the samples that could only have been used for ticks already emitted.
+    if self._last_tick_time_s is not None:
+      is_on_time = times >= self._last_tick_time_s - self._specs[key]['tolerance_s'] - _TIME_EPS_S
+    else:
+      is_on_time = np.ones(len(times), dtype=bool)
+    self._num_late[key] += int((~is_on_time).sum())
+    if is_on_time.any():
+      self._buffers[key].append(times[is_on_time], values[is_on_time])
+      self._latest_time_s = max(self._latest_time_s, float(times[is_on_time][-1]))
+
+
+  # Number of samples of each stream dropped for arriving too late.
+  def get_num_late(self) -> dict[str, int]:
+    return dict(self._num_late)
+
+
+  # Align all the ticks that became ready, and return the windows completed by them, oldest first,
+  #   as (times (window_len,), {stream key: values (window_len, *sample_shape)}) tuples.
+  def pop_windows(self) -> list[tuple[np.ndarray, dict[str, np.ndarray]]]:
+    self._align_ready_ticks()
+    num_aligned = len(self._aligned_times)
+    # Skip the hops with no full window behind them (start of the stream, or more new ticks than kept after a long stall).
+    self._num_new_ticks = min(self._num_new_ticks, num_aligned)
+    while self._num_new_ticks >= self._hop and num_aligned - (self._num_new_ticks - self._hop) < self._window_len:
+      self._num_new_ticks -= self._hop
+    windows = []
+    while self._num_new_ticks >= self._hop:
+      self._num_new_ticks -= self._hop
+      end = num_aligned - self._num_new_ticks
+      windows.append((self._aligned_times.values[end-self._window_len:end].copy(),
+                      {key: ring.values[end-self._window_len:end].copy() for key, ring in self._aligned.items()}))
+    return windows
+
+
+  def _align_ready_ticks(self) -> None:
+    if self._start_time_s is None:
+      return
+    # Ready up to the time all streams reached, or up to the watermark if some stream lags behind.
+    ready_time_s = min((buffer.times[-1] if len(buffer) else -np.inf) for buffer in self._buffers.values())
+    ready_time_s = max(ready_time_s, self._latest_time_s - self._max_lateness_s)
+    if ready_time_s == -np.inf:
+      return
+    end_tick_index = int(np.floor((ready_time_s - self._start_time_s + _TIME_EPS_S) / self._period_s)) + 1
+    if end_tick_index <= self._next_tick_index:
+      return
+    ticks = self._start_time_s + self._period_s * np.arange(self._next_tick_index, end_tick_index)
+    for key, buffer in self._buffers.items():
+      self._aligned[key].append(ticks, self._interpolate(key, buffer, ticks))
+      buffer.discard_before(ticks[-1])
+    self._aligned_times.append(ticks, ticks)
+    self._next_tick_index = end_tick_index
+    self._last_tick_time_s = float(ticks[-1])
+    self._num_new_ticks += len(ticks)
+
+
+  def _interpolate(self, key: str, buffer: TimeSeriesRing, ticks: np.ndarray) -> np.ndarray:
+    spec = self._specs[key]
+    out = np.full((len(ticks), *spec['sample_shape']), np.nan)
+    if not len(buffer):
+      return out
+    times, values = buffer.times, buffer.values
+    # Index of the last sample at or before each tick, and of the first one after it.
+    left = np.searchsorted(times, ticks, side='right') - 1
+    right = left + 1
+    has_left = left >= 0
+    has_right = right < len(times)
+    left_c = np.clip(left, 0, len(times)-1)
+    right_c = np.clip(right, 0, len(times)-1)
+    dt_left = np.where(has_left, ticks - times[left_c], np.inf)
+    dt_right = np.where(has_right, times[right_c] - ticks, np.inf)
+    tolerance_s = spec['tolerance_s'] + _TIME_EPS_S
+    if spec['interpolation'] == 'nearest':
+      nearest = np.where(dt_left <= dt_right, left_c, right_c)
+      is_valid = np.minimum(dt_left, dt_right) <= tolerance_s
+      out[is_valid] = values[nearest[is_valid]]
+    else:
+      # (Practically) exactly on a sample needs no other neighbor.
+      is_on_left = dt_left <= _TIME_EPS_S
+      is_on_right = ~is_on_left & (dt_right <= _TIME_EPS_S)
+      is_exact = is_on_left | is_on_right
+      is_valid = is_exact | ((dt_left <= tolerance_s) & (dt_right <= tolerance_s))
+      is_between = is_valid & ~is_exact
+      weight = is_on_right.astype(np.float64)
+      weight[is_between] = dt_left[is_between] / (dt_left[is_between] + dt_right[is_between])
+      weight = weight[is_valid]
+      weight = weight.reshape(-1, *([1]*len(spec['sample_shape'])))
+      out[is_valid] = (1-weight) * values[left_c[is_valid]] + weight * values[right_c[is_valid]]
+    return out
@@ -0,0 +1,170 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+import numpy as np
+
+
+# Features `SlidingWindowFeatures` can compute over each window, per channel:
+#   'rms': root mean square, 'mav': mean absolute value, 'wl': waveform length (sum of absolute differences),
+#   'zc': number of zero crossings (sign changes between consecutive samples),
+#   'band_power': one-sided power of the window's DFT bins within each of the frequency bands,
+#   'jerk': root mean square of the first derivative (i.e. jerk, of an accelerometer).
+FEATURES = ('rms', 'mav', 'wl', 'zc', 'band_power', 'jerk')
+
+
+# Windowed features of a multichannel signal, updated incrementally as samples come in,
+#   and produced every `hop` samples once the first `window_len` samples filled the window.
+# Every feature is a running sum over the window (or a few DFT bins for the band power, as a sliding DFT):
+#   a new block adds the contributions of its samples and subtracts those of the samples leaving the window,
+#   so an update costs O(1) per sample (O(num bins) for the band power), vectorized over the channels and the block.
+# The sums are recomputed from the window once every `window_len` samples, so floating point drift can't accumulate.
+class SlidingWindowFeatures:
+  def __init__(self,
+               num_channels: int,
+               window_len: int,
+               hop: int,
+               fs: float,
+               features: tuple[str, ...] = FEATURES,
+               bands_hz: tuple[tuple[float, float], ...] = ()) -> None:
+    if window_len < 2:
+      raise ValueError('Window of the features must be at least 2 samples long.')
+    for feature in features:
+      if feature not in FEATURES:
+        raise ValueError("Unsupported feature '%s', must be one of %s." % (feature, FEATURES))
+    if 'band_power' in features and not bands_hz:
+      raise ValueError("The 'band_power' feature needs at least one frequency band.")
+    self._num_channels = num_channels
+    self._window_len = window_len
+    self._hop = hop
+    self._fs = fs
+    self._features = tuple(features)
+    # DFT bins within any of the bands, and which of them each band sums.
+    freqs = np.fft.rfftfreq(window_len, d=1.0/fs)
+    band_masks = np.array([(freqs >= low_hz) & (freqs <= high_hz) for low_hz, high_hz in bands_hz], dtype=bool).reshape(len(bands_hz), len(freqs))
+    self._bins = np.flatnonzero(band_masks.any(axis=0)) if 'band_power' in features else np.array([], dtype=int)
+    self._band_masks = band_masks[:, self._bins].astype(np.float64)
+    self._bin_scale = np.where((self._bins == 0) | (2*self._bins == window_len), 1.0, 2.0) / window_len**2
+    # Powers 1..window_len-1 of each bin's twiddle factor, to advance the DFT by a whole block at once.
+    self._twiddle_powers = np.exp(2j*np.pi*np.arange(1, window_len)[:, None]*self._bins[None, :]/window_len)
+    self.reset()
+
+
+  # Forget the signal, as after a gap in the input stream.
+  def reset(self) -> None:
+    # Last window_len+1 samples (the extra one for the differences) at the end of a buffer, zeros before the first samples.
+    self._history = np.zeros((3*self._window_len, self._num_channels))
+    self._end = self._window_len + 1
+    self._sums = {name: np.zeros(self._num_channels) for name in ('sq', 'abs', 'abs_diff', 'sq_diff')}
+    self._sums['zc'] = np.zeros(self._num_channels, dtype=np.int64)
+    self._dft = np.zeros((len(self._bins), self._num_channels), dtype=np.complex128)
+    self._num_seen = 0
+    self._num_since_resync = 0
+    self._num_since_hop = 0
+
+
+  # Add a (num_samples, num_channels) block of samples, oldest first.
+  # Returns the features of each window completed by the block, oldest first,
+  #   as {feature: (num_channels,) array, or (num_bands, num_channels) for 'band_power'} dicts.
+  def push(self, x: np.ndarray) -> list[dict[str, np.ndarray]]:
+    x = np.asarray(x, dtype=np.float64).reshape(-1, self._num_channels)
+    outputs = []
+    i = 0
+    while i < len(x):
+      # Up to the next hop, and no more than the window can drop at once.
+      num_samples = min(len(x) - i, self._hop - self._num_since_hop, self._window_len - 1)
+      self._update(x[i:i+num_samples])
+      i += num_samples
+      self._num_seen += num_samples
+      self._num_since_hop += num_samples
+      if self._num_since_resync >= self._window_len:
+        self._resync()
+      if self._num_since_hop == self._hop:
+        self._num_since_hop = 0
+        if self._num_seen >= self._window_len:
+          outputs.append(self._get_features())
+    return outputs
+
+
+  def _update(self, x: np.ndarray) -> None:
+    num_samples = len(x)
+    # h[0] is the sample before the window, h[1:] the window.
+    h = self._history[self._end-self._window_len-1:self._end]
+    dropped = h[1:1+num_samples]
+    prev = np.concatenate((h[-1:], x[:-1]))
+    diff = x - prev
+    dropped_diff = h[2:2+num_samples] - dropped
+    if 'rms' in self._features:
+      self._sums['sq'] += (x**2).sum(axis=0) - (dropped**2).sum(axis=0)
+    if 'mav' in self._features:
+      self._sums['abs'] += np.abs(x).sum(axis=0) - np.abs(dropped).sum(axis=0)
+    if 'wl' in self._features:
+      self._sums['abs_diff'] += np.abs(diff).sum(axis=0) - np.abs(dropped_diff).sum(axis=0)
+    if 'zc' in self._features:
+      self._sums['zc'] += (x * prev < 0).sum(axis=0) - (h[2:2+num_samples] * dropped < 0).sum(axis=0)
+    if 'jerk' in self._features:
+      self._sums['sq_diff'] += ((diff*self._fs)**2).sum(axis=0) - ((dropped_diff*self._fs)**2).sum(axis=0)
+    if len(self._bins):
+      # X_k <- w_k^m X_k + sum_j w_k^(m-j+1) (x_j - dropped_j), with w_k = exp(2j*pi*k/N).
+      self._dft = (self._twiddle_powers[num_samples-1][:, None] * self._dft
+                   + self._twiddle_powers[num_samples-1::-1].T @ (x - dropped))
+    # Append to the history, moving the last window back to the front when the buffer is full.
+    if self._end + num_samples > len(self._history):
+      self._history[:self._window_len+1] = self._history[self._end-self._window_len-1:self._end]
+      self._end = self._window_len + 1
+    self._history[self._end:self._end+num_samples] = x
+    self._end += num_samples
+    self._num_since_resync += num_samples
+
+
+  def _resync(self) -> None:
+    window = self._history[self._end-self._window_len:self._end]
+    diff = np.diff(window, axis=0)
+    self._sums['sq'] = (window**2).sum(axis=0)
+    self._sums['abs'] = np.abs(window).sum(axis=0)
+    self._sums['abs_diff'] = np.abs(diff).sum(axis=0)
+    self._sums['zc'] = (window[1:] * window[:-1] < 0).sum(axis=0)
+    self._sums['sq_diff'] = ((diff*self._fs)**2).sum(axis=0)
+    if len(self._bins):
+      self._dft = np.fft.rfft(window, axis=0)[self._bins]
+    self._num_since_resync = 0
+
+
+  def _get_features(self) -> dict[str, np.ndarray]:
+    features = {}
+    if 'rms' in self._features:
+      features['rms'] = np.sqrt(np.maximum(self._sums['sq'], 0.0) / self._window_len)
+    if 'mav' in self._features:
+      features['mav'] = self._sums['abs'] / self._window_len
+    if 'wl' in self._features:
+      features['wl'] = self._sums['abs_diff'].copy()
+    if 'zc' in self._features:
+      features['zc'] = self._sums['zc'].copy()
+    if 'band_power' in self._features:
+      features['band_power'] = self._band_masks @ (self._bin_scale[:, None] * np.abs(self._dft)**2)
+    if 'jerk' in self._features:
+      features['jerk'] = np.sqrt(np.maximum(self._sums['sq_diff'], 0.0) / (self._window_len - 1))
+    return features
+
@@ -0,0 +1,216 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import math
+import os
+import h5py
+import numpy as np
+
+try:
+  import hdf5plugin
+except ImportError:
+  hdf5plugin = None
+
+
+# Bounds on the size of a single HDF5 chunk, in bytes.
+#   Small chunks inflate the B-tree index and the per-chunk filter overhead,
+#   large chunks make partial reads and the chunk cache expensive.
+HDF5_CHUNK_MIN_BYTES = 16 * 1024
+HDF5_CHUNK_MAX_BYTES = 1024 * 1024
+
+# Dataset at the root of a recording in SWMR mode with the number of valid samples of each dataset, rewritten on every flush.
+#   Datasets of a live recording grow in chunk-sized steps, so rows past their valid length are not yet data.
+#   Each dataset has its position in it as an attribute, set before readers can attach.
+#   Both are removed when the Logger trims the datasets on closing the file.
+HDF5_VALID_LENGTHS_PATH = 'valid_lengths'
+HDF5_VALID_LENGTH_INDEX_KEY = 'Valid length index'
+
+# Compression filters understood by `get_hdf5_storage_policy`.
+#   'auto' picks GZIP level 1, the fastest filter every HDF5 build can decode (plain h5py, the annotation tool).
+#   'blosc' and 'lz4' are faster, but are dynamically loaded filters that readers also need `hdf5plugin` for,
+#   so they are only used when asked for explicitly.
+HDF5_COMPRESSIONS = ('auto', 'blosc', 'lz4', 'gzip', 'lzf', 'none')
+
+
+# Number of samples that go into one chunk of an append-only time series.
+# Aligns the chunk with the amount of data written on every flush of the Logger,
+#   clamped into the [HDF5_CHUNK_MIN_BYTES, HDF5_CHUNK_MAX_BYTES] size range.
+def get_hdf5_chunk_length(sampling_rate_hz: float,
+                          sample_size: tuple[int, ...],
+                          data_type: str | np.dtype,
+                          stream_period_s: float) -> int:
+  sample_bytes = max(int(np.prod(sample_size)) * np.dtype(data_type).itemsize, 1)
+  # Asynchronous streams (no nominal rate) get the smallest chunk that is still efficient.
+  if not sampling_rate_hz or math.isnan(sampling_rate_hz):
+    chunk_length = HDF5_CHUNK_MIN_BYTES // sample_bytes
+  else:
+    chunk_length = math.ceil(sampling_rate_hz * stream_period_s)
+  chunk_length = max(chunk_length, math.ceil(HDF5_CHUNK_MIN_BYTES / sample_bytes))
+  chunk_length = min(chunk_length, HDF5_CHUNK_MAX_BYTES // sample_bytes)
+  return max(chunk_length, 1)
+
+
+# Keyword arguments of `h5py.Group.create_dataset` for the filter pipeline of a dataset.
+def get_hdf5_compression_kwargs(compression: str | None,
+                                compression_level: int | None = None,
+                                is_shuffle: bool = True) -> dict:
+  if compression is None or compression == 'none':
+    return {}
+  if compression == 'auto':
+    compression = 'gzip'
+  if compression in ('blosc', 'lz4'):
+    if hdf5plugin is None:
+      print("hdf5plugin not installed, falling back to GZIP compression instead of %s."%compression, flush=True)
+      compression = 'gzip'
+    elif compression == 'blosc':
+      # Blosc does its own byte shuffling, much faster than the HDF5 shuffle filter.
+      return dict(hdf5plugin.Blosc(cname='lz4',
+                                   clevel=5 if compression_level is None else compression_level,
+                                   shuffle=hdf5plugin.Blosc.SHUFFLE if is_shuffle else hdf5plugin.Blosc.NOSHUFFLE))
+    else:
+      return {**hdf5plugin.LZ4(), 'shuffle': is_shuffle}
+  if compression == 'gzip':
+    return {'compression': 'gzip',
+            'compression_opts': 1 if compression_level is None else compression_level,
+            'shuffle': is_shuffle}
+  if compression == 'lzf':
+    return {'compression': 'lzf', 'shuffle': is_shuffle}
+  raise ValueError("Unsupported HDF5 compression '%s', must be one of %s." % (compression, HDF5_COMPRESSIONS))
+
+
+# Computes the storage layout of an HDF5 dataset for a stream: chunk shape and filter pipeline.
+# @param overrides may specify any of 'chunk_length', 'compression', 'compression_level' and 'shuffle'
+#   to replace the automatically sized or globally configured values for this stream.
+# Returns keyword arguments to pass to `h5py.Group.create_dataset`.
+def get_hdf5_storage_policy(sampling_rate_hz: float,
+                            sample_size: tuple[int, ...],
+                            data_type: str | np.dtype,
+                            stream_period_s: float,
+                            compression: str | None = None,
+                            compression_level: int | None = None,
+                            is_shuffle: bool = True,
+                            overrides: dict = {}) -> dict:
+  chunk_length = overrides.get('chunk_length', get_hdf5_chunk_length(sampling_rate_hz=sampling_rate_hz,
+                                                                     sample_size=sample_size,
+                                                                     data_type=data_type,
+                                                                     stream_period_s=stream_period_s))
+  compression_kwargs = get_hdf5_compression_kwargs(compression=overrides.get('compression', compression),
+                                                   compression_level=overrides.get('compression_level', compression_level),
+                                                   is_shuffle=overrides.get('shuffle', is_shuffle))
+  return {'chunks': (chunk_length, *sample_size), **compression_kwargs}
+
+
+# Finds the most specific storage override for an HDF5 dataset path.
+# @param overrides maps '<streamer>', '<streamer>/<device>' or '<streamer>/<device>/<stream>' to policy overrides,
+#   more specific paths take precedence and are merged over the less specific ones.
+def get_hdf5_storage_overrides(overrides: dict[str, dict],
+                               streamer_name: str,
+                               device_name: str,
+                               stream_name: str) -> dict:
+  merged = {}
+  for path in (streamer_name,
+               '/'.join([streamer_name, device_name]),
+               '/'.join([streamer_name, device_name, stream_name])):
+    merged.update(overrides.get(path) or {})
+  return merged
+
+
+# Opens an HDF5 recording for reading while a Logger in SWMR mode is still writing it.
+def open_hdf5_swmr_reader(filepath: str) -> h5py.File:
+  return h5py.File(filepath, 'r', libver='latest', swmr=True)
+
+
+# Number of valid samples in a dataset of a recording that may still be written to.
+# Refreshes the dataset metadata to see the latest flush of the writer.
+#   Falls back to the dataset length for finished (trimmed) recordings.
+def get_hdf5_valid_length(dataset: h5py.Dataset) -> int:
+  dataset.refresh()
+  if HDF5_VALID_LENGTH_INDEX_KEY not in dataset.attrs:
+    return len(dataset)
+  valid_lengths: h5py.Dataset = dataset.file[HDF5_VALID_LENGTHS_PATH] # type: ignore
+  valid_lengths.refresh()
+  return int(valid_lengths[dataset.attrs[HDF5_VALID_LENGTH_INDEX_KEY]])
+
+
+# Creates a master HDF5 file that presents the datasets of consecutive segment files as one continuous dataset.
+# Each dataset of the master is a virtual dataset (VDS) that maps onto the valid rows of the same path in every segment,
+#   groups and attributes keep the layout and metadata of the first segment.
+# The layout and valid lengths are read first and all segment files closed before the master is written,
+#   virtual sources refer to the segments by path only, HDF5 opens them itself when the master is read.
+# Segment files are referenced by relative path, so the recording directory can be moved as a whole.
+def create_hdf5_vds_master(filepath: str, segment_filepaths: list[str]) -> None:
+  file_attrs: dict = {}
+  group_attrs: dict[str, dict] = {}
+  dataset_specs: dict[str, dict] = {}
+  # Valid length and full shape of each dataset path in each segment, absent paths are skipped.
+  segment_shapes: list[dict[str, tuple[int, tuple[int, ...]]]] = []
+  for (segment_index, segment_filepath) in enumerate(segment_filepaths):
+    with h5py.File(segment_filepath, 'r') as segment_file:
+      shapes: dict[str, tuple[int, tuple[int, ...]]] = {}
+      def visit(name: str, obj: h5py.Group | h5py.Dataset) -> None:
+        if isinstance(obj, h5py.Group):
+          if not segment_index:
+            group_attrs[name] = dict(obj.attrs)
+        elif name != HDF5_VALID_LENGTHS_PATH:
+          shapes[name] = (get_hdf5_valid_length(obj), obj.shape)
+          if not segment_index:
+            dataset_specs[name] = {'shape': obj.shape[1:],
+                                   'dtype': obj.dtype,
+                                   'attrs': {key: value for (key, value) in obj.attrs.items() if key != HDF5_VALID_LENGTH_INDEX_KEY}}
+      segment_file.visititems(visit)
+      if not segment_index:
+        file_attrs = dict(segment_file.attrs)
+      segment_shapes.append(shapes)
+  master_dirpath = os.path.dirname(os.path.abspath(filepath))
+  with h5py.File(filepath, 'w', libver='latest') as master_file:
+    master_file.attrs.update(file_attrs)
+    for (name, attrs) in group_attrs.items():
+      master_file.require_group(name).attrs.update(attrs)
+    for (dataset_path, dataset_spec) in dataset_specs.items():
+      sources = [(segment_filepath, *shapes[dataset_path]) for (segment_filepath, shapes) in zip(segment_filepaths, segment_shapes)
+                 if dataset_path in shapes and shapes[dataset_path][0]]
+      layout = h5py.VirtualLayout(shape=(sum(length for (_, length, _) in sources), *dataset_spec['shape']), dtype=dataset_spec['dtype'])
+      start_index = 0
+      for (segment_filepath, length, shape) in sources:
+        source_filepath = os.path.relpath(segment_filepath, master_dirpath)
+        layout[start_index:start_index+length] = h5py.VirtualSource(source_filepath, dataset_path, shape=shape)[:length]
+        start_index += length
+      virtual_dataset = master_file.create_virtual_dataset(dataset_path, layout)
+      virtual_dataset.attrs.update(dataset_spec['attrs'])
+
+
+# Creates a master HDF5 file that links each streamer group to the shard file it was written into,
+#   so that the recording keeps the usual /streamer/device/stream layout across the shards.
+# Shard files are referenced by relative path, so the recording directory can be moved as a whole.
+def create_hdf5_link_master(filepath: str,
+                            shard_filepaths: dict[str, str],
+                            file_metadata: dict[str, str]) -> None:
+  with h5py.File(filepath, 'w') as master_file:
+    master_file.attrs.update(file_metadata)
+    for (streamer_name, shard_filepath) in shard_filepaths.items():
+      source_filepath = os.path.relpath(shard_filepath, os.path.dirname(os.path.abspath(filepath)))
+      master_file[streamer_name] = h5py.ExternalLink(source_filepath, '/%s' % streamer_name)
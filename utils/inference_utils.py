@@ -0,0 +1,254 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+from abc import ABC, abstractmethod
+import io
+import numpy as np
+import torch
+
+from utils.tcn_utils import StreamingTCN, quantize_streaming_tcn
+from utils.time_utils import get_time
+
+try:
+  import onnxruntime as ort
+except ImportError as e:
+  print(e, "\nONNX Runtime not installed, will crash if you configure the 'onnx' inference backend.", flush=True)
+
+
+# Architecture of the FOG-detection TCN, unless the pipeline spec provides its own `model_kwargs`.
+DEFAULT_TCN_KWARGS = {
+  'num_inputs': 30,
+  'num_channels': [16, 32, 32, 32, 16],
+  'kernel_size': 3,
+  'dropout': 0.1,
+  'output_projection': 2,
+  'output_activation': None,
+  'causal': True,
+}
+
+
+# Runs a causal model one timestep at a time: one column of all the input channels in, one column of logits out.
+# Subclasses load the model in their constructor, which is timed into `load_time_s`.
+class InferenceBackend(ABC):
+  def __init__(self,
+               model_path: str,
+               num_inputs: int,
+               num_intra_op_threads: int = 1,
+               num_inter_op_threads: int = 1) -> None:
+    self._num_inputs = num_inputs
+    self._num_intra_op_threads = num_intra_op_threads
+    self._num_inter_op_threads = num_inter_op_threads
+    start_time_s = get_time()
+    self._load(model_path)
+    self.load_time_s = get_time() - start_time_s
+
+
+  @abstractmethod
+  def _load(self, model_path: str) -> None:
+    pass
+
+
+  # Forget the past inputs, as after a gap in the input stream.
+  @abstractmethod
+  def reset(self) -> None:
+    pass
+
+
+  @abstractmethod
+  def step(self, x: np.ndarray) -> np.ndarray:
+    pass
+
+
+  # Run the model on dummy inputs until its latency settles (allocations, lazy initialization, JIT passes),
+  #   then return to a clean state. Returns the steady-state latency over the second half of the steps.
+  def warm_up(self, num_steps: int = 100) -> dict[str, float]:
+    latencies_s = []
+    x = np.zeros(self._num_inputs, dtype=np.float32)
+    for _ in range(num_steps):
+      start_time_s = get_time()
+      self.step(x)
+      latencies_s.append(get_time() - start_time_s)
+    self.reset()
+    steady_latencies_s = np.array(latencies_s[num_steps//2:])
+    return {'load_time_s': self.load_time_s,
+            'latency_mean_s': float(steady_latencies_s.mean()),
+            'latency_p95_s': float(np.percentile(steady_latencies_s, 95))}
+
+
+# Serialized size of the weights of a streaming engine, the memory its (possibly packed int8) parameters take.
+def get_streaming_model_size_bytes(engine: StreamingTCN) -> int:
+  buffer = io.BytesIO()
+  torch.save(engine.layers.state_dict(), buffer)
+  return buffer.getbuffer().nbytes
+
+
+# Replay the same input steps through two streaming engines, i.e. the float model and its quantized copy,
+#   and compare their per-step latency, weight size, agreement of the predicted classes and the deviation of the logits.
+# Leaves both engines reset.
+def compare_streaming_models(reference: StreamingTCN, candidate: StreamingTCN, inputs: torch.Tensor) -> dict[str, float]:
+  results = {}
+  outputs = {}
+  for name, engine in (('reference', reference), ('candidate', candidate)):
+    engine.reset()
+    latencies_s = []
+    logits = []
+    with torch.no_grad():
+      for x in inputs:
+        start_time_s = get_time()
+        logits.append(engine.step(x))
+        latencies_s.append(get_time() - start_time_s)
+    engine.reset()
+    outputs[name] = torch.stack(logits)
+    results['%s_latency_mean_s' % name] = float(np.mean(latencies_s))
+    results['%s_latency_p95_s' % name] = float(np.percentile(latencies_s, 95))
+    results['%s_size_bytes' % name] = get_streaming_model_size_bytes(engine)
+  results['agreement'] = (outputs['reference'].argmax(dim=1) == outputs['candidate'].argmax(dim=1)).float().mean().item()
+  results['logits_max_abs_error'] = (outputs['reference'] - outputs['candidate']).abs().max().item()
+  results['logits_mean_abs_error'] = (outputs['reference'] - outputs['candidate']).abs().mean().item()
+  return results
+
+
+# Eager PyTorch `pytorch_tcn.TCN` from a state dict, run through the streaming engine,
+#   or through the library's own inference mode if `is_streaming_inference` is off.
+# Optionally runs int8 quantized ('dynamic' or 'static') on the streaming engine,
+#   statically calibrated with `calibration_inputs`, (num_steps, num_inputs) preprocessed input steps replayed from a recording.
+# Evaluate the quantized model against the float one offline, with `benchmarks.quantized_inference`.
+class EagerBackend(InferenceBackend):
+  def __init__(self,
+               model_path: str,
+               num_inputs: int,
+               model_kwargs: dict = DEFAULT_TCN_KWARGS,
+               is_streaming_inference: bool = True,
+               quantization: str | None = None, # [None, dynamic, static]
+               calibration_inputs: np.ndarray | None = None,
+               **kwargs) -> None:
+    self._model_kwargs = model_kwargs
+    self._is_streaming_inference = is_streaming_inference or quantization is not None
+    self._quantization = quantization
+    self._calibration_inputs = torch.from_numpy(calibration_inputs.astype(np.float32)) if calibration_inputs is not None else None
+    super().__init__(model_path=model_path, num_inputs=num_inputs, **kwargs)
+
+
+  def _load(self, model_path: str) -> None:
+    from pytorch_tcn import TCN
+    torch.set_num_threads(self._num_intra_op_threads)
+    # Can only be set once per process, before any parallel work.
+    if torch.get_num_interop_threads() != self._num_inter_op_threads:
+      torch.set_num_interop_threads(self._num_inter_op_threads)
+    self._model = TCN(**self._model_kwargs)
+    self._model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=True))
+    self._model.eval()
+    self._streaming_model: StreamingTCN | None = None
+    if self._is_streaming_inference:
+      self._streaming_model = StreamingTCN(self._model)
+    if self._quantization is not None:
+      self._streaming_model = quantize_streaming_tcn(self._streaming_model, self._quantization, self._calibration_inputs) # type: ignore
+
+
+  def reset(self) -> None:
+    if self._streaming_model is not None:
+      self._streaming_model.reset()
+    else:
+      self._model.reset_buffers()
+
+
+  def step(self, x: np.ndarray) -> np.ndarray:
+    with torch.no_grad():
+      if self._streaming_model is not None:
+        output = self._streaming_model.step(torch.from_numpy(x))
+      else:
+        output = self._model(torch.from_numpy(x)[None,:,None], inference=True)
+    return output.reshape(-1).numpy()
+
+
+# Common part of the exported full-window models: keeps the last `window_len` input columns
+#   and returns the logits of the newest one, so the window must cover the receptive field of the model.
+class WindowedBackend(InferenceBackend):
+  def __init__(self,
+               model_path: str,
+               num_inputs: int,
+               window_len: int = 64,
+               **kwargs) -> None:
+    self._window_len = window_len
+    super().__init__(model_path=model_path, num_inputs=num_inputs, **kwargs)
+    self.reset()
+
+
+  def reset(self) -> None:
+    self._ring = np.zeros((self._num_inputs, self._window_len), dtype=np.float32)
+    self._head = 0
+
+
+  def _push(self, x: np.ndarray) -> np.ndarray:
+    self._ring[:, self._head] = x
+    self._head = (self._head + 1) % self._window_len
+    # Oldest to newest, as a (1, C, T) batch.
+    return self._ring[:, (self._head + np.arange(self._window_len)) % self._window_len][None]
+
+
+# TorchScript module, traced or scripted from a full-window causal model with (1, C, T) input and (1, num_classes, T) output.
+class TorchScriptBackend(WindowedBackend):
+  def _load(self, model_path: str) -> None:
+    torch.set_num_threads(self._num_intra_op_threads)
+    torch.set_num_interop_threads(self._num_inter_op_threads)
+    self._model = torch.jit.optimize_for_inference(torch.jit.load(model_path, map_location='cpu').eval())
+
+
+  def step(self, x: np.ndarray) -> np.ndarray:
+    with torch.no_grad():
+      output = self._model(torch.from_numpy(self._push(x)))
+    return output[0, :, -1].numpy()
+
+
+# ONNX export of a full-window causal model with (1, C, T) input and (1, num_classes, T) output, run with ONNX Runtime on the CPU.
+class OnnxBackend(WindowedBackend):
+  def _load(self, model_path: str) -> None:
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = self._num_intra_op_threads
+    options.inter_op_num_threads = self._num_inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    self._session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+    self._input_name = self._session.get_inputs()[0].name
+
+
+  def step(self, x: np.ndarray) -> np.ndarray:
+    output = self._session.run(None, {self._input_name: self._push(x)})[0]
+    return output[0, :, -1]
+
+
+INFERENCE_BACKENDS: dict[str, type[InferenceBackend]] = {
+  'eager': EagerBackend,
+  'torchscript': TorchScriptBackend,
+  'onnx': OnnxBackend,
+}
+
+
+def create_inference_backend(model_backend: str, **kwargs) -> InferenceBackend:
+  if model_backend not in INFERENCE_BACKENDS:
+    raise ValueError("Unsupported inference backend '%s', must be one of %s." % (model_backend, tuple(INFERENCE_BACKENDS.keys())))
+  return INFERENCE_BACKENDS[model_backend](**kwargs)
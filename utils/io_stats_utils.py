@@ -0,0 +1,100 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import numpy as np
+
+
+# Upper edges of the write duration histogram bins, in seconds, roughly logarithmic from 100 us to 3 s.
+#   The last bin catches all the longer writes.
+WRITE_DURATION_BIN_EDGES_S = (1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 1e-1, 3e-1, 1.0, 3.0, float('inf'))
+
+
+# I/O counters of a single Logger writer (i.e. an HDF5 dataset, a CSV file, a video pipe or an audio file):
+#   bytes and samples written, histogram of write call durations,
+#   and depth of the Stream FIFO the writer drains, sampled at each flush.
+# Updated by the one thread that runs the writer at a time.
+class WriterStats:
+  def __init__(self, name: str):
+    self._name = name
+    self._num_writes: int = 0
+    self._num_samples: int = 0
+    self._num_bytes: int = 0
+    self._duration_total_s: float = 0.0
+    self._duration_max_s: float = 0.0
+    self._duration_hist: list[int] = [0] * len(WRITE_DURATION_BIN_EDGES_S)
+    self._queue_depth_last: int = 0
+    self._queue_depth_max: int = 0
+
+
+  def record(self, num_samples: int, num_bytes: int, duration_s: float, queue_depth: int) -> None:
+    self._num_writes += 1
+    self._num_samples += num_samples
+    self._num_bytes += num_bytes
+    self._duration_total_s += duration_s
+    self._duration_max_s = max(self._duration_max_s, duration_s)
+    self._duration_hist[int(np.searchsorted(WRITE_DURATION_BIN_EDGES_S, duration_s))] += 1
+    self._queue_depth_last = queue_depth
+    self._queue_depth_max = max(self._queue_depth_max, queue_depth)
+
+
+  # Approximate duration percentile, as the upper edge of the histogram bin it falls into.
+  def get_duration_percentile_s(self, percentile: float) -> float:
+    if not self._num_writes:
+      return float('nan')
+    bin_index = int(np.searchsorted(np.cumsum(self._duration_hist), percentile / 100 * self._num_writes))
+    return min(WRITE_DURATION_BIN_EDGES_S[bin_index], self._duration_max_s)
+
+
+  def get_stats(self) -> dict[str, float | int | str | list[int]]:
+    return {
+      'name': self._name,
+      'writes': self._num_writes,
+      'samples_written': self._num_samples,
+      'bytes_written': self._num_bytes,
+      'write_duration_mean_s': self._duration_total_s / self._num_writes if self._num_writes else float('nan'),
+      'write_duration_p99_s': self.get_duration_percentile_s(99),
+      'write_duration_max_s': self._duration_max_s,
+      'write_duration_hist': list(self._duration_hist),
+      'queue_depth': self._queue_depth_last,
+      'queue_depth_max': self._queue_depth_max,
+    }
+
+
+# Formats the counters of several writers as a fixed-width text table, for the log history and the HDF5 metadata.
+def format_writer_stats_table(writer_stats: list[WriterStats]) -> str:
+  rows = [('Writer', 'Writes', 'Samples', 'MB', 'Mean [ms]', 'p99 [ms]', 'Max [ms]', 'Max queue')]
+  for stats in (w.get_stats() for w in writer_stats):
+    rows.append((str(stats['name']),
+                 '%d' % stats['writes'],
+                 '%d' % stats['samples_written'],
+                 '%.2f' % (stats['bytes_written'] / 1024**2), # type: ignore
+                 '%.2f' % (1000 * stats['write_duration_mean_s']), # type: ignore
+                 '%.2f' % (1000 * stats['write_duration_p99_s']), # type: ignore
+                 '%.2f' % (1000 * stats['write_duration_max_s']), # type: ignore
+                 '%d' % stats['queue_depth_max']))
+  widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+  return '\n'.join('  '.join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths))) for row in rows)
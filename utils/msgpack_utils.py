@@ -38,9 +38,12 @@ def encode_ndarray(obj):
   return obj
 
 
+# Keys are bytes with raw unpacking (the default before msgpack 1.0), strings otherwise.
 def decode_ndarray(obj):
   if b'__numpy__' in obj:
     obj = np.frombuffer(obj[b'bytes'], dtype=obj[b'dtype']).reshape(obj[b'shape'])
+  elif '__numpy__' in obj:
+    obj = np.frombuffer(obj['bytes'], dtype=obj['dtype']).reshape(obj['shape'])
   return obj
 
 
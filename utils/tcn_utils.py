@@ -0,0 +1,167 @@
+############
+#
+# Copyright (c) 2024 Maxim Yudayev and KU Leuven eMedia Lab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Created 2024-2025 for the KU Leuven AidWear, AidFOG, and RevalExo projects
+# by Maxim Yudayev [https://yudayev.com].
+#
+# ############
+
+import copy
+import torch
+from torch import nn
+
+
+# Weight of a convolution, with the weight normalization (if any) baked in.
+def _get_conv_weight(conv: nn.Conv1d) -> torch.Tensor:
+  if hasattr(conv, 'weight_g') and hasattr(conv, 'weight_v'):
+    return torch._weight_norm(conv.weight_v, conv.weight_g, 0).detach()
+  return conv.weight.detach()
+
+
+# Input history of one causal dilated convolution, evaluated one timestep at a time.
+# Keeps the last (kernel_size-1)*dilation+1 input columns in a ring buffer,
+#   and gathers the kernel's taps of the newest step into one vector,
+#   so the convolution becomes a single (C_out x C_in*kernel_size) matrix-vector product: `as_linear`.
+class CausalConvState:
+  def __init__(self, conv: nn.Conv1d):
+    _, self._num_in, self._kernel_size = conv.weight.shape
+    self._dilation = conv.dilation[0]
+    self._ring_len = (self._kernel_size-1)*self._dilation + 1
+    # Ring position of each kernel tap, for every position of the write head: tap j sees the input (k-1-j)*d steps ago.
+    offsets = torch.tensor([(self._kernel_size-1-j)*self._dilation for j in range(self._kernel_size)])
+    self._tap_indices = (torch.arange(self._ring_len)[:, None] - offsets[None, :]) % self._ring_len
+    self.reset()
+
+
+  # Clear the past inputs, equivalent to the zero padding at the start of a full window.
+  def reset(self) -> None:
+    self._ring = torch.zeros(self._num_in, self._ring_len)
+    self._head = 0
+
+
+  # Add the newest input column, get the (1, C_in*kernel_size) taps the convolution needs for it.
+  def push(self, x: torch.Tensor) -> torch.Tensor:
+    self._ring[:, self._head] = x
+    taps = self._ring[:, self._tap_indices[self._head]]
+    self._head = (self._head + 1) % self._ring_len
+    return taps.reshape(1, -1)
+
+
+# Equivalent linear layer of a (causal) convolution applied to the taps of `CausalConvState`.
+def as_linear(conv: nn.Conv1d) -> nn.Linear:
+  weight = _get_conv_weight(conv)
+  linear = nn.Linear(weight.shape[1]*weight.shape[2], weight.shape[0], bias=conv.bias is not None)
+  linear.weight.data.copy_(weight.reshape(weight.shape[0], -1))
+  if conv.bias is not None:
+    linear.bias.data.copy_(conv.bias.detach())
+  return linear
+
+
+# Streaming inference engine for a causal `pytorch_tcn.TCN`: one new input column in, one output column out.
+# Each temporal block keeps the state of its two dilated convolutions in ring buffers,
+#   so the cost of a step is one column of every convolution, independent of the receptive field.
+# All the weights are in `layers`, as linear layers, so they can be quantized like any other module.
+# Dropout is ignored (eval mode). Non-causal models and blocks with batch/layer normalization, gated activations,
+#   embeddings or skip connections are not supported and rejected.
+class StreamingTCN:
+  def __init__(self, model: nn.Module):
+    if not getattr(model, 'causal', False):
+      raise ValueError('Streaming inference needs a causal TCN.')
+    if getattr(model, 'use_skip_connections', False):
+      raise ValueError('Streaming inference does not support skip connections.')
+    self.layers = nn.ModuleDict()
+    self._blocks = []
+    for i, block in enumerate(model.network): # type: ignore
+      if block.use_norm not in ('weight_norm', None):
+        raise ValueError("Streaming inference does not support '%s' in the temporal blocks." % block.use_norm)
+      if block.use_gate or block.embedding_shapes is not None:
+        raise ValueError('Streaming inference does not support gated activations or embeddings.')
+      self.layers['block%d_conv1' % i] = as_linear(block.conv1)
+      self.layers['block%d_conv2' % i] = as_linear(block.conv2)
+      if block.downsample is not None:
+        self.layers['block%d_downsample' % i] = as_linear(block.downsample)
+      self._blocks.append({
+        'index': i,
+        'conv1': CausalConvState(block.conv1),
+        'conv2': CausalConvState(block.conv2),
+        'activation1': block.activation1,
+        'activation2': block.activation2,
+        'activation_final': block.activation_final,
+        'is_downsample': block.downsample is not None,
+      })
+    if getattr(model, 'projection_out', None) is not None:
+      self.layers['projection_out'] = as_linear(model.projection_out) # type: ignore
+    self._activation_out = getattr(model, 'activation_out', None)
+    self.layers.eval()
+    # Number of past steps an output depends on.
+    self.receptive_field = 1 + sum(2*(b['conv1']._kernel_size-1)*b['conv1']._dilation for b in self._blocks)
+
+
+  # Start over, as after a gap in the input stream.
+  def reset(self) -> None:
+    for block in self._blocks:
+      block['conv1'].reset()
+      block['conv2'].reset()
+
+
+  # Takes one timestep of all the input channels, returns one timestep of the outputs.
+  def step(self, x: torch.Tensor) -> torch.Tensor:
+    x = x.reshape(1, -1)
+    for block in self._blocks:
+      i = block['index']
+      out = block['activation1'](self.layers['block%d_conv1' % i](block['conv1'].push(x)))
+      out = block['activation2'](self.layers['block%d_conv2' % i](block['conv2'].push(out)))
+      res = self.layers['block%d_downsample' % i](x) if block['is_downsample'] else x
+      x = block['activation_final'](out + res)
+    if 'projection_out' in self.layers:
+      x = self.layers['projection_out'](x)
+    if self._activation_out is not None:
+      x = self._activation_out(x)
+    return x.reshape(-1)
+
+
+# Quantize the weights of the streaming engine to int8, for the CPU.
+#   'dynamic': int8 weights, activations quantized on the fly at every step, no calibration needed.
+#   'static': int8 weights and activations, with activation ranges observed on the calibration inputs,
+#     (num_steps, num_inputs) replayed through the engine in order.
+# Returns a quantized copy of the engine, reset.
+def quantize_streaming_tcn(engine: StreamingTCN, mode: str, calibration_inputs: torch.Tensor | None = None) -> StreamingTCN:
+  quantized = copy.deepcopy(engine)
+  if mode == 'dynamic':
+    quantized.layers = torch.ao.quantization.quantize_dynamic(quantized.layers, {nn.Linear}, dtype=torch.qint8)
+  elif mode == 'static':
+    if calibration_inputs is None:
+      raise ValueError('Static quantization needs calibration inputs.')
+    for name in list(quantized.layers.keys()):
+      quantized.layers[name] = torch.ao.quantization.QuantWrapper(quantized.layers[name])
+      quantized.layers[name].qconfig = torch.ao.quantization.get_default_qconfig(torch.backends.quantized.engine)
+    torch.ao.quantization.prepare(quantized.layers, inplace=True)
+    quantized.reset()
+    with torch.no_grad():
+      for x in calibration_inputs:
+        quantized.step(x)
+    torch.ao.quantization.convert(quantized.layers, inplace=True)
+  else:
+    raise ValueError("Unsupported quantization mode '%s', must be one of ('dynamic', 'static')." % mode)
+  quantized.reset()
+  return quantized
+
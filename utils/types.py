@@ -50,5 +50,6 @@ VIDEO_FORMAT = {
   'bgr':        VideoFormatTuple('rawvideo',    'bgr24',        cv2.COLOR_BGR2RGB),
   'yuv':        VideoFormatTuple('rawvideo',    'yuv420p',      cv2.COLOR_YUV2RGB),
   'jpeg':       VideoFormatTuple('image2pipe',  'yuv420p',      cv2.COLOR_YUV2RGB),
+  'h264':       VideoFormatTuple('h264',        'yuv420p',      cv2.COLOR_YUV2RGB),
   'bayer_rg8':  VideoFormatTuple('rawvideo',    'bayer_rggb8',  cv2.COLOR_BAYER_RG2RGB),
 }
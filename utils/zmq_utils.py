@@ -27,6 +27,8 @@
 
 # ZeroMQ topics and message strings
 TOPIC_KILL      = 'KILL'
+TOPIC_LOGGER_STATS = 'LOGGER_STATS'
+TOPIC_CONFLATION = 'CONFLATION'
 CMD_HELLO       = 'HELLO'
 CMD_ACK         = 'ACK'
 CMD_START_TIME  = 'START_TIME'